@@ -65,7 +65,8 @@ SITE_ID = 1
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise, extended to serve MEDIA_ROOT with fingerprinted URLs
+    "values.media.MediaMiddleware",
 
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -114,6 +115,31 @@ DATABASES = {
     )
 }
 
+# --------------------------------------------------
+# CACHE
+# --------------------------------------------------
+
+# The catalog version counter and cached pages must be shared by every gunicorn
+# worker, so use Redis when Railway provides one; local memory is fine for dev.
+# With DEBUG off, `manage.py check --deploy` (run by the Procfile before
+# gunicorn starts) warns about a process-local cache unless
+# ALLOW_LOCAL_CACHE=True, for deployments that really run a single process.
+ALLOW_LOCAL_CACHE = os.environ.get("ALLOW_LOCAL_CACHE", "False") == "True"
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # --------------------------------------------------
 # PASSWORD VALIDATION
 # --------------------------------------------------
@@ -14,8 +14,6 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
@@ -28,7 +26,8 @@ urlpatterns = [
     path('', include('values.urls', namespace='values')),
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', TemplateView.as_view(template_name="robots.txt", content_type="text/plain")),
+    # Served from the root so its scope covers the calculator and the API
+    path('sw.js', TemplateView.as_view(template_name="sw.js", content_type="application/javascript")),
 ]
 
-# Serve media files (development and simple production setup)
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media files are served by values.media.MediaMiddleware
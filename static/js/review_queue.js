@@ -0,0 +1,33 @@
+// Review queue selection: the page-wide and per-item checkboxes tick the requests under them
+(function() {
+    'use strict';
+
+    const form = document.getElementById('review-form');
+    if (!form) {
+        return;
+    }
+
+    function requestBoxes(scope) {
+        return Array.from(scope.querySelectorAll('input[name="requests"]'));
+    }
+
+    function updateCount() {
+        const count = requestBoxes(form).filter(box => box.checked).length;
+        form.querySelectorAll('[data-selected-count]').forEach(el => {
+            el.textContent = count;
+        });
+    }
+
+    form.addEventListener('change', event => {
+        const target = event.target;
+        if (target.matches('[data-select-all]')) {
+            const scope = target.dataset.selectAll ? document.getElementById(target.dataset.selectAll) : form;
+            requestBoxes(scope).forEach(box => {
+                box.checked = target.checked;
+            });
+        }
+        updateCount();
+    });
+
+    updateCount();
+})();
@@ -53,7 +53,7 @@
             let timeout;
             searchInput.addEventListener('input', function() {
                 clearTimeout(timeout);
-                timeout = setTimeout(loadItems, 300);
+                timeout = setTimeout(loadItems, 100);
             });
         }
         
@@ -74,7 +74,28 @@
             });
         }
         
+        const shareBtn = document.getElementById('shareTradeBtn');
+        if (shareBtn) {
+            shareBtn.addEventListener('click', shareTrade);
+        }
+        const copyBtn = document.getElementById('copyTradeUrlBtn');
+        if (copyBtn) {
+            copyBtn.addEventListener('click', function() {
+                const urlInput = document.getElementById('shareTradeUrl');
+                urlInput.select();
+                if (navigator.clipboard) {
+                    navigator.clipboard.writeText(urlInput.value).catch(() => null);
+                }
+            });
+        }
+        
         updateTotals();
+        
+        // Opened from a trade permalink (?trade=<code>)
+        const sharedCode = new URLSearchParams(window.location.search).get('trade');
+        if (sharedCode) {
+            loadSharedTrade(sharedCode);
+        }
         console.log('Trade calculator ready');
     }
     
@@ -122,17 +143,131 @@
         document.getElementById('qtyInput').value = 1;
     }
     
+    // Full catalog, kept in IndexedDB between visits and filtered locally.
+    // A stored copy younger than CATALOG_MAX_AGE is used without touching the
+    // network; an older one is brought up to date with a delta fetch.
+    const CATALOG_DB = 'jji-values';
+    const CATALOG_STORE = 'catalog';
+    const CATALOG_MAX_AGE = 5 * 60 * 1000;
+    let catalogPromise = null;
+    
+    function openCatalogDb() {
+        return new Promise((resolve, reject) => {
+            if (!window.indexedDB) {
+                reject(new Error('IndexedDB unavailable'));
+                return;
+            }
+            const request = indexedDB.open(CATALOG_DB, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(CATALOG_STORE);
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+    
+    function readStoredCatalog() {
+        return openCatalogDb()
+            .then(db => new Promise(resolve => {
+                const request = db.transaction(CATALOG_STORE).objectStore(CATALOG_STORE).get('current');
+                request.onsuccess = () => resolve(request.result || null);
+                request.onerror = () => resolve(null);
+            }))
+            .catch(() => null);
+    }
+    
+    function storeCatalog(record) {
+        return openCatalogDb()
+            .then(db => {
+                db.transaction(CATALOG_STORE, 'readwrite').objectStore(CATALOG_STORE).put(record, 'current');
+            })
+            .catch(() => null)
+            .then(() => record);
+    }
+    
+    function fetchJson(url, options) {
+        return fetch(url, options).then(response => {
+            if (!response.ok) {
+                throw new Error('Catalog request failed: ' + response.status);
+            }
+            return response.json();
+        });
+    }
+    
+    function fetchFullCatalog() {
+        // no-cache makes the browser revalidate its copy via ETag (304 when unchanged)
+        return fetchJson('/api/items/catalog/', { cache: 'no-cache' })
+            .then(data => storeCatalog({ stamp: data.stamp, items: data.items || [], checkedAt: Date.now() }));
+    }
+    
+    function updateCatalog(stored) {
+        const params = new URLSearchParams({ since: stored.stamp || '' });
+        return fetchJson(`/api/items/catalog/changes/?${params.toString()}`)
+            .then(delta => {
+                let items = delta.items;
+                if (!delta.full) {
+                    const byId = new Map(stored.items.map(item => [item.id, item]));
+                    delta.items.forEach(item => byId.set(item.id, item));
+                    if (delta.ids) {
+                        const current = new Set(delta.ids);
+                        byId.forEach((item, id) => {
+                            if (!current.has(id)) byId.delete(id);
+                        });
+                    }
+                    items = Array.from(byId.values());
+                    // Keep the name order filterItems relies on
+                    items.sort((a, b) => (a.name < b.name ? -1 : a.name > b.name ? 1 : 0));
+                }
+                return storeCatalog({ stamp: delta.stamp, items: items, checkedAt: Date.now() });
+            });
+    }
+    
+    function fetchCatalog() {
+        if (!catalogPromise) {
+            catalogPromise = readStoredCatalog()
+                .then(stored => {
+                    if (!stored) {
+                        return fetchFullCatalog();
+                    }
+                    if (Date.now() - stored.checkedAt < CATALOG_MAX_AGE) {
+                        return stored;
+                    }
+                    // Offline: a stale catalog beats no catalog
+                    return updateCatalog(stored).catch(() => stored);
+                })
+                .then(record => record.items)
+                .catch(error => {
+                    // Allow the next search to retry
+                    catalogPromise = null;
+                    throw error;
+                });
+        }
+        return catalogPromise;
+    }
+    
+    function filterItems(items, search, category, rarity) {
+        const needle = search.trim().toLowerCase();
+        // The catalog arrives sorted by name, so filtering keeps that order
+        return items.filter(item =>
+            (!needle || item.name.toLowerCase().includes(needle) || (item.notes || '').toLowerCase().includes(needle)) &&
+            (!category || item.category_slug === category) &&
+            (!rarity || item.rarity_key === rarity)
+        );
+    }
+    
+    function loadSuggestions(search, category, rarity) {
+        // Nothing matched as typed, so fall back to typo-tolerant name matches
+        const params = new URLSearchParams({ q: search, limit: 10 });
+        return fetch(`/api/items/suggest/?${params.toString()}`)
+            .then(response => response.json())
+            .then(data => filterItems(data.items || [], '', category, rarity));
+    }
+    
+    let loadCounter = 0;
+    
     function loadItems() {
         const search = document.getElementById('modalSearch')?.value || '';
         const category = document.getElementById('modalCategory')?.value || '';
         const rarity = document.getElementById('modalRarity')?.value || '';
         
-        const params = new URLSearchParams();
-        if (search) params.set('q', search);
-        if (category) params.set('category', category);
-        if (rarity) params.set('rarity', rarity);
-        params.set('sort', 'name');
-        
         const listEl = document.getElementById('modalItemsList');
         const loadingEl = document.getElementById('modalLoading');
         const emptyEl = document.getElementById('modalEmpty');
@@ -143,22 +278,33 @@
         loadingEl.style.display = 'block';
         emptyEl.style.display = 'none';
         
-        fetch(`/api/items/?${params.toString()}`)
-            .then(response => response.json())
-            .then(data => {
+        // Ignore results from searches that were superseded while loading
+        const loadId = ++loadCounter;
+        
+        fetchCatalog()
+            .then(catalog => {
+                const items = filterItems(catalog, search, category, rarity).slice(0, 200);
+                if (items.length === 0 && search.trim()) {
+                    return loadSuggestions(search, category, rarity);
+                }
+                return items;
+            })
+            .then(items => {
+                if (loadId !== loadCounter) return;
                 loadingEl.style.display = 'none';
                 
-                if (!data.items || data.items.length === 0) {
+                if (items.length === 0) {
                     emptyEl.style.display = 'block';
                     return;
                 }
                 
-                data.items.forEach(item => {
+                items.forEach(item => {
                     const itemEl = createItemElement(item);
                     listEl.appendChild(itemEl);
                 });
             })
             .catch(error => {
+                if (loadId !== loadCounter) return;
                 console.error('Error:', error);
                 loadingEl.style.display = 'none';
                 emptyEl.style.display = 'block';
@@ -174,7 +320,7 @@
         
         div.innerHTML = `
             <div class="d-flex align-items-center gap-3">
-                ${item.image_url ? `<img src="${escapeHtml(item.image_url)}" alt="${escapeHtml(item.name)}" style="width: 60px; height: 60px; object-fit: contain;">` : '<div style="width: 60px; height: 60px; background: #333; display: flex; align-items: center; justify-content: center; color: #666;"><i class="bi bi-image"></i></div>'}
+                ${item.sprite ? spriteHtml(item, 60) : item.image_url ? `<img src="${escapeHtml(item.image_url)}"${srcsetAttrs(item, 60)} alt="${escapeHtml(item.name)}" style="width: 60px; height: 60px; object-fit: contain;">` : '<div style="width: 60px; height: 60px; background: #333; display: flex; align-items: center; justify-content: center; color: #666;"><i class="bi bi-image"></i></div>'}
                 <div class="flex-grow-1">
                     <div class="fw-bold">${escapeHtml(item.name)}</div>
                     <div class="small text-muted">
@@ -247,6 +393,7 @@
             name: state.selectedItem.name,
             value: state.selectedItem.value,
             image_url: state.selectedItem.image_url,
+            image_srcset: state.selectedItem.image_srcset,
             quantity: quantity
         });
         
@@ -285,7 +432,7 @@
         
         const totalValue = item.value * item.quantity;
         const imgHtml = item.image_url
-            ? `<img src="${escapeHtml(item.image_url)}" alt="${escapeHtml(item.name)}" class="trade-item-img">`
+            ? `<img src="${escapeHtml(item.image_url)}"${srcsetAttrs(item, 60)} alt="${escapeHtml(item.name)}" class="trade-item-img">`
             : '<div class="trade-item-img no-img"><i class="bi bi-image"></i></div>';
         
         div.innerHTML = `
@@ -327,6 +474,16 @@
             theirOfferTotal += item.value * item.quantity;
         });
         
+        const shareBtn = document.getElementById('shareTradeBtn');
+        if (shareBtn) {
+            shareBtn.disabled = state.items.offer.length === 0 && state.items.request.length === 0;
+        }
+        const shareResult = document.getElementById('shareTradeResult');
+        if (shareResult) {
+            // The link was for the trade as it was when saved
+            shareResult.style.display = 'none';
+        }
+        
         const offerEl = document.getElementById('offerTotal');
         const requestEl = document.getElementById('requestTotal');
         if (offerEl) offerEl.textContent = formatValue(myOfferTotal);
@@ -363,6 +520,63 @@
         }
     }
     
+    function getCookie(name) {
+        const match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+        return match ? decodeURIComponent(match[1]) : '';
+    }
+    
+    function tradePayload(side) {
+        return state.items[side].map(item => [item.id, item.quantity]);
+    }
+    
+    function shareTrade() {
+        const shareBtn = document.getElementById('shareTradeBtn');
+        shareBtn.disabled = true;
+        fetch('/api/trades/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ offer: tradePayload('offer'), request: tradePayload('request') })
+        })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Save failed: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(data => {
+                document.getElementById('shareTradeUrl').value = data.url;
+                document.getElementById('shareTradeResult').style.display = 'block';
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('Could not save this trade. Please try again.');
+            })
+            .finally(() => {
+                shareBtn.disabled = false;
+            });
+    }
+    
+    function loadSharedTrade(code) {
+        fetchJson(`/api/trades/${encodeURIComponent(code)}/`)
+            .then(data => {
+                ['offer', 'request'].forEach(side => {
+                    state.items[side] = (data[side] || []).map(item => ({
+                        id: item.id,
+                        name: item.name,
+                        value: item.value,
+                        image_url: item.image_url,
+                        image_srcset: item.image_srcset,
+                        quantity: item.quantity
+                    }));
+                });
+                renderAll();
+            })
+            .catch(error => console.error('Error loading shared trade:', error));
+    }
+    
     function formatValue(value) {
         if (value >= 1000) {
             return (value / 1000).toFixed(1) + 'K';
@@ -370,6 +584,29 @@
         return value.toString();
     }
     
+    // Thumbnail cut from the shared sprite sheet, so the whole picker list
+    // needs a single image request
+    function spriteHtml(item, size) {
+        const s = item.sprite;
+        const style = [
+            `width: ${size}px`,
+            `height: ${size}px`,
+            'flex-shrink: 0',
+            `background-image: url("${escapeHtml(s.sheet)}")`,
+            `background-size: ${s.columns * size}px ${s.rows * size}px`,
+            `background-position: -${s.column * size}px -${s.row * size}px`,
+        ].join('; ');
+        return `<div role="img" aria-label="${escapeHtml(item.name)}" style="${style}"></div>`;
+    }
+    
+    // srcset/sizes attributes so thumbnails load a resized WebP when available
+    function srcsetAttrs(item, width) {
+        if (!item.image_srcset) {
+            return '';
+        }
+        return ` srcset="${escapeHtml(item.image_srcset)}" sizes="${width}px"`;
+    }
+    
     function escapeHtml(text) {
         const div = document.createElement('div');
         div.textContent = text;
@@ -389,5 +626,11 @@
         }
     }
     
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js').catch(error => {
+            console.warn('Service worker registration failed:', error);
+        });
+    }
+    
     start();
 })();
@@ -0,0 +1,107 @@
+// Item value history chart, drawn as an SVG step line from /api/items/<slug>/history/
+(function() {
+    'use strict';
+
+    const WIDTH = 400;
+    const HEIGHT = 160;
+    const PADDING = 8;
+    const POINTS = 120;
+    const SVG_NS = 'http://www.w3.org/2000/svg';
+
+    function formatValue(value) {
+        if (value >= 1000) {
+            return (value / 1000).toFixed(1) + 'K';
+        }
+        return value.toString();
+    }
+
+    function svgElement(name, attrs) {
+        const el = document.createElementNS(SVG_NS, name);
+        Object.keys(attrs).forEach(key => el.setAttribute(key, attrs[key]));
+        return el;
+    }
+
+    function draw(chart, data) {
+        const svg = chart.querySelector('.value-chart-plot');
+        const caption = chart.querySelector('.value-chart-caption');
+        svg.innerHTML = '';
+
+        const points = data.points;
+        if (points.length === 0) {
+            caption.textContent = 'No value changes in this range.';
+            return;
+        }
+
+        const start = Date.parse(data.start);
+        const end = Date.parse(data.end);
+        const low = Math.min(...points.map(p => p.min));
+        const high = Math.max(...points.map(p => p.max));
+        const span = high - low || 1;
+        const x = t => PADDING + (WIDTH - 2 * PADDING) * (t - start) / (end - start);
+        const y = v => HEIGHT - PADDING - (HEIGHT - 2 * PADDING) * (v - low) / span;
+
+        // Each value holds until the next point, and the last one until the end
+        let path = '';
+        points.forEach((p, index) => {
+            const left = x(Date.parse(p.t));
+            const right = index + 1 < points.length ? x(Date.parse(points[index + 1].t)) : x(end);
+            path += `${index ? 'L' : 'M'}${left},${y(p.value)} L${right},${y(p.value)} `;
+            if (p.min !== p.max) {
+                // Downsampled bucket: show the range it covered
+                svg.appendChild(svgElement('rect', {
+                    class: 'value-chart-band',
+                    x: left - 1,
+                    y: y(p.max),
+                    width: 2,
+                    height: Math.max(1, y(p.min) - y(p.max))
+                }));
+            }
+        });
+        svg.appendChild(svgElement('path', { class: 'value-chart-line', d: path }));
+
+        const first = points[0].value;
+        const last = points[points.length - 1].value;
+        const change = last - first;
+        caption.textContent = `${formatValue(first)} → ${formatValue(last)} (${change >= 0 ? '+' : '-'}${formatValue(Math.abs(change))}), ` +
+            `range ${formatValue(low)}–${formatValue(high)}`;
+    }
+
+    function load(chart, days) {
+        const params = new URLSearchParams({ points: POINTS });
+        // "All" starts before any item existed
+        const start = days ? new Date(Date.now() - days * 86400000) : new Date('2000-01-01T00:00:00Z');
+        params.set('start', start.toISOString());
+        fetch(`${chart.dataset.url}?${params.toString()}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('History request failed: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(data => draw(chart, data))
+            .catch(error => {
+                console.error('Error:', error);
+                chart.querySelector('.value-chart-caption').textContent = 'Value history unavailable.';
+            });
+    }
+
+    function init() {
+        const chart = document.getElementById('valueChart');
+        if (!chart) return;
+
+        chart.querySelectorAll('.value-chart-range').forEach(button => {
+            button.addEventListener('click', function() {
+                chart.querySelectorAll('.value-chart-range').forEach(b => b.classList.remove('active'));
+                this.classList.add('active');
+                load(chart, parseInt(this.dataset.days) || 0);
+            });
+        });
+        load(chart, 90);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();
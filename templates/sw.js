@@ -0,0 +1,122 @@
+{% load static %}// Service worker: keeps the trade calculator usable offline.
+//
+// The calculator page is rendered per user (navbar, CSRF token), so it and
+// our own scripts/styles, whose URLs aren't fingerprinted, are fetched from
+// the network first and only answered from cache when offline. Versioned CDN
+// assets are answered from cache and refreshed in the background
+// (stale-while-revalidate), fingerprinted media never change so they are
+// cache-first, and the catalog itself lives in IndexedDB (see
+// trade_calculator.js), kept current with delta fetches.
+'use strict';
+
+const CACHE_NAME = 'jji-calculator-v2';
+const MEDIA_CACHE = 'jji-media-v1';
+const CALCULATOR_URL = '{% url "values:trade_calculator" %}';
+const CATALOG_URL = '{% url "values:api_items_catalog" %}';
+
+// Offline fallbacks, replaced whenever the network answers
+const PRECACHE_URLS = [
+    CALCULATOR_URL,
+    '{% static "js/trade_calculator.js" %}',
+    '{% static "css/styles.css" %}',
+    CATALOG_URL,
+];
+
+// Third-party assets the page needs (versioned URLs, so a cached copy is
+// never wrong); a CDN hiccup shouldn't fail the install
+const CDN_ORIGIN = 'https://cdn.jsdelivr.net';
+const OPTIONAL_URLS = [
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.css',
+];
+
+// Content-addressed, so a cached copy is always current
+const IMMUTABLE_MEDIA = new RegExp('^{% get_media_prefix %}(derived/|.+\\.[0-9a-f]{12}\\.[^./]+$)');
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE_NAME).then(cache =>
+            cache.addAll(PRECACHE_URLS).then(() =>
+                Promise.all(OPTIONAL_URLS.map(url => cache.add(url).catch(() => null)))
+            )
+        ).then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(
+                names
+                    .filter(name => name !== CACHE_NAME && name !== MEDIA_CACHE)
+                    .map(name => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+function staleWhileRevalidate(event) {
+    return caches.open(CACHE_NAME).then(cache =>
+        cache.match(event.request).then(cached => {
+            const network = fetch(event.request).then(response => {
+                if (response.ok) {
+                    cache.put(event.request, response.clone());
+                }
+                return response;
+            });
+            if (cached) {
+                event.waitUntil(network.catch(() => null));
+                return cached;
+            }
+            return network;
+        })
+    );
+}
+
+// Only the plain URL is stored; offline, a shared-trade link (?trade=)
+// falls back to the cached calculator page
+function networkFirst(event) {
+    const plain = !new URL(event.request.url).search;
+    return caches.open(CACHE_NAME).then(cache =>
+        fetch(event.request)
+            .then(response => {
+                if (response.ok && plain) {
+                    cache.put(event.request, response.clone());
+                }
+                return response;
+            })
+            .catch(() => cache.match(event.request, { ignoreSearch: true })
+                .then(cached => cached || Promise.reject(new Error('offline'))))
+    );
+}
+
+function cacheFirst(event) {
+    return caches.open(MEDIA_CACHE).then(cache =>
+        cache.match(event.request).then(cached => cached || fetch(event.request).then(response => {
+            if (response.ok) {
+                cache.put(event.request, response.clone());
+            }
+            return response;
+        }))
+    );
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+    const url = new URL(request.url);
+    const sameOrigin = url.origin === self.location.origin;
+
+    if (sameOrigin && IMMUTABLE_MEDIA.test(url.pathname)) {
+        event.respondWith(cacheFirst(event));
+    } else if (sameOrigin && PRECACHE_URLS.includes(url.pathname) && (!url.search || request.mode === 'navigate')) {
+        // The page is per user, our assets aren't fingerprinted, and the
+        // catalog is normally read from IndexedDB
+        event.respondWith(networkFirst(event));
+    } else if (url.origin === CDN_ORIGIN) {
+        event.respondWith(staleWhileRevalidate(event));
+    }
+});
@@ -34,6 +34,8 @@ class ItemAdmin(admin.ModelAdmin):
     )
     search_fields = ("name", "notes", "obtained_from")
     prepopulated_fields = {"slug": ("name",)}
+    # Computed by manage.py compute_trends
+    readonly_fields = ("trend", "volatility", "moving_average")
     ordering = ("-featured", "-value")
     
     def get_form(self, request, obj=None, **kwargs):
@@ -62,6 +64,7 @@ class ValueChangeRequestAdmin(admin.ModelAdmin):
         "reviewed_by",
     )
     list_filter = ("status", "created_at", "reviewed_at")
+    list_select_related = ("item", "requested_by", "reviewed_by")
     search_fields = ("item__name", "requested_by__username", "reason")
     readonly_fields = ("created_at", "reviewed_at")
     fieldsets = (
@@ -96,6 +99,10 @@ class CustomUserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser', 'get_groups')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups')
     search_fields = ('username', 'email', 'first_name', 'last_name')
+
+    def get_queryset(self, request):
+        # get_groups reads every listed user's groups
+        return super().get_queryset(request).prefetch_related('groups')
     
     def get_groups(self, obj):
         """Display groups for a user"""
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ValuesConfig(AppConfig):
     name = 'values'
+
+    def ready(self):
+        from . import checks  # noqa: F401
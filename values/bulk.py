@@ -0,0 +1,53 @@
+"""
+Set-based bulk writes.
+
+QuerySet.bulk_update() emits a CASE WHEN per field per row, and building those
+expressions costs Django seconds once there are a few thousand rows.
+``update_from_values`` joins the table against a VALUES list instead
+(``UPDATE ... FROM``, PostgreSQL and SQLite 3.33+): one short statement per
+batch, with the work left to the database.
+"""
+from django.db import connections, router
+
+BATCH_SIZE = 1000
+
+
+def update_from_values(model, fields, rows, batch_size=BATCH_SIZE, using=None):
+    """Set ``fields`` on each row identified by pk; rows are ``(pk, *values)``.
+
+    Other backends fall back to bulk_update(). Returns the number of rows
+    updated. Like bulk_update(), it sends no signals and doesn't touch
+    auto_now fields.
+    """
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    opts = model._meta
+    targets = [opts.get_field(name) for name in fields]
+    if connection.vendor not in ("postgresql", "sqlite"):
+        objs = [model(pk=row[0], **dict(zip(fields, row[1:]))) for row in rows]
+        return model._base_manager.using(using).bulk_update(objs, fields, batch_size=batch_size)
+
+    qn = connection.ops.quote_name
+    columns = [opts.pk, *targets]
+    # Casts give every VALUES column its field's type, even when a batch is all NULL
+    placeholder = "(" + ", ".join(f"CAST(%s AS {field.cast_db_type(connection)})" for field in columns) + ")"
+    assignments = ", ".join(
+        f"{qn(field.column)} = v.column{index}" for index, field in enumerate(targets, start=2)
+    )
+    table = qn(opts.db_table)
+    updated = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f"UPDATE {table} SET {assignments} "
+                f"FROM (VALUES {', '.join([placeholder] * len(batch))}) AS v "
+                f"WHERE {table}.{qn(opts.pk.column)} = v.column1",
+                [
+                    field.get_db_prep_save(value, connection)
+                    for row in batch
+                    for field, value in zip(columns, row)
+                ],
+            )
+            updated += cursor.rowcount
+    return updated
@@ -0,0 +1,280 @@
+"""
+Process-local snapshot of the item catalog.
+
+The catalog is small (a few hundred rows at most) and only changes through the
+admin, item editing and value request approval, so read-heavy endpoints serve
+it from an immutable in-memory snapshot instead of querying on every request.
+Each process rebuilds its snapshot when the shared catalog version, bumped by
+the Item/Category signal handlers in models.py, no longer matches the version
+the snapshot was built from.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import uuid
+from collections import namedtuple
+from functools import cached_property
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG_VERSION_KEY = "values:catalog_version"
+
+# How far before a delta's stamp changes_since() looks, in microseconds
+DELTA_OVERLAP_US = 60 * 1_000_000
+# Per-item image digests of recent snapshots, for deltas across image rebuilds
+CATALOG_IMAGES_KEY = "values:catalog_images"
+CATALOG_IMAGES_TIMEOUT = 30 * 24 * 60 * 60
+
+# Sort orders supported by the items API, mapped to their key functions.
+SORT_KEYS = {
+    "name": lambda item: (item.name,),
+    "value_desc": lambda item: (-item.value, item.name),
+    "value_asc": lambda item: (item.value, item.name),
+    "rarity": lambda item: (item.rarity_rank, item.name),
+}
+
+
+def get_catalog_version():
+    """Return the current shared catalog version token."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    # Versions only need to be unique, not ordered, so concurrent bumps from
+    # different processes can't collide the way a shared counter reset could.
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def catalog_changed():
+    """Invalidate every process's snapshot after an Item/Category write.
+
+    The version is bumped immediately and again once the surrounding
+    transaction commits, so a snapshot rebuilt from uncommitted-away data in
+    between is never kept.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+class CatalogItem(
+    namedtuple(
+        "CatalogItem",
+        [
+            "id",
+            "name",
+            "slug",
+            "value",
+            "image_url",
+            "image_srcset",
+            "sprite",
+            "category",
+            "category_slug",
+            "category_color",
+            "rarity",
+            "rarity_key",
+            "rarity_rank",
+            "demand",
+            "notes",
+            "changed_at",
+        ],
+    )
+):
+    __slots__ = ()
+
+    def as_dict(self):
+        """Serialize the entry the way the items API emits it."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "slug": self.slug,
+            "value": self.value,
+            "image_url": self.image_url,
+            "image_srcset": self.image_srcset,
+            "sprite": self.sprite,
+            "category": self.category,
+            "category_color": self.category_color,
+            "rarity": self.rarity,
+            "rarity_key": self.rarity_key,
+        }
+
+    def as_catalog_dict(self):
+        """Serialize the entry with the extra fields client-side filtering needs."""
+        data = self.as_dict()
+        data["category_slug"] = self.category_slug
+        data["notes"] = self.notes
+        return data
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog with every supported sort precomputed.
+
+    ``stamp`` identifies the snapshot's content for delta updates: the latest
+    item/category change time plus a hash of the image fields, which change
+    when derivatives or sprite sheets are rebuilt without touching any row.
+    Each snapshot's per-item image digests are kept in the shared cache under
+    that hash, so a delta can also pick out the entries whose images changed
+    since a client's stamp (and a deleted item doesn't force a full refetch).
+    """
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = tuple(items)
+        self.by_id = {item.id: item for item in self.items}
+        self.by_slug = {item.slug: item for item in self.items}
+        self.orders = {
+            sort: tuple(sorted(self.items, key=key)) for sort, key in SORT_KEYS.items()
+        }
+
+    def __len__(self):
+        return len(self.items)
+
+    @cached_property
+    def image_digests(self):
+        """{item id: digest of its image fields}."""
+        digests = {}
+        for item in self.items:
+            images = json.dumps([item.image_url, item.image_srcset, item.sprite])
+            digests[item.id] = hashlib.sha256(images.encode()).hexdigest()[:12]
+        return digests
+
+    @cached_property
+    def images_key(self):
+        digests = sorted(self.image_digests.items())
+        return hashlib.sha256(json.dumps(digests).encode()).hexdigest()[:12]
+
+    def remember_images(self):
+        """Keep image_digests in the shared cache for changes_since() on later snapshots."""
+        cache.add(f"{CATALOG_IMAGES_KEY}:{self.images_key}", self.image_digests, CATALOG_IMAGES_TIMEOUT)
+
+    @cached_property
+    def stamp(self):
+        changed_at = max((item.changed_at for item in self.items), default=0)
+        return f"{changed_at}.{self.images_key}"
+
+    def changes_since(self, stamp):
+        """Entries changed after the snapshot ``stamp`` was taken from, by name.
+
+        Entries whose image fields differ from the stamp's are included too.
+        Returns None when a delta can't be computed (malformed stamp, or its
+        image digests have expired from the cache) and the client should
+        refetch.
+        """
+        changed_at, _, images_key = (stamp or "").partition(".")
+        if not changed_at.isdigit():
+            return None
+        previous = None
+        if images_key != self.images_key:
+            previous = cache.get(f"{CATALOG_IMAGES_KEY}:{images_key}")
+            if previous is None:
+                return None
+        # Writes commit in a different order than their timestamps, so
+        # overlap a little; resending a few unchanged entries is harmless
+        since = int(changed_at) - DELTA_OVERLAP_US
+        digests = self.image_digests
+        return [
+            item
+            for item in self.orders["name"]
+            if item.changed_at > since or (previous is not None and previous.get(item.id) != digests[item.id])
+        ]
+
+    @cached_property
+    def payload(self):
+        """The whole catalog as JSON bytes, serialized once per snapshot."""
+        data = {
+            "stamp": self.stamp,
+            "items": [item.as_catalog_dict() for item in self.orders["name"]],
+        }
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    @cached_property
+    def payload_gzip(self):
+        # mtime=0 keeps the compressed bytes identical across processes
+        return gzip.compress(self.payload, compresslevel=9, mtime=0)
+
+    @cached_property
+    def etag(self):
+        return hashlib.sha256(self.payload).hexdigest()[:32]
+
+    @cached_property
+    def by_name(self):
+        """Entries keyed by search.normalize_name of their name."""
+        from .search import normalize_name
+
+        return {normalize_name(item.name): item for item in self.items}
+
+    @cached_property
+    def name_index(self):
+        """Trigram/prefix index over item names for fuzzy suggestions."""
+        from .search import TrigramIndex
+
+        return TrigramIndex((item.id, item.name) for item in self.items)
+
+    def filter(self, category=None, rarity=None, sort="name", ids=None):
+        """Return matching entries in the requested order (name by default).
+
+        ``ids`` restricts the result to those item ids.
+        """
+        if ids is not None:
+            ids = set(ids)
+        return [
+            item
+            for item in self.orders.get(sort, self.orders["name"])
+            if (ids is None or item.id in ids)
+            and (not category or item.category_slug == category)
+            and (not rarity or item.rarity_key == rarity)
+        ]
+
+
+def build_snapshot(version):
+    from .images import get_sprite, get_srcsets
+    from .media import hashed_media_url
+    from .models import Item
+
+    items = []
+    for item in Item.objects.select_related("category").order_by("name"):
+        items.append(
+            CatalogItem(
+                id=item.id,
+                name=item.name,
+                slug=item.slug,
+                value=item.value,
+                image_url=hashed_media_url(item.image_url),
+                # WebP works in every browser's <img srcset>, unlike AVIF
+                image_srcset=get_srcsets(item.image_url).get("webp", ""),
+                sprite=get_sprite(item.image_url),
+                category=item.category.name,
+                category_slug=item.category.slug,
+                category_color=item.category.color,
+                rarity=item.get_rarity_display(),
+                rarity_key=item.rarity,
+                rarity_rank=item.rarity_rank,
+                demand=item.demand,
+                notes=item.notes,
+                changed_at=int(max(item.updated_at, item.category.updated_at).timestamp() * 1_000_000),
+            )
+        )
+    return CatalogSnapshot(version, items)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return this process's catalog snapshot, rebuilding it if it is stale."""
+    global _snapshot
+    version = get_catalog_version()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _snapshot_lock:
+            snapshot = _snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = _snapshot = build_snapshot(version)
+                snapshot.remember_images()
+    return snapshot
@@ -0,0 +1,392 @@
+"""
+Catalog import and export, for ``manage.py catalog_export`` / ``catalog_import``.
+
+A catalog file has one record per item, keyed by slug, with the category given
+by its slug. CSV, JSON Lines and a JSON array are supported; everything but
+reading a JSON array streams, so exports never hold the catalog in memory.
+Trend, volatility and moving average are derived by ``compute_trends`` and
+aren't part of the format.
+
+``diff_catalog`` validates the records and compares them with the current
+catalog in memory (one query for categories, one for items). Records may be
+partial: a file with just ``slug,value`` columns re-prices the items it lists
+and leaves every other field alone. ``apply_diff`` then writes the whole diff
+in one transaction: bulk_create for new items, one UPDATE ... FROM (VALUES ...)
+per thousand changed rows, and one delete for removed items.
+
+Bulk writes send no signals, so apply_diff does what the Item receivers in
+models.py would: value history, the SQLite FTS index, inventory portfolios,
+image derivatives and the catalog snapshot. Unlike the receivers, which hand
+image work to a background thread (``refresh_images_later``), it builds images
+before returning: only ``catalog_import`` changes image URLs through it, and
+there's no request to hold up there.
+"""
+import csv
+import json
+import threading
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import BooleanField
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .bulk import update_from_values
+from .catalog import catalog_changed
+from .history import record_snapshots
+from .models import Category, Item
+from .portfolio import rebuild_portfolios, reprice_portfolios
+from .search import index_items
+
+FORMATS = ("csv", "jsonl", "json")
+FIELDS = (
+    "slug",
+    "name",
+    "category",
+    "item_type",
+    "rarity",
+    "value",
+    "demand",
+    "is_limited",
+    "featured",
+    "obtained_from",
+    "image_url",
+    "notes",
+)
+# Fields a record for a new item must have; the rest take the model defaults
+REQUIRED_FIELDS = ("name", "category", "value")
+DEMAND_RANGE = (1, 10)
+SEARCH_FIELDS = ("name", "obtained_from", "notes")
+
+BOOLEANS = {"true": True, "yes": True, "1": True, "false": False, "no": False, "0": False, "": False}
+
+
+class CatalogFormatError(ValueError):
+    """A catalog file that can't be imported; ``errors`` lists every problem found."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid record(s)")
+
+
+def detect_format(path):
+    """The format implied by a file name's extension, or None."""
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    if extension == "ndjson":
+        return "jsonl"
+    return extension if extension in FORMATS else None
+
+
+class _Echo:
+    # csv.writer only needs write(); returning the line lets rows be yielded
+    def write(self, value):
+        return value
+
+
+def export_rows():
+    """Every item as a tuple of FIELDS, by name, streamed from one query."""
+    columns = ["category__slug" if name == "category" else name for name in FIELDS]
+    return Item.objects.order_by("name").values_list(*columns).iterator(chunk_size=2000)
+
+
+def export_lines(fmt):
+    """Yield the catalog serialized as ``fmt``, a line (or a few) at a time."""
+    rows = export_rows()
+    if fmt == "csv":
+        writer = csv.writer(_Echo(), lineterminator="\n")
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n"
+    else:
+        separator = "[\n"
+        for row in rows:
+            yield separator + json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False)
+            separator = ",\n"
+        yield "[]\n" if separator == "[\n" else "\n]\n"
+
+
+def read_records(stream, fmt):
+    """Yield (line number, record dict) from a catalog file.
+
+    CSV and JSON Lines are read a line at a time; a JSON array is parsed
+    whole, and its records are numbered by position instead.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            if None in record:
+                raise CatalogFormatError([f"line {reader.line_num}: more values than header columns"])
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                yield number, _parse_json(line, f"line {number}")
+    else:
+        records = _parse_json(stream.read(), "file")
+        if not isinstance(records, list):
+            raise CatalogFormatError(["file: expected a JSON array of records"])
+        yield from enumerate(records, start=1)
+
+
+def _parse_json(text, where):
+    try:
+        return json.loads(text)
+    except ValueError as exc:
+        raise CatalogFormatError([f"{where}: invalid JSON ({exc})"])
+
+
+def clean_record(record, categories):
+    """Validate one record into Item field values (category as category_id).
+
+    Only the fields present in the record are returned. A record without a
+    slug gets one from its name, as Item.save() would. Raises ValidationError.
+    """
+    if not isinstance(record, dict):
+        raise ValidationError("expected an object of item fields")
+    unknown = sorted(set(record) - set(FIELDS))
+    if unknown:
+        raise ValidationError(f"unknown field(s): {', '.join(unknown)}")
+
+    values = {}
+    for name, raw in record.items():
+        if name == "category":
+            slug = str(raw or "").strip()
+            if slug not in categories:
+                raise ValidationError(f"category: unknown category {slug!r}")
+            values["category_id"] = categories[slug]
+            continue
+        if name == "slug" and not raw:
+            # Derived from the name below
+            continue
+        field = Item._meta.get_field(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+            if isinstance(field, BooleanField):
+                if raw.lower() not in BOOLEANS:
+                    raise ValidationError(f"{name}: expected true or false, got {raw!r}")
+                raw = BOOLEANS[raw.lower()]
+        elif raw is None and field.get_internal_type() in ("CharField", "TextField", "SlugField"):
+            raw = ""
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as exc:
+            raise ValidationError(f"{name}: {' '.join(exc.messages)}")
+
+    if "demand" in values and not DEMAND_RANGE[0] <= values["demand"] <= DEMAND_RANGE[1]:
+        raise ValidationError(f"demand: must be between {DEMAND_RANGE[0]} and {DEMAND_RANGE[1]}")
+    if not values.get("slug"):
+        if not values.get("name"):
+            raise ValidationError("slug: a record needs a slug or a name")
+        values["slug"] = slugify(values["name"])
+        if not values["slug"]:
+            raise ValidationError("slug: can't derive a slug from the name")
+    return values
+
+
+class CatalogDiff:
+    """What importing a catalog file would change.
+
+    ``created`` holds unsaved Items, ``updated`` (item, changes) pairs where
+    changes maps each changed field to its (old, new) value, and ``deleted``
+    the items missing from the file (only with delete_missing).
+    """
+
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.deleted = []
+        self.unchanged = 0
+
+    def __bool__(self):
+        return bool(self.created or self.updated or self.deleted)
+
+
+def diff_catalog(records, delete_missing=False):
+    """Compare (line number, record) pairs with the current catalog.
+
+    Every record is checked before anything is reported, and a
+    CatalogFormatError lists all the problems at once.
+    """
+    categories = dict(Category.objects.values_list("slug", "id"))
+    category_slugs = {pk: slug for slug, pk in categories.items()}
+    current = {
+        item.slug: item
+        for item in Item.objects.only(*FIELDS, "trend")
+    }
+
+    diff = CatalogDiff()
+    errors = []
+    seen = {}
+    for number, record in records:
+        try:
+            values = clean_record(record, categories)
+        except ValidationError as exc:
+            errors.append(f"line {number}: {' '.join(exc.messages)}")
+            continue
+        slug = values["slug"]
+        if slug in seen:
+            errors.append(f"line {number}: duplicate slug {slug!r} (first on line {seen[slug]})")
+            continue
+        seen[slug] = number
+
+        item = current.get(slug)
+        if item is None:
+            missing = [name for name in REQUIRED_FIELDS if name not in values and f"{name}_id" not in values]
+            if missing:
+                errors.append(f"line {number}: new item {slug!r} needs {', '.join(missing)}")
+                continue
+            item = Item(**values)
+            item.rarity_rank = Item.RARITY_RANKS.get(item.rarity, len(Item.RARITY_RANKS))
+            # Start the moving average at the value, as migration 0024 did
+            item.moving_average = item.value
+            diff.created.append(item)
+            continue
+
+        changes = {}
+        for name, new in values.items():
+            old = getattr(item, name)
+            if old != new:
+                if name == "category_id":
+                    changes["category"] = (category_slugs[old], category_slugs[new])
+                else:
+                    changes[name] = (old, new)
+                setattr(item, name, new)
+        if changes:
+            diff.updated.append((item, changes))
+        else:
+            diff.unchanged += 1
+
+    if delete_missing:
+        diff.deleted = [item for slug, item in current.items() if slug not in seen]
+
+    # Names are unique too; check the catalog as it would be after the import
+    deleted = {item.pk for item in diff.deleted}
+    names = {}
+    for item in [*current.values(), *diff.created]:
+        if item.pk in deleted:
+            continue
+        if item.name in names:
+            line = seen.get(item.slug) or seen.get(names[item.name])
+            errors.append(f"line {line}: name {item.name!r} is used by both {names[item.name]!r} and {item.slug!r}")
+        names[item.name] = item.slug
+
+    if errors:
+        raise CatalogFormatError(errors)
+    return diff
+
+
+def apply_diff(diff, now=None):
+    """Write a CatalogDiff in one transaction and refresh what depends on it."""
+    now = now or timezone.now()
+    created = list(diff.created)
+    updated = [item for item, _ in diff.updated]
+    fields = {name for _, changes in diff.updated for name in changes}
+    if "rarity" in fields:
+        for item in updated:
+            item.rarity_rank = Item.RARITY_RANKS.get(item.rarity, len(Item.RARITY_RANKS))
+        fields.add("rarity_rank")
+    # Delta downloads of the catalog go by updated_at, which bulk writes skip
+    fields = sorted(fields) + ["updated_at"] if fields else []
+
+    with transaction.atomic(savepoint=False):
+        if diff.deleted:
+            Item.objects.filter(pk__in=[item.pk for item in diff.deleted]).delete()
+        if created:
+            created = Item.objects.bulk_create(created)
+        if updated:
+            attnames = [Item._meta.get_field(name).attname for name in fields]
+            for item in updated:
+                item.updated_at = now
+            update_from_values(
+                Item, fields, [(item.pk, *(getattr(item, name) for name in attnames)) for item in updated]
+            )
+
+        # What the post_save receivers would have done item by item
+        repriced = [
+            item for item, changes in diff.updated if any(name in changes for name in Item.HISTORY_FIELDS)
+        ]
+        record_snapshots([*created, *repriced], recorded_at=now)
+        index_items(
+            [*created, *(item for item, changes in diff.updated if any(name in changes for name in SEARCH_FIELDS))]
+        )
+        moved = [item.pk for item, changes in diff.updated if "category" in changes]
+        reprice_portfolios(
+            {
+                item.pk: (item.category_id, changes["value"][1] - changes["value"][0])
+                for item, changes in diff.updated
+                if "value" in changes and "category" not in changes
+            }
+        )
+        if moved:
+            rebuild_portfolios(holders=moved)
+        catalog_changed()
+
+    image_urls = {item.image_url for item in created if item.image_url}
+    image_urls.update(changes["image_url"][1] for _, changes in diff.updated if changes.get("image_url", ("", ""))[1])
+    if image_urls:
+        refresh_images(image_urls)
+
+
+def refresh_images(image_urls):
+    """Build derivatives for new image URLs and repack the sprites if needed."""
+    from .images import build_lock, build_sprites, get_sprites, update_derivatives
+
+    with build_lock():
+        changed = update_derivatives(image_urls)
+        if not image_urls <= set(get_sprites().get("images", {})):
+            every_url = Item.objects.exclude(image_url="").values_list("image_url", flat=True)
+            changed = build_sprites(every_url) or changed
+    if changed:
+        # The snapshot may have been rebuilt before the new srcset/sprite existed
+        catalog_changed()
+
+
+# Image URLs waiting for this process's refresh thread, which runs while
+# there are any
+_pending = set()
+_pending_lock = threading.Lock()
+_worker = None
+
+
+def refresh_images_later(image_urls):
+    """Have this process's refresh thread build images once the current transaction commits.
+
+    Best-effort: it keeps image work off the request that saved the item, and
+    one thread per process works through the URLs queued meanwhile, but
+    anything still queued when the worker is recycled is lost. Pages use the
+    original image until a build finishes, and ``manage.py
+    build_image_derivatives`` builds whatever was missed.
+    """
+    from .images import available_formats
+
+    if not available_formats():
+        return
+    image_urls = set(image_urls)
+    transaction.on_commit(lambda: _queue_refresh(image_urls))
+
+
+def _queue_refresh(image_urls):
+    global _worker
+    with _pending_lock:
+        _pending.update(image_urls)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_refresh_pending, daemon=True)
+            _worker.start()
+
+
+def _refresh_pending():
+    global _worker
+    try:
+        while True:
+            with _pending_lock:
+                if not _pending:
+                    _worker = None
+                    return
+                image_urls = set(_pending)
+                _pending.clear()
+            refresh_images(image_urls)
+    finally:
+        connection.close()
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends whose entries only the process that wrote them can see
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Catalog versions, index generations and cached pages must reach every worker."""
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if settings.DEBUG or getattr(settings, "ALLOW_LOCAL_CACHE", False) or backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [
+        Warning(
+            f"The default cache ({backend}) isn't shared between processes.",
+            hint=(
+                "Each worker would keep serving its own stale catalog snapshot and pages. "
+                "Set REDIS_URL, or ALLOW_LOCAL_CACHE=True if the site runs a single process."
+            ),
+            id="values.W001",
+        )
+    ]
@@ -15,7 +15,6 @@ class ItemForm(forms.ModelForm):
             "rarity",
             "value",
             "demand",
-            "trend",
             "is_limited",
             "featured",
             "obtained_from",
@@ -29,7 +28,6 @@ class ItemForm(forms.ModelForm):
             "rarity": forms.Select(attrs={}),
             "value": forms.NumberInput(attrs={}),
             "demand": forms.NumberInput(attrs={"min": 1, "max": 10}),
-            "trend": forms.Select(attrs={}),
             "is_limited": forms.CheckboxInput(attrs={}),
             "featured": forms.CheckboxInput(attrs={}),
             "obtained_from": forms.TextInput(attrs={}),
@@ -73,3 +71,36 @@ class ValueChangeRequestForm(forms.ModelForm):
             "requested_value": "New Value",
             "reason": "Reason for Change",
         }
+
+
+class InventoryImportForm(forms.Form):
+    MAX_FILE_SIZE = 512 * 1024
+
+    MODE_CHOICES = [
+        ("set", "Set my quantities to the imported ones"),
+        ("add", "Add the imported quantities to what I have"),
+    ]
+
+    text = forms.CharField(
+        required=False,
+        label="Paste your items",
+        widget=forms.Textarea(
+            attrs={"rows": 12, "class": "form-control", "placeholder": "Dragon Bone x3\nSplit Soul\n2x Cursed Cloth"}
+        ),
+    )
+    file = forms.FileField(required=False, label="Or upload a .txt or .csv file")
+    mode = forms.ChoiceField(choices=MODE_CHOICES, initial="set", widget=forms.RadioSelect)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get("file")
+        if upload:
+            if upload.size > self.MAX_FILE_SIZE:
+                raise forms.ValidationError("That file is too large (512 KB at most).")
+            try:
+                cleaned_data["text"] = upload.read().decode("utf-8-sig")
+            except UnicodeDecodeError:
+                raise forms.ValidationError("The file must be UTF-8 text or CSV.")
+        if not cleaned_data.get("text", "").strip():
+            raise forms.ValidationError("Paste a list of items or choose a file.")
+        return cleaned_data
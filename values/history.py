@@ -0,0 +1,109 @@
+"""
+Item value history.
+
+ItemValueSnapshot rows form a step series per item: each row holds from its
+recorded_at until the next one. ``get_series`` reads a date range with one
+index range scan on (item, recorded_at), plus a lookup of the row in force at
+the start, and downsamples it to at most ``points`` buckets. Each bucket keeps
+its last value (what was in force at the bucket's end) along with its minimum
+and maximum, so short spikes survive downsampling.
+"""
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ItemValueSnapshot
+
+DEFAULT_POINTS = 120
+MAX_POINTS = 1000
+FIELDS = ("recorded_at", "value", "demand", "trend")
+DEFAULT_RANGE = datetime.timedelta(days=90)
+
+
+def record_snapshots(items, recorded_at=None):
+    """Append the current value, demand and trend of each item.
+
+    Signals don't fire for QuerySet.update() or bulk_update(), so code that
+    changes values in bulk calls this with the changed items.
+    """
+    recorded_at = recorded_at or timezone.now()
+    return ItemValueSnapshot.objects.bulk_create(
+        ItemValueSnapshot(
+            item_id=item.pk,
+            recorded_at=recorded_at,
+            value=item.value,
+            demand=item.demand,
+            trend=item.trend,
+        )
+        for item in items
+    )
+
+
+def parse_bound(text, end=False):
+    """Parse an ISO date or datetime range bound; a date as an end covers that day.
+
+    Returns None for an empty bound and raises ValueError for a malformed one.
+    """
+    if not text:
+        return None
+    moment = parse_datetime(text)
+    if moment is None:
+        day = parse_date(text)
+        if day is None:
+            raise ValueError(f"Invalid date {text!r}")
+        moment = datetime.datetime.combine(day + datetime.timedelta(days=1) if end else day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def point(row, **extra):
+    recorded_at, value, demand, trend = row
+    return {
+        "t": recorded_at.isoformat(),
+        "value": value,
+        "demand": demand,
+        "trend": trend,
+        "min": value,
+        "max": value,
+        **extra,
+    }
+
+
+def get_series(item_id, start, end, points=DEFAULT_POINTS):
+    """Points describing an item's history between start and end.
+
+    The first point is the value in force at ``start`` (when the item has any
+    earlier history), followed by the changes in the range: as-is when there
+    are at most ``points`` of them, otherwise one point per equal-width bucket
+    that saw a change.
+    """
+    snapshots = ItemValueSnapshot.objects.filter(item_id=item_id)
+    before = (
+        snapshots.filter(recorded_at__lt=start).order_by("-recorded_at").values_list(*FIELDS).first()
+    )
+    rows = list(
+        snapshots.filter(recorded_at__gte=start, recorded_at__lte=end)
+        .order_by("recorded_at")
+        .values_list(*FIELDS)
+    )
+
+    series = []
+    if before is not None:
+        series.append(point((start, *before[1:])))
+    if len(rows) <= points:
+        series.extend(point(row) for row in rows)
+        return series
+
+    width = (end - start) / points
+    bucket = None
+    for row in rows:
+        index = min(points - 1, int((row[0] - start) / width))
+        if bucket is not None and bucket[0] == index:
+            current = bucket[1]
+            current.update(point(row, min=min(current["min"], row[1]), max=max(current["max"], row[1])))
+        else:
+            bucket = (index, point(row))
+            series.append(bucket[1])
+    return series
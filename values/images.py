@@ -0,0 +1,431 @@
+"""
+Resized WebP/AVIF derivatives of the item images under MEDIA_ROOT.
+
+For each image referenced by Item.image_url the pipeline writes one file per
+width in DERIVATIVE_WIDTHS (plus the original width) and format to
+MEDIA_ROOT/derived/<digest>/<width>.<format>. The digest covers the source
+bytes and PIPELINE_VERSION, so replacing an image or changing the pipeline
+yields new URLs and nothing has to be purged. A manifest maps each image_url to
+its digest and widths; templates (the ``picture`` tag) and the items API read
+it to emit ``srcset`` attributes, falling back to the original image for
+anything not in it.
+
+The same step packs a thumbnail of every item image into a few sprite sheets
+(media/derived/sprites/, named by content hash) with a JSON manifest of each
+image's cell, so the calculator's picker loads one image instead of hundreds.
+Shared trade preview cards (``render_trade_card``) reuse those cells for their
+thumbnails.
+
+Derivatives and sprites are generated by ``manage.py build_image_derivatives``
+and, best-effort, by a background thread in the web process after an Item
+save that changes image_url commits (see catalog_io.refresh_images_later);
+both hold ``build_lock`` while building. Pillow is optional:
+without it nothing is generated and pages keep using the original images.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import unquote
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, features
+except ImportError:
+    Image = None
+
+# Bump when widths, formats or encoder settings change
+PIPELINE_VERSION = "1"
+DERIVATIVE_WIDTHS = (64, 128, 256)
+DERIVED_DIR = "derived"
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".build.lock"
+
+# Thumbnail sprite sheets for the calculator's item picker: cells are twice
+# the 60px the picker shows, so they stay sharp on high-density screens
+SPRITE_CELL = 120
+SPRITE_COLUMNS = 16
+SPRITE_ROWS = 16
+SPRITES_DIR = "sprites"
+SPRITES_NAME = "sprites.json"
+
+# Encoder options per format, preferred format first
+FORMATS = {
+    "avif": {"quality": 60},
+    "webp": {"quality": 80, "method": 6},
+}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def available_formats():
+    if Image is None:
+        return []
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+
+def derived_root():
+    return os.path.join(settings.MEDIA_ROOT, DERIVED_DIR)
+
+
+def manifest_path():
+    return os.path.join(derived_root(), MANIFEST_NAME)
+
+
+def source_path(image_url):
+    """Return the file under MEDIA_ROOT that image_url points at, or None."""
+    if not image_url or not image_url.startswith(settings.MEDIA_URL):
+        return None
+    relative = unquote(image_url[len(settings.MEDIA_URL):])
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(root, relative))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+_json_files = {}
+_manifest_lock = threading.Lock()
+
+
+def read_json(path):
+    """Return the JSON object in path, re-reading it only after it changes on disk."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    cached = _json_files.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(path) as fh:
+                cached = _json_files[path] = (mtime, json.load(fh))
+        except (OSError, ValueError):
+            return {}
+    return cached[1]
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".json")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(data, fh, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def build_lock():
+    """Hold an exclusive lock on MEDIA_ROOT/derived/ across processes.
+
+    update_derivatives and build_sprites read the manifests, build and write
+    them back, so two processes building at once would drop each other's
+    entries; catalog_io.refresh_images and build_image_derivatives hold this
+    around them.
+    """
+    os.makedirs(derived_root(), exist_ok=True)
+    with open(os.path.join(derived_root(), LOCK_NAME), "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def get_manifest():
+    return read_json(manifest_path())
+
+
+def save_manifest(entries):
+    write_json(manifest_path(), entries)
+
+
+def derivative_url(digest, width, fmt):
+    return f"{settings.MEDIA_URL}{DERIVED_DIR}/{digest}/{width}.{fmt}"
+
+
+def build_derivatives(image_url):
+    """Write the derivatives for one image and return its manifest entry.
+
+    Returns None when the image isn't a local file Pillow can read.
+    """
+    formats = available_formats()
+    path = source_path(image_url)
+    if not formats or path is None:
+        return None
+
+    with open(path, "rb") as fh:
+        data = fh.read()
+    digest = hashlib.sha256(data + PIPELINE_VERSION.encode()).hexdigest()[:24]
+    directory = os.path.join(derived_root(), digest)
+    try:
+        with Image.open(path) as source:
+            source.load()
+            image = source.convert("RGBA")
+    except (OSError, ValueError):
+        return None
+
+    widths = sorted({w for w in DERIVATIVE_WIDTHS if w < image.width} | {image.width})
+    os.makedirs(directory, exist_ok=True)
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            target = os.path.join(directory, f"{width}.{fmt}")
+            if not os.path.exists(target):
+                resized.save(target, fmt.upper(), **FORMATS[fmt])
+    return {"digest": digest, "widths": widths, "formats": formats}
+
+
+def update_derivatives(image_urls):
+    """Build derivatives for the given image URLs and record them in the manifest.
+
+    Returns the number of URLs whose manifest entry changed.
+    """
+    with _manifest_lock:
+        manifest = dict(get_manifest())
+        changed = 0
+        for image_url in set(image_urls):
+            entry = build_derivatives(image_url)
+            if entry is not None and manifest.get(image_url) != entry:
+                manifest[image_url] = entry
+                changed += 1
+        if changed:
+            save_manifest(manifest)
+    return changed
+
+
+def get_srcsets(image_url):
+    """Return {format: srcset} for image_url, best format first ({} if none)."""
+    entry = get_manifest().get(image_url)
+    if not entry:
+        return {}
+    return {
+        fmt: ", ".join(
+            f"{derivative_url(entry['digest'], width, fmt)} {width}w" for width in entry["widths"]
+        )
+        for fmt in entry["formats"]
+    }
+
+
+def sprites_path():
+    return os.path.join(derived_root(), SPRITES_NAME)
+
+
+def get_sprites():
+    """Return the sprite manifest: {"sheets": [...], "images": {image_url: [sheet, column, row]}}."""
+    return read_json(sprites_path())
+
+
+def sprite_key(image_urls):
+    """Fingerprint of the images a set of sheets was packed from."""
+    digest = hashlib.sha256(f"{PIPELINE_VERSION}:{SPRITE_CELL}:{SPRITE_COLUMNS}".encode())
+    for image_url in sorted(image_urls):
+        path = source_path(image_url)
+        if path is not None:
+            stat = os.stat(path)
+            digest.update(f"{image_url}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:24]
+
+
+def build_sprites(image_urls):
+    """Pack thumbnails of image_urls into WebP sprite sheets and write the manifest.
+
+    Returns False (and leaves the current sheets alone) when the set of images
+    hasn't changed since the last build or WebP isn't available.
+    """
+    if "webp" not in available_formats():
+        return False
+    image_urls = sorted(url for url in set(image_urls) if source_path(url))
+    key = sprite_key(image_urls)
+    with _manifest_lock:
+        if get_sprites().get("key") == key:
+            return False
+
+        per_sheet = SPRITE_COLUMNS * SPRITE_ROWS
+        sheets, positions = [], {}
+        for start in range(0, len(image_urls), per_sheet):
+            batch = image_urls[start:start + per_sheet]
+            rows = -(-len(batch) // SPRITE_COLUMNS)
+            sheet = Image.new("RGBA", (SPRITE_COLUMNS * SPRITE_CELL, rows * SPRITE_CELL))
+            for index, image_url in enumerate(batch):
+                column, row = index % SPRITE_COLUMNS, index // SPRITE_COLUMNS
+                try:
+                    with Image.open(source_path(image_url)) as source:
+                        thumb = source.convert("RGBA")
+                except (OSError, ValueError):
+                    continue
+                thumb.thumbnail((SPRITE_CELL, SPRITE_CELL), Image.LANCZOS)
+                # Centre in the cell, like object-fit: contain
+                sheet.paste(
+                    thumb,
+                    (
+                        column * SPRITE_CELL + (SPRITE_CELL - thumb.width) // 2,
+                        row * SPRITE_CELL + (SPRITE_CELL - thumb.height) // 2,
+                    ),
+                )
+                positions[image_url] = [len(sheets), column, row]
+
+            buffer = io.BytesIO()
+            sheet.save(buffer, "WEBP", **FORMATS["webp"])
+            data = buffer.getvalue()
+            name = f"{hashlib.sha256(data).hexdigest()[:24]}.webp"
+            target = os.path.join(derived_root(), SPRITES_DIR, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                with open(target, "wb") as fh:
+                    fh.write(data)
+            sheets.append(
+                {
+                    "url": f"{settings.MEDIA_URL}{DERIVED_DIR}/{SPRITES_DIR}/{name}",
+                    "columns": SPRITE_COLUMNS,
+                    "rows": rows,
+                }
+            )
+
+        write_json(sprites_path(), {"key": key, "sheets": sheets, "images": positions})
+    return True
+
+
+def get_sprite(image_url):
+    """Sprite sheet position of image_url for the items API, or None."""
+    sprites = get_sprites()
+    position = sprites.get("images", {}).get(image_url)
+    if position is None:
+        return None
+    sheet_index, column, row = position
+    sheet = sprites["sheets"][sheet_index]
+    return {
+        "sheet": sheet["url"],
+        "column": column,
+        "row": row,
+        "columns": sheet["columns"],
+        "rows": sheet["rows"],
+    }
+
+
+# Open Graph preview cards for shared trades
+CARD_SIZE = (1200, 630)
+CARD_ROWS = 5
+CARD_THUMB = 72
+CARD_BACKGROUND = (15, 15, 20)
+CARD_PANEL = (28, 28, 36)
+CARD_ACCENT = (220, 38, 38)
+CARD_TEXT = (240, 240, 245)
+CARD_MUTED = (150, 150, 165)
+CARD_WIN = (34, 197, 94)
+
+
+def sprite_thumbnail(sprite, sheets):
+    """Cut an item's cell out of its sprite sheet; sheets caches opened sheets."""
+    if not sprite:
+        return None
+    sheet = sheets.get(sprite["sheet"])
+    if sheet is None:
+        path = source_path(sprite["sheet"])
+        if path is None:
+            return None
+        try:
+            with Image.open(path) as source:
+                sheet = sheets[sprite["sheet"]] = source.convert("RGBA")
+        except (OSError, ValueError):
+            return None
+    left, top = sprite["column"] * SPRITE_CELL, sprite["row"] * SPRITE_CELL
+    return sheet.crop((left, top, left + SPRITE_CELL, top + SPRITE_CELL)).resize(
+        (CARD_THUMB, CARD_THUMB), Image.LANCZOS
+    )
+
+
+def format_value(value):
+    # Same abbreviation as the calculator
+    return f"{value / 1000:.1f}K" if value >= 1000 else str(value)
+
+
+def fit_text(draw, text, font, max_width):
+    """Truncate text with an ellipsis so it fits in max_width pixels."""
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_trade_card(sides, totals):
+    """Render a shared trade as a PNG preview card, or None without Pillow.
+
+    sides maps "offer"/"request" to (CatalogItem or None, quantity) pairs and
+    totals maps them to current values.
+    """
+    if Image is None:
+        return None
+    card = Image.new("RGB", CARD_SIZE, CARD_BACKGROUND)
+    draw = ImageDraw.Draw(card)
+    title_font = ImageFont.load_default(size=44)
+    heading_font = ImageFont.load_default(size=34)
+    row_font = ImageFont.load_default(size=28)
+    width, height = CARD_SIZE
+
+    draw.rectangle((0, 0, width, 8), fill=CARD_ACCENT)
+    draw.text((48, 36), "Cursed Values Trade", font=title_font, fill=CARD_TEXT)
+    difference = totals["request"] - totals["offer"]
+    if difference:
+        verdict = f"{'+' if difference > 0 else '-'}{format_value(abs(difference))}"
+        colour = CARD_WIN if difference > 0 else CARD_ACCENT
+    else:
+        verdict, colour = "Fair", CARD_MUTED
+    draw.text((width - 48, 36), verdict, font=title_font, fill=colour, anchor="ra")
+
+    sheets = {}
+    column_width = (width - 48 * 3) // 2
+    for index, (side, label) in enumerate((("offer", "Offer"), ("request", "Request"))):
+        left = 48 + index * (column_width + 48)
+        draw.rounded_rectangle((left, 120, left + column_width, height - 40), 16, fill=CARD_PANEL)
+        draw.text((left + 24, 140), label, font=heading_font, fill=CARD_TEXT)
+        draw.text(
+            (left + column_width - 24, 140),
+            format_value(totals[side]),
+            font=heading_font,
+            fill=CARD_ACCENT,
+            anchor="ra",
+        )
+        entries = sides[side]
+        shown = entries[:CARD_ROWS] if len(entries) <= CARD_ROWS else entries[: CARD_ROWS - 1]
+        top = 196
+        for item, quantity in shown:
+            thumb = sprite_thumbnail(item.sprite, sheets) if item else None
+            if thumb is not None:
+                card.paste(thumb, (left + 24, top), thumb)
+            name = item.name if item else "Removed item"
+            if quantity > 1:
+                name = f"{name} x{quantity}"
+            name = fit_text(draw, name, row_font, column_width - 136)
+            draw.text((left + 112, top + CARD_THUMB // 2), name, font=row_font, fill=CARD_TEXT, anchor="lm")
+            top += CARD_THUMB + 8
+        if len(shown) < len(entries):
+            draw.text(
+                (left + 24, top + CARD_THUMB // 2),
+                f"+{len(entries) - len(shown)} more",
+                font=row_font,
+                fill=CARD_MUTED,
+                anchor="lm",
+            )
+
+    buffer = io.BytesIO()
+    card.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,345 @@
+"""
+Inventory writes.
+
+Each change is a single atomic statement rather than a read-modify-write, so
+concurrent requests (a double-clicked Add button) can't lose updates:
+
+- adding upserts with INSERT ... ON CONFLICT (user, item) DO UPDATE SET
+  quantity = LEAST(quantity + EXCLUDED.quantity, MAX_QUANTITY) on PostgreSQL
+  and SQLite (which spells LEAST as MIN), and a Least(F("quantity") + n,
+  MAX_QUANTITY) UPDATE followed by an INSERT elsewhere;
+- setting a quantity upserts with bulk_create(update_conflicts=True);
+- removing is a DELETE (with RETURNING, to know what was removed).
+
+``apply_operations`` runs a batch of add/set/remove operations for one user in
+one transaction, with one statement per kind of operation. None of these send
+signals, so they keep the user's portfolio in step themselves (by the exact
+delta for a single add or remove, and by rebuilding it after a batch) and
+record the change for matchmaking's holder index.
+
+``read_import`` turns a pasted list ("Dragon Bone x3", one per line) or a CSV
+with name and quantity columns into operations. Names resolve against the
+catalog snapshot with no queries: exact normalized name, then slug, then the
+trigram index behind autocomplete.
+"""
+import csv
+import re
+from collections import namedtuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .matchmaking import note_inventory_changes
+from .models import InventoryItem
+from .portfolio import adjust_portfolio, rebuild_portfolios
+from .search import normalize_name
+from .trades import MAX_QUANTITY, resolve
+
+OPERATIONS = ("add", "set", "remove")
+MAX_OPERATIONS = 1000
+
+# Minimum suggest() score for an import line to match an item by similarity,
+# and how far it must lead the next best name so near-ties stay unmatched
+IMPORT_FUZZY_THRESHOLD = 0.6
+IMPORT_FUZZY_MARGIN = 0.1
+BULLET_RE = re.compile(r"^(?:[-*\u2022]+|\d+[.)])\s+")
+QUANTITY_PATTERNS = (
+    # Dragon Bone x3, Dragon Bone x 3, Dragon Bone *3
+    re.compile(r"^(?P<name>.+?)\s*[x\u00d7*]\s*(?P<quantity>\d+)$", re.IGNORECASE),
+    # Dragon Bone (3), Dragon Bone (x3)
+    re.compile(r"^(?P<name>.+?)\s*\(\s*[x\u00d7]?\s*(?P<quantity>\d+)\s*\)$", re.IGNORECASE),
+    # 3x Dragon Bone, 3 x Dragon Bone
+    re.compile(r"^(?P<quantity>\d+)\s*[x\u00d7*]\s+(?P<name>.+)$", re.IGNORECASE),
+    # Dragon Bone: 3, Dragon Bone - 3, Dragon Bone, 3, tab separated
+    re.compile(r"^(?P<name>.+?)\s*[:,;\t-]\s*(?P<quantity>\d+)$"),
+)
+CSV_NAME_COLUMNS = ("name", "item", "item name")
+CSV_QUANTITY_COLUMNS = ("quantity", "qty", "amount", "count")
+
+ImportLine = namedtuple("ImportLine", ["number", "text", "item", "quantity", "match", "error"])
+
+
+class InventoryError(ValueError):
+    pass
+
+
+def _increment_fallback(user_id, item_id, quantity, now):
+    entry = InventoryItem.objects.filter(user_id=user_id, item_id=item_id)
+    total = Least(F("quantity") + quantity, MAX_QUANTITY)
+    if entry.update(quantity=total):
+        return
+    try:
+        with transaction.atomic():
+            InventoryItem.objects.create(user_id=user_id, item_id=item_id, quantity=quantity, added_at=now)
+    except IntegrityError:
+        # Added by a concurrent request since the update
+        entry.update(quantity=total)
+
+
+def increment_items(user_id, quantities):
+    """Add ``quantities`` ({item id: n}) to a user's inventory, creating missing entries.
+
+    Quantities stop at MAX_QUANTITY. Returns the ids of the items that are at
+    MAX_QUANTITY afterwards, whose quantity may have grown by less than asked.
+    """
+    now = timezone.now()
+    rows = [
+        (user_id, item_id, min(quantity, MAX_QUANTITY), now) for item_id, quantity in quantities.items() if quantity > 0
+    ]
+    if not rows:
+        return set()
+    if connection.vendor not in ("postgresql", "sqlite"):
+        for row in rows:
+            _increment_fallback(*row)
+        return set(
+            InventoryItem.objects.filter(
+                user_id=user_id, item_id__in=[row[1] for row in rows], quantity__gte=MAX_QUANTITY
+            ).values_list("item_id", flat=True)
+        )
+
+    qn = connection.ops.quote_name
+    opts = InventoryItem._meta
+    fields = [opts.get_field(name) for name in ("user", "item", "quantity", "added_at")]
+    table = qn(opts.db_table)
+    user_column, item_column, quantity_column, _ = (qn(field.column) for field in fields)
+    placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    least = "LEAST" if connection.vendor == "postgresql" else "MIN"
+    batch_size = connection.ops.bulk_batch_size(fields, rows)
+    capped = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)}) "
+                f"VALUES {', '.join([placeholder] * len(batch))} "
+                f"ON CONFLICT ({user_column}, {item_column}) "
+                f"DO UPDATE SET {quantity_column} = "
+                f"{least}({table}.{quantity_column} + EXCLUDED.{quantity_column}, %s) "
+                f"RETURNING {item_column}, {quantity_column}",
+                [
+                    field.get_db_prep_save(value, connection)
+                    for row in batch
+                    for field, value in zip(fields, row)
+                ]
+                + [MAX_QUANTITY],
+            )
+            capped.update(item_id for item_id, quantity in cursor.fetchall() if quantity >= MAX_QUANTITY)
+    return capped
+
+
+def add_item(user, item, quantity=1):
+    """Add ``quantity`` of an Item to a user's inventory (one upsert)."""
+    with transaction.atomic(savepoint=False):
+        if increment_items(user.pk, {item.pk: quantity}):
+            # Capped at MAX_QUANTITY, so the delta isn't known
+            rebuild_portfolios(user_ids=[user.pk])
+        else:
+            adjust_portfolio(user.pk, item, quantity)
+        note_inventory_changes([user.pk])
+
+
+def _delete(where, params, returning=False):
+    table = connection.ops.quote_name(InventoryItem._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {where}" + (" RETURNING item_id, quantity" if returning else ""), params
+        )
+        return cursor.fetchall() if returning else cursor.rowcount
+
+
+def remove_entry(user, pk):
+    """Delete one of a user's inventory entries; returns False if it wasn't theirs."""
+    where, params = "id = %s AND user_id = %s", [pk, user.pk]
+    with transaction.atomic(savepoint=False):
+        if connection.vendor in ("postgresql", "sqlite"):
+            removed = _delete(where, params, returning=True)
+        else:
+            removed = list(
+                InventoryItem.objects.select_for_update().filter(pk=pk, user=user).values_list("item_id", "quantity")
+            )
+            _delete(where, params)
+        if not removed:
+            return False
+        item_id, quantity = removed[0]
+        adjust_portfolio(user.pk, item_id, -quantity)
+        note_inventory_changes([user.pk])
+    return True
+
+
+def parse_operations(catalog, operations):
+    """Validate a list of operations into (op, item id, quantity) tuples.
+
+    Each operation is ``{"op": "add" | "set" | "remove", "item": id or slug,
+    "quantity": n}``; quantity defaults to 1 for add and is ignored for remove,
+    and setting 0 removes the entry. Raises InventoryError listing every
+    problem.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise InventoryError("operations must be a non-empty list")
+    if len(operations) > MAX_OPERATIONS:
+        raise InventoryError(f"At most {MAX_OPERATIONS} operations per request")
+
+    parsed, errors = [], []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append(f"operations[{index}]: expected an object")
+            continue
+        op = operation.get("op", "add")
+        ref = operation.get("item")
+        quantity = operation.get("quantity", 1)
+        if op not in OPERATIONS:
+            errors.append(f"operations[{index}]: unknown op {op!r}, expected one of {', '.join(OPERATIONS)}")
+            continue
+        if isinstance(ref, bool) or not isinstance(ref, (int, str)) or ref == "":
+            errors.append(f"operations[{index}]: invalid item reference {ref!r}")
+            continue
+        item = resolve(catalog, ref)
+        if item is None:
+            errors.append(f"operations[{index}]: unknown item {ref!r}")
+            continue
+        if op == "remove":
+            parsed.append((op, item.id, 0))
+            continue
+        low = 1 if op == "add" else 0
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or not low <= quantity <= MAX_QUANTITY:
+            errors.append(f"operations[{index}]: invalid quantity for {ref!r}, expected {low}-{MAX_QUANTITY}")
+            continue
+        parsed.append((op, item.id, quantity))
+    if errors:
+        raise InventoryError("; ".join(errors))
+    return parsed
+
+
+def apply_operations(user, operations):
+    """Apply parsed operations in order, in one transaction.
+
+    Operations on the same item are combined first (a set followed by adds is
+    one set), so the batch costs one DELETE, one set upsert and one increment
+    upsert per batch of rows, plus the portfolio rebuild. Returns the counts
+    of items added to, set and removed.
+    """
+    final = {}
+    for op, item_id, quantity in operations:
+        kind, current = final.get(item_id, ("add", 0))
+        if op == "add":
+            final[item_id] = (kind, min(current + quantity, MAX_QUANTITY))
+        else:
+            final[item_id] = ("set", quantity if op == "set" else 0)
+
+    added = {item_id: quantity for item_id, (kind, quantity) in final.items() if kind == "add"}
+    quantities = {item_id: quantity for item_id, (kind, quantity) in final.items() if kind == "set" and quantity}
+    removed = [item_id for item_id, (kind, quantity) in final.items() if kind == "set" and not quantity]
+
+    with transaction.atomic():
+        if removed:
+            _delete(f"user_id = %s AND item_id IN ({', '.join(['%s'] * len(removed))})", [user.pk, *removed])
+        if quantities:
+            InventoryItem.objects.bulk_create(
+                [
+                    InventoryItem(user=user, item_id=item_id, quantity=quantity)
+                    for item_id, quantity in quantities.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "item"],
+                update_fields=["quantity"],
+            )
+        if added:
+            increment_items(user.pk, added)
+        rebuild_portfolios(user_ids=[user.pk])
+        note_inventory_changes([user.pk])
+    return {"added": len(added), "set": len(quantities), "removed": len(removed)}
+
+
+def resolve_name(catalog, name, fuzzy=True):
+    """Return (CatalogItem, how it matched) for an item name, or (None, None)."""
+    normalized = normalize_name(name)
+    if not normalized:
+        return None, None
+    item = catalog.by_name.get(normalized)
+    if item is not None:
+        return item, "name"
+    item = catalog.by_slug.get(slugify(name))
+    if item is not None:
+        return item, "slug"
+    if fuzzy:
+        matches = catalog.name_index.suggest(name, 2, threshold=IMPORT_FUZZY_THRESHOLD, prefixes=False)
+        if matches and (len(matches) == 1 or matches[0][1] - matches[1][1] >= IMPORT_FUZZY_MARGIN):
+            return catalog.by_id.get(matches[0][0]), "fuzzy"
+    return None, None
+
+
+def _csv_columns(header):
+    columns = [column.strip().casefold() for column in header]
+    name = next((i for i, column in enumerate(columns) if column in CSV_NAME_COLUMNS), None)
+    quantity = next((i for i, column in enumerate(columns) if column in CSV_QUANTITY_COLUMNS), None)
+    return (name, quantity) if name is not None else None
+
+
+def _split_lines(text):
+    """Yield (line number, original text, name, quantity text or None)."""
+    lines = text.splitlines()
+    first = next((line for line in lines if line.strip()), "")
+    columns = _csv_columns(next(csv.reader([first]))) if "," in first else None
+    if columns is not None:
+        name_column, quantity_column = columns
+        start = lines.index(first) + 1
+        for number, row in enumerate(csv.reader(lines[start:]), start=start + 1):
+            if not any(cell.strip() for cell in row):
+                continue
+            name = row[name_column] if name_column < len(row) else ""
+            quantity = row[quantity_column] if quantity_column is not None and quantity_column < len(row) else None
+            yield number, ",".join(row), name, quantity
+        return
+
+    for number, line in enumerate(lines, start=1):
+        text = BULLET_RE.sub("", line.strip()).strip()
+        if text and not text.startswith("#"):
+            yield number, line.strip(), text, None
+
+
+def read_import(catalog, text):
+    """Parse and resolve an inventory list into ImportLines, one per non-blank line.
+
+    Each distinct name is resolved once. Lines that don't match an item, or
+    have an invalid quantity, carry an ``error`` instead of an item.
+    """
+    resolved = {}
+    lines = []
+    for number, original, name, quantity in _split_lines(text):
+        if len(lines) >= MAX_OPERATIONS:
+            raise InventoryError(f"At most {MAX_OPERATIONS} lines per import")
+        if quantity is None:
+            # A name like "2x Emote Slots" wins over reading it as a quantity
+            item, match = resolve_name(catalog, name, fuzzy=False)
+            if item is None:
+                for pattern in QUANTITY_PATTERNS:
+                    found = pattern.match(name)
+                    if found:
+                        name, quantity = found["name"].strip(), found["quantity"]
+                        break
+        key = normalize_name(name)
+        if key not in resolved:
+            resolved[key] = resolve_name(catalog, name)
+        item, match = resolved[key]
+
+        quantity = (quantity or "1").strip()
+        if item is None:
+            lines.append(ImportLine(number, original, None, None, None, f"No item matches {name!r}"))
+        elif not quantity.isdigit() or not 1 <= int(quantity) <= MAX_QUANTITY:
+            lines.append(ImportLine(number, original, None, None, None, f"Invalid quantity {quantity!r}"))
+        else:
+            lines.append(ImportLine(number, original, item, int(quantity), match, None))
+    return lines
+
+
+def import_operations(lines, mode="set"):
+    """Operations for the matched ImportLines: repeated items are summed, then
+    either ``set`` as the inventory quantity or ``add``-ed to it."""
+    totals = {}
+    for line in lines:
+        if line.item is not None:
+            totals[line.item.id] = totals.get(line.item.id, 0) + line.quantity
+    return [(mode, item_id, min(quantity, MAX_QUANTITY)) for item_id, quantity in totals.items()]
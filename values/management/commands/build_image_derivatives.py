@@ -0,0 +1,72 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from values import images
+from values.catalog import catalog_changed
+from values.models import Item
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates resized WebP/AVIF versions of every item image and the picker's "
+        "sprite sheets, and updates their manifests"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete derivatives and manifest entries no item references any more",
+        )
+
+    def handle(self, *args, **options):
+        if not images.available_formats():
+            raise CommandError("Pillow with WebP or AVIF support is required to build image derivatives")
+
+        urls = set(Item.objects.exclude(image_url="").values_list("image_url", flat=True))
+        # Web processes may be building images for a just-saved item
+        with images.build_lock():
+            changed = images.update_derivatives(urls)
+            sprites_changed = images.build_sprites(urls)
+            if options["prune"]:
+                self.prune(urls)
+        if sprites_changed:
+            sheets = images.get_sprites()["sheets"]
+            self.stdout.write(f"Packed {len(urls)} thumbnails into {len(sheets)} sprite sheet(s)")
+        manifest = images.get_manifest()
+        missing = sorted(url for url in urls if url not in manifest)
+        for url in missing:
+            self.stdout.write(self.style.WARNING(f"skipped {url} (not a readable file under MEDIA_ROOT)"))
+
+        if changed or sprites_changed:
+            # Serve the new srcsets/sprites from the catalog snapshot and page caches
+            catalog_changed()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(urls) - len(missing)} images have derivatives ({changed} updated, {len(missing)} skipped)"
+            )
+        )
+
+    def prune(self, urls):
+        manifest = images.get_manifest()
+        kept = {url: entry for url, entry in manifest.items() if url in urls}
+        if len(kept) != len(manifest):
+            images.save_manifest(kept)
+        digests = {entry["digest"] for entry in kept.values()}
+        root = images.derived_root()
+        removed = 0
+        for name in os.listdir(root) if os.path.isdir(root) else []:
+            path = os.path.join(root, name)
+            if os.path.isdir(path) and name not in digests and name != images.SPRITES_DIR:
+                shutil.rmtree(path)
+                removed += 1
+
+        sheets = {sheet["url"].rsplit("/", 1)[-1] for sheet in images.get_sprites().get("sheets", [])}
+        sprites_dir = os.path.join(root, images.SPRITES_DIR)
+        for name in os.listdir(sprites_dir) if os.path.isdir(sprites_dir) else []:
+            if name not in sheets:
+                os.remove(os.path.join(sprites_dir, name))
+                removed += 1
+        self.stdout.write(f"Pruned {len(manifest) - len(kept)} manifest entries and {removed} stale files/directories")
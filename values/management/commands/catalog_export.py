@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from values.catalog_io import FORMATS, detect_format, export_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the item catalog as CSV, JSON Lines or JSON, in the format catalog_import "
+        "reads; streams, so it works on any catalog size"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default="-", help="File to write (default '-', standard output)"
+        )
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Output format (default: from the file extension, else csv)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or (detect_format(path) if path != "-" else None) or "csv"
+
+        if path == "-":
+            for chunk in export_lines(fmt):
+                self.stdout.write(chunk, ending="")
+            return
+
+        try:
+            with open(path, "w", encoding="utf-8", newline="") as fh:
+                for chunk in export_lines(fmt):
+                    fh.write(chunk)
+        except OSError as exc:
+            raise CommandError(f"Can't write {path}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Exported the catalog to {path} ({fmt})"))
@@ -0,0 +1,86 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from values.catalog_io import FORMATS, CatalogFormatError, apply_diff, detect_format, diff_catalog, read_records
+
+# Problems listed before the rest are summarised
+MAX_ERRORS = 50
+# Longest old/new value shown in the diff report
+MAX_SHOWN = 40
+
+
+def shown(value):
+    text = repr(value)
+    return text if len(text) <= MAX_SHOWN else text[:MAX_SHOWN - 3] + "..."
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a catalog file (as written by catalog_export) keyed by item slug: creates "
+        "new items and updates changed ones in one transaction. Records may list only some "
+        "fields, e.g. slug,value to re-price items"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Catalog file to read, or '-' for standard input")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format (default: from the file extension, else csv)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without writing anything",
+        )
+        parser.add_argument(
+            "--delete-missing",
+            action="store_true",
+            help="Delete items that aren't in the file (with their history and inventory entries)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or (detect_format(path) if path != "-" else None) or "csv"
+
+        started = time.perf_counter()
+        try:
+            if path == "-":
+                diff = diff_catalog(read_records(sys.stdin, fmt), options["delete_missing"])
+            else:
+                with open(path, encoding="utf-8-sig", newline="") as fh:
+                    diff = diff_catalog(read_records(fh, fmt), options["delete_missing"])
+        except OSError as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+        except CatalogFormatError as exc:
+            for error in exc.errors[:MAX_ERRORS]:
+                self.stderr.write(error)
+            if len(exc.errors) > MAX_ERRORS:
+                self.stderr.write(f"... and {len(exc.errors) - MAX_ERRORS} more")
+            raise CommandError(f"{path} wasn't imported: {exc}")
+
+        dry_run = options["dry_run"]
+        if dry_run or options["verbosity"] > 1:
+            self.report(diff)
+        summary = (
+            f"{len(diff.created)} created, {len(diff.updated)} updated, "
+            f"{len(diff.deleted)} deleted, {diff.unchanged} unchanged"
+        )
+        if dry_run:
+            self.stdout.write(f"Dry run, nothing written: {summary}")
+            return
+        if diff:
+            apply_diff(diff)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Imported {path}: {summary} in {elapsed:.2f}s"))
+
+    def report(self, diff):
+        for item in diff.created:
+            self.stdout.write(self.style.SUCCESS(f"+ {item.slug} ({item.name}, value {item.value})"))
+        for item, changes in diff.updated:
+            described = ", ".join(f"{name} {shown(old)} -> {shown(new)}" for name, (old, new) in changes.items())
+            self.stdout.write(f"~ {item.slug}: {described}")
+        for item in diff.deleted:
+            self.stdout.write(self.style.WARNING(f"- {item.slug} ({item.name})"))
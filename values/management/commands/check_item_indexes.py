@@ -0,0 +1,113 @@
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from values.models import Category, Item
+from values.views import ItemListView
+
+# Sort options offered by ItemListView ("" is the featured default)
+SORTS = ["", "value_asc", "name", "rarity"]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAINs every filter/sort combination ItemListView can generate and "
+        "fails if any of them scans the item table or sorts outside an index"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strict",
+            action="store_true",
+            help="Also fail on sorts over a min/max value range",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            raise CommandError(f"Unsupported database vendor: {connection.vendor}")
+
+        category = Category.objects.order_by("name").first()
+        sample_filters = {
+            "category": category.slug if category else "missing",
+            "rarity": Item.Rarity.RARE,
+            "item_type": Item.ItemType.ITEM,
+            "trend": Item.Trend.RISING,
+            "min_value": "1",
+        }
+        # Search (q) is served by the full-text index and ranked separately
+        filter_names = ["category", "rarity", "item_type", "trend", "min_value"]
+
+        factory = RequestFactory()
+        failures = []
+        warnings = 0
+        checked = 0
+        for size in range(len(filter_names) + 1):
+            for names in combinations(filter_names, size):
+                for sort in SORTS:
+                    params = {name: sample_filters[name] for name in names}
+                    if "min_value" in params:
+                        params["max_value"] = "100000"
+                    if sort:
+                        params["sort"] = sort
+
+                    view = ItemListView()
+                    view.setup(factory.get("/items/", params))
+                    queryset = view.get_queryset()[: ItemListView.paginate_by]
+                    scans, sorts = self.plan_problems(queryset)
+                    checked += 1
+
+                    label = ", ".join(names) or "no filters"
+                    label = f"{label} / sort={sort or 'featured'}"
+                    # A value range bounds the rows being sorted, and SQLite's
+                    # planner prefers the range index over walking a sorted one
+                    if sorts and "min_value" in names and not options["strict"]:
+                        self.stdout.write(self.style.WARNING(f"warn {label}: {'; '.join(sorts)}"))
+                        warnings += 1
+                        sorts = []
+                    if scans or sorts:
+                        failures.append(label)
+                        self.stdout.write(
+                            self.style.ERROR(f"FAIL {label}: {'; '.join(scans + sorts)}")
+                        )
+                    elif options["verbosity"] > 1:
+                        self.stdout.write(f"ok   {label}")
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} of {checked} item list queries are not fully served by indexes"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"All {checked} item list queries are served by indexes "
+                f"({warnings} value-range sorts allowed, see --strict)"
+            )
+        )
+
+    def plan_problems(self, queryset):
+        """Return (sequential scans, sorts outside an index) found in the plan."""
+        scans, sorts = [], []
+        if connection.vendor == "sqlite":
+            for line in queryset.explain().splitlines():
+                detail = line.split(" ", 3)[-1]
+                if detail.startswith("SCAN ") and " USING " not in detail:
+                    scans.append(f"sequential scan ({detail})")
+                if "TEMP B-TREE" in detail:
+                    sorts.append(f"sort outside an index ({detail})")
+            return scans, sorts
+
+        # PostgreSQL happily seq-scans a small table, so price scans and sorts
+        # out of the running: any that remain have no index able to replace them.
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+            plan = queryset.explain()
+        for line in plan.splitlines():
+            node = line.strip().lstrip("->").strip()
+            if node.startswith("Seq Scan"):
+                scans.append(f"sequential scan ({node})")
+            if node.startswith(("Sort ", "Incremental Sort ")):
+                sorts.append(f"sort outside an index ({node})")
+        return scans, sorts
@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from values.trends import DEFAULT_THRESHOLD, DEFAULT_WINDOW, recompute_trends
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every item's trend, volatility and moving average from its value "
+        "history; run it on a schedule (e.g. hourly from cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=DEFAULT_WINDOW.days,
+            help=f"Trailing window in days (default {DEFAULT_WINDOW.days})",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=DEFAULT_THRESHOLD * 100,
+            help=(
+                "Percent above/below the moving average that counts as rising/falling "
+                f"(default {DEFAULT_THRESHOLD * 100:g})"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["window"] < 1:
+            raise CommandError("--window must be at least 1 day")
+        if options["threshold"] < 0:
+            raise CommandError("--threshold can't be negative")
+
+        started = time.perf_counter()
+        examined, updated = recompute_trends(
+            window=timedelta(days=options["window"]), threshold=options["threshold"] / 100
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Recomputed trends for {examined} items ({updated} updated) in {elapsed:.2f}s")
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from values.matchmaking import CHANGE_RETENTION, prune_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the inventory change log rows matchmaking no longer needs (older than "
+        f"{CHANGE_RETENTION}); lookups prune too, so schedule this where matchmaking is little used"
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} inventory changes"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from values.portfolio import rebuild_portfolios
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every user's inventory portfolio (total and per-category value) "
+        "from the inventories; only needed after writing inventories or values in SQL"
+    )
+
+    def handle(self, *args, **options):
+        users = rebuild_portfolios()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt portfolios for {users} users"))
@@ -0,0 +1,272 @@
+"""
+Trade matchmaking over user inventories.
+
+``find_matches(user, wanted)`` finds the other users holding items the caller
+wants and, for each, an offer from the caller's own inventory worth what
+they'd get within a tolerance.
+
+Lookups read a process-local HolderIndex rather than querying inventories:
+``holders`` maps each item id to {user id: quantity} (an inverted index) and
+``inventories`` each user to the item ids they hold. It is built from
+InventoryItem once per process, like the catalog snapshot (and again when the
+shared generation key is cleared), then kept current incrementally: every
+inventory write appends its users to InventoryChange
+(``note_inventory_changes``), and each lookup reloads just the users changed
+since the previous one. Changes are re-read for CHANGE_OVERLAP after they're
+first seen, since a transaction can commit after a later one, and pruned after
+CHANGE_RETENTION, by lookups every PRUNE_INTERVAL and by ``manage.py
+prune_inventory_changes`` for sites nobody matches on; an index idle for
+longer than CHANGE_RETENTION is rebuilt.
+
+The offer is a bounded subset sum over the caller's MAX_OFFER_ITEMS most
+valuable holdings: the sums reachable with whole units (up to the largest
+value wanted), trimmed so kept sums are at least a small fraction of the
+tolerance apart, computed once per lookup and then searched per candidate
+with a bisect.
+"""
+import heapq
+import threading
+import uuid
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
+from operator import itemgetter
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .catalog import get_catalog
+from .models import InventoryChange, InventoryItem
+
+HOLDER_INDEX_KEY = "values:holder_index_generation"
+
+# How far back each refresh re-reads changes, for late-committing writes
+CHANGE_OVERLAP = timedelta(seconds=60)
+# How long changes are kept; an index that hasn't refreshed since is rebuilt
+CHANGE_RETENTION = timedelta(hours=6)
+# Changed users reloaded one by one; more than this rebuilds the index
+MAX_RELOAD_USERS = 5000
+# How often a process prunes expired changes while refreshing
+PRUNE_INTERVAL = timedelta(minutes=10)
+
+DEFAULT_TOLERANCE = 0.1
+MIN_TOLERANCE = 0.02
+MAX_TOLERANCE = 0.5
+MATCH_LIMIT = 20
+MAX_MATCH_LIMIT = 100
+MAX_WANTED = 25
+# Reachable offer sums closer than this share of the tolerance are merged
+OFFER_PRECISION = 0.1
+# Distinct items, the most valuable first, an offer is searched from
+MAX_OFFER_ITEMS = 50
+
+Match = namedtuple("Match", ["user_id", "offer", "request"])
+
+
+def get_index_generation():
+    generation = cache.get(HOLDER_INDEX_KEY)
+    if generation is None:
+        cache.add(HOLDER_INDEX_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(HOLDER_INDEX_KEY)
+    return generation
+
+
+def note_inventory_changes(user_ids):
+    """Record that these users' inventories changed (one INSERT)."""
+    InventoryChange.objects.bulk_create(InventoryChange(user_id=user_id) for user_id in set(user_ids))
+
+
+def prune_changes(now=None):
+    """Delete InventoryChange rows older than CHANGE_RETENTION; returns how many."""
+    cutoff = (now or timezone.now()) - CHANGE_RETENTION
+    deleted, _ = InventoryChange.objects.filter(changed_at__lt=cutoff).delete()
+    return deleted
+
+
+class HolderIndex:
+    """Who holds how many of each item; see the module docstring.
+
+    Reads and refreshes happen under ``lock``.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        now = timezone.now()
+        self.prune(now)
+        self.holders = {}
+        self.inventories = {}
+        self._add(InventoryItem.objects.filter(quantity__gt=0).values_list("user_id", "item_id", "quantity"))
+        self.refreshed_at = now
+        self.seen = set()
+
+    def _add(self, rows):
+        for user_id, item_id, quantity in rows.order_by().iterator(chunk_size=10000):
+            self.holders.setdefault(item_id, {})[user_id] = quantity
+            self.inventories.setdefault(user_id, []).append(item_id)
+
+    def prune(self, now):
+        prune_changes(now)
+        self.pruned_at = now
+
+    def refresh(self):
+        """Reload the users whose inventories changed since the last refresh."""
+        now = timezone.now()
+        if now - self.refreshed_at > CHANGE_RETENTION - CHANGE_OVERLAP:
+            self.load()
+            return
+        if now - self.pruned_at >= PRUNE_INTERVAL:
+            self.prune(now)
+        changes = list(
+            InventoryChange.objects.filter(changed_at__gte=self.refreshed_at - CHANGE_OVERLAP).values_list(
+                "pk", "user_id"
+            )
+        )
+        user_ids = {user_id for pk, user_id in changes if pk not in self.seen}
+        self.seen = {pk for pk, _ in changes}
+        self.refreshed_at = now
+        if len(user_ids) > MAX_RELOAD_USERS:
+            self.load()
+        elif user_ids:
+            for user_id in user_ids:
+                for item_id in self.inventories.pop(user_id, ()):
+                    self.holders[item_id].pop(user_id, None)
+            self._add(
+                InventoryItem.objects.filter(user_id__in=user_ids, quantity__gt=0).values_list(
+                    "user_id", "item_id", "quantity"
+                )
+            )
+
+    def holdings(self, user_id):
+        """A user's {item_id: quantity}."""
+        return {item_id: self.holders[item_id][user_id] for item_id in self.inventories.get(user_id, ())}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_holder_index():
+    """Return this process's HolderIndex, building it if there's none or it's stale."""
+    global _index
+    generation = get_index_generation()
+    index = _index
+    if index is None or index.generation != generation:
+        with _index_lock:
+            index = _index
+            if index is None or index.generation != generation:
+                index = _index = HolderIndex(generation)
+    return index
+
+
+def _trim(states, precision):
+    kept = []
+    floor = -1
+    for state in states:
+        if state[0] > floor:
+            kept.append(state)
+            floor = state[0] * (1 + precision)
+    return kept
+
+
+def offer_sums(holdings, limit, precision):
+    """Sums reachable with whole units of ``holdings``, up to ``limit``.
+
+    ``holdings`` is [(item_id, value, quantity)]. Returns [(total, chain)]
+    sorted by total, where chain links (item_id, units, rest) back to None.
+    Quantities are split into 1, 2, 4, ... units so each round is one merge,
+    and each merge is trimmed to sums more than ``precision`` (relative) apart,
+    which bounds the states to about log(limit) / precision.
+    """
+    states = [(0, None)]
+    for item_id, value, quantity in holdings:
+        units = min(quantity, limit // value)
+        take = 1
+        while units > 0:
+            take = min(take, units)
+            units -= take
+            amount = value * take
+            shifted = [(total + amount, (item_id, take, chain)) for total, chain in states if total + amount <= limit]
+            # Both runs are sorted, so this is one linear merge
+            states = _trim(sorted(states + shifted, key=itemgetter(0)), precision)
+            take *= 2
+    return states
+
+
+def _closest(sums, totals, target, tolerance):
+    i = bisect_left(totals, target)
+    best = None
+    for total, chain in sums[max(i - 1, 0):i + 1]:
+        if total and abs(total - target) <= target * tolerance:
+            if best is None or abs(total - target) < abs(best[0] - target):
+                best = (total, chain)
+    return best
+
+
+def _pairs(chain):
+    units = {}
+    while chain is not None:
+        item_id, take, chain = chain
+        units[item_id] = units.get(item_id, 0) + take
+    return [[item_id, units[item_id]] for item_id in sorted(units)]
+
+
+def find_matches(user, wanted, tolerance=DEFAULT_TOLERANCE, limit=MATCH_LIMIT):
+    """Users who hold any of ``wanted`` and a value-balanced offer for each.
+
+    ``wanted`` is normalized ``[[item_id, quantity], ...]`` (see
+    trades.normalize_side). Returns up to ``limit`` Matches, where ``request``
+    is what the holder has of the wanted items and ``offer`` comes from the
+    caller's other holdings, within ``tolerance`` of the request's value.
+    Holders covering more of the wanted items rank first, then the closest
+    offers.
+    """
+    catalog = get_catalog()
+    values = {item.id: item.value for item in catalog.items if item.value > 0}
+    wanted = [(item_id, quantity) for item_id, quantity in wanted if item_id in values]
+    if not wanted:
+        return []
+
+    index = get_holder_index()
+    with index.lock:
+        index.refresh()
+        own = index.holdings(user.pk)
+        requests = {}
+        for item_id, quantity in wanted:
+            for holder, held in index.holders.get(item_id, {}).items():
+                if holder != user.pk:
+                    requests.setdefault(holder, []).append([item_id, min(held, quantity)])
+
+    targets = {
+        holder: sum(values[item_id] * quantity for item_id, quantity in pairs) for holder, pairs in requests.items()
+    }
+    if not targets:
+        return []
+    ceiling = int(max(targets.values()) * (1 + tolerance))
+    wanted_ids = {item_id for item_id, _ in wanted}
+    holdings = heapq.nlargest(
+        MAX_OFFER_ITEMS,
+        (
+            (item_id, values[item_id], quantity)
+            for item_id, quantity in own.items()
+            if item_id in values and item_id not in wanted_ids and values[item_id] <= ceiling
+        ),
+        key=itemgetter(1, 0),
+    )
+    if not holdings:
+        return []
+    sums = offer_sums(holdings, ceiling, tolerance * OFFER_PRECISION)
+    totals = [total for total, _ in sums]
+
+    ranked = []
+    for holder, target in targets.items():
+        offer = _closest(sums, totals, target, tolerance)
+        if offer is not None:
+            ranked.append((-len(requests[holder]), abs(offer[0] - target), holder, offer[1]))
+    return [
+        Match(holder, _pairs(chain), requests[holder])
+        for _, _, holder, chain in heapq.nsmallest(limit, ranked, key=itemgetter(0, 1, 2))
+    ]
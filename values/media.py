@@ -0,0 +1,129 @@
+"""
+Serving MEDIA_ROOT with fingerprinted URLs and far-future caching.
+
+``hashed_media_url`` turns an Item.image_url such as
+``/media/Weapons/Dragon_Bone.png`` into ``/media/Weapons/Dragon_Bone.<hash>.png``,
+where the hash is taken from the file's contents. ``MediaMiddleware`` (WhiteNoise
+extended to MEDIA_URL) serves both forms, in DEBUG and production alike, with
+ETag, Last-Modified and Range support. Fingerprinted URLs and the
+content-addressed derivatives under media/derived/ (see images.py) are sent as
+immutable, so browsers never re-request them; a changed image gets a new URL.
+
+Media are PNG/WebP/AVIF, which don't compress further, so unlike static files
+no gzip/brotli variants are generated for them.
+"""
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.responders import IsDirectoryError, MissingFileError
+
+from .images import DERIVED_DIR, source_path
+
+HASH_LENGTH = 12
+HASHED_NAME_RE = re.compile(rf"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[^./]+)$")
+
+# path -> (mtime_ns, size, hash)
+_hashes = {}
+
+
+def file_hash(path):
+    """Content hash of path, recomputed only when its mtime or size changes."""
+    stat = os.stat(path)
+    cached = _hashes.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(65536), b""):
+            digest.update(chunk)
+    value = digest.hexdigest()[:HASH_LENGTH]
+    _hashes[path] = (stat.st_mtime_ns, stat.st_size, value)
+    return value
+
+
+def hashed_media_url(image_url):
+    """Return the fingerprinted URL for a file under MEDIA_URL.
+
+    Anything else (external URLs, missing files, derivatives that are already
+    content-addressed) is returned unchanged.
+    """
+    if not image_url or image_url.startswith(f"{settings.MEDIA_URL}{DERIVED_DIR}/"):
+        return image_url or ""
+    path = source_path(image_url)
+    if path is None:
+        return image_url
+    stem, ext = os.path.splitext(image_url)
+    return f"{stem}.{file_hash(path)}{ext}"
+
+
+class MediaMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that also serves MEDIA_ROOT, including fingerprinted URLs."""
+
+    def __init__(self, get_response=None, settings=settings):
+        # Set first: WhiteNoise calls immutable_file_test while indexing STATIC_ROOT
+        self.media_prefix = settings.MEDIA_URL
+        self.media_root = os.path.realpath(settings.MEDIA_ROOT)
+        # Fingerprinted URLs never change content, so their responders are kept
+        self.immutable_media = {}
+        super().__init__(get_response, settings=settings)
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.media_prefix):
+            static_file = self.find_media_file(request.path_info)
+            if static_file is not None:
+                return self.serve(static_file, request)
+            return self.get_response(request)
+        return super().__call__(request)
+
+    def find_media_file(self, url):
+        static_file = self.immutable_media.get(url)
+        if static_file is not None:
+            return static_file
+        if not self.url_is_canonical(url):
+            return None
+
+        relative = url[len(self.media_prefix):]
+        match = HASHED_NAME_RE.match(relative)
+        if match:
+            path = self.media_path(match["stem"] + match["ext"])
+            if path is None:
+                return None
+            static_file = self.media_static_file(path, url)
+            if static_file is not None and self.is_current_hash(path, match["hash"]):
+                self.immutable_media[url] = static_file
+            return static_file
+
+        path = self.media_path(relative)
+        return None if path is None else self.media_static_file(path, url)
+
+    def media_path(self, relative):
+        path = os.path.realpath(os.path.join(self.media_root, relative))
+        if not path.startswith(self.media_root + os.sep):
+            return None
+        return path
+
+    def media_static_file(self, path, url):
+        try:
+            return self.get_static_file(path, url)
+        except (MissingFileError, IsDirectoryError, FileNotFoundError):
+            return None
+
+    @staticmethod
+    def is_current_hash(path, expected):
+        try:
+            return file_hash(path) == expected
+        except OSError:
+            return False
+
+    def immutable_file_test(self, path, url):
+        if not url.startswith(self.media_prefix):
+            return super().immutable_file_test(path, url)
+        relative = url[len(self.media_prefix):]
+        if relative.startswith(f"{DERIVED_DIR}/"):
+            return True
+        match = HASHED_NAME_RE.match(relative)
+        # A stale fingerprint still gets the current file, but only briefly cached
+        return bool(match) and self.is_current_hash(path, match["hash"])
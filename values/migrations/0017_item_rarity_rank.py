@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 07:29
+
+from django.db import migrations, models
+
+
+def populate_rarity_rank(apps, schema_editor):
+    Item = apps.get_model("values", "Item")
+
+    # Same order as Item.Rarity, rarest first
+    ranks = ["unobtainable", "special_grade", "rare", "uncommon", "common"]
+    for rank, rarity in enumerate(ranks):
+        Item.objects.filter(rarity=rarity).update(rarity_rank=rank)
+    Item.objects.exclude(rarity__in=ranks).update(rarity_rank=len(ranks))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('values', '0016_change_image_url_to_charfield'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='rarity_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Derived from rarity for database-side sorting'),
+        ),
+        migrations.RunPython(populate_rarity_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['rarity_rank', 'name'], name='item_rarity_rank_name_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        # Generated column: PostgreSQL keeps the vector current on every write
+        schema_editor.execute(
+            "ALTER TABLE values_item ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(obtained_from, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(notes, '')), 'C')"
+            ") STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX item_search_vector_idx ON values_item USING gin (search_vector)"
+        )
+    elif vendor == "sqlite":
+        # Kept in sync by the Item signal handlers (see values/search.py)
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE values_item_fts USING fts5("
+            "name, obtained_from, notes, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO values_item_fts (rowid, name, obtained_from, notes) "
+            "SELECT id, name, obtained_from, notes FROM values_item"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS item_search_vector_idx")
+        schema_editor.execute("ALTER TABLE values_item DROP COLUMN IF EXISTS search_vector")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS values_item_fts")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("values", "0017_item_rarity_rank"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # Other databases use the in-memory trigram index (values/search.py)
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # GiST rather than GIN so ORDER BY distance LIMIT k is an index scan
+        schema_editor.execute(
+            "CREATE INDEX item_name_trgm_idx ON values_item USING gist (name gist_trgm_ops)"
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS item_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("values", "0018_item_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
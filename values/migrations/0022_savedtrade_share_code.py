@@ -0,0 +1,95 @@
+from django.db import migrations, models
+import base64
+import django.db.models.deletion
+import hashlib
+import json
+from django.conf import settings
+
+
+def normalize_side(entries):
+    # Rows from the old calculator stored item dicts; keep only id and quantity
+    quantities = {}
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            item_id, quantity = entry.get("id", entry.get("item_id")), entry.get("quantity", 1)
+        elif isinstance(entry, (list, tuple)) and len(entry) == 2:
+            item_id, quantity = entry
+        else:
+            continue
+        try:
+            item_id, quantity = int(item_id), max(1, int(quantity))
+        except (TypeError, ValueError):
+            continue
+        quantities[item_id] = quantities.get(item_id, 0) + quantity
+    return [[item_id, quantities[item_id]] for item_id in sorted(quantities)]
+
+
+def compact_saved_trades(apps, schema_editor):
+    """Normalize existing trades, give them share codes and drop per-user duplicates."""
+    SavedTrade = apps.get_model("values", "SavedTrade")
+    seen = set()
+    for trade in SavedTrade.objects.order_by("pk").iterator():
+        offer, request = normalize_side(trade.offer_items), normalize_side(trade.request_items)
+        canonical = json.dumps([offer, request], separators=(",", ":"))
+        code = base64.b32encode(hashlib.sha256(canonical.encode()).digest()).decode()[:10].lower()
+        if (trade.user_id, code) in seen:
+            trade.delete()
+            continue
+        seen.add((trade.user_id, code))
+        trade.offer_items, trade.request_items, trade.share_code = offer, request, code
+        trade.save(update_fields=["offer_items", "request_items", "share_code"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('values', '0021_category_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedtrade',
+            name='share_code',
+            field=models.CharField(db_index=True, default='', max_length=16),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='savedtrade',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_trades', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='savedtrade',
+            name='offer_items',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='savedtrade',
+            name='request_items',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='savedtrade',
+            name='offer_total',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='savedtrade',
+            name='request_total',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(compact_saved_trades, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='savedtrade',
+            index=models.Index(fields=['user', '-id'], name='values_savedtrade_user_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedtrade',
+            constraint=models.UniqueConstraint(fields=('user', 'share_code'), name='values_savedtrade_user_code'),
+        ),
+        migrations.AddConstraint(
+            model_name='savedtrade',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('share_code',), name='values_savedtrade_anonymous_code'),
+        ),
+    ]
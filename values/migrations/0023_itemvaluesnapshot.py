@@ -0,0 +1,60 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_history(apps, schema_editor):
+    """Rebuild what history there is from approved value change requests.
+
+    Only values were ever requested, so demand and trend are the current ones.
+    """
+    Item = apps.get_model("values", "Item")
+    ItemValueSnapshot = apps.get_model("values", "ItemValueSnapshot")
+    ValueChangeRequest = apps.get_model("values", "ValueChangeRequest")
+
+    approvals = {}
+    for item_id, current_value, requested_value, reviewed_at, created_at in (
+        ValueChangeRequest.objects.filter(status="approved")
+        .order_by("reviewed_at", "created_at")
+        .values_list("item_id", "current_value", "requested_value", "reviewed_at", "created_at")
+    ):
+        approvals.setdefault(item_id, []).append((current_value, requested_value, reviewed_at or created_at))
+
+    snapshots = []
+    for item in Item.objects.only("id", "value", "demand", "trend", "created_at", "updated_at").iterator():
+        history = approvals.get(item.pk, [])
+        steps = [(item.created_at, history[0][0] if history else item.value)]
+        steps.extend((recorded_at, requested_value) for _, requested_value, recorded_at in history)
+        if steps[-1][1] != item.value:
+            # Edited outside the request flow at some point
+            steps.append((max(item.updated_at, steps[-1][0]), item.value))
+        snapshots.extend(
+            ItemValueSnapshot(item_id=item.pk, recorded_at=recorded_at, value=value, demand=item.demand, trend=item.trend)
+            for recorded_at, value in steps
+        )
+    ItemValueSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('values', '0022_savedtrade_share_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemValueSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('value', models.PositiveIntegerField()),
+                ('demand', models.PositiveSmallIntegerField()),
+                ('trend', models.CharField(choices=[('rising', 'Rising'), ('stable', 'Stable'), ('falling', 'Falling')], max_length=10)),
+                ('item', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='value_history', to='values.item')),
+            ],
+            options={
+                'ordering': ['recorded_at'],
+                'indexes': [models.Index(fields=['item', 'recorded_at'], name='item_snapshot_item_time_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def seed_moving_average(apps, schema_editor):
+    # Until compute_trends first runs, the average is the current value
+    Item = apps.get_model("values", "Item")
+    Item.objects.update(moving_average=models.F("value"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('values', '0023_itemvaluesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='moving_average',
+            field=models.PositiveIntegerField(default=0, help_text='Time-weighted average value over the trend window'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='volatility',
+            field=models.FloatField(default=0, help_text='Relative standard deviation of the value over the trend window'),
+        ),
+        migrations.RunPython(seed_moving_average, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='itemvaluesnapshot',
+            index=models.Index(fields=['recorded_at'], name='item_snapshot_time_idx'),
+        ),
+    ]
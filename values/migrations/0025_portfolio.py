@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_portfolios(apps, schema_editor):
+    # Same as portfolio.rebuild_portfolios, against the historical models
+    InventoryItem = apps.get_model("values", "InventoryItem")
+    Portfolio = apps.get_model("values", "Portfolio")
+    PortfolioCategory = apps.get_model("values", "PortfolioCategory")
+    per_category = list(
+        InventoryItem.objects.values_list("user_id", "item__category_id")
+        .annotate(
+            total_value=models.Sum(
+                models.F("quantity") * models.F("item__value"), output_field=models.BigIntegerField()
+            ),
+            item_count=models.Sum("quantity", output_field=models.BigIntegerField()),
+        )
+        .order_by()
+    )
+    totals = {}
+    for user_id, _, total_value, item_count in per_category:
+        user_value, user_count = totals.get(user_id, (0, 0))
+        totals[user_id] = (user_value + total_value, user_count + item_count)
+    Portfolio.objects.bulk_create(
+        Portfolio(user_id=user_id, total_value=total_value, item_count=item_count)
+        for user_id, (total_value, item_count) in totals.items()
+    )
+    PortfolioCategory.objects.bulk_create(
+        PortfolioCategory(user_id=user_id, category_id=category_id, total_value=total_value, item_count=item_count)
+        for user_id, category_id, total_value, item_count in per_category
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('values', '0024_item_trend_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Portfolio',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='portfolio', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_value', models.BigIntegerField(default=0)),
+                ('item_count', models.BigIntegerField(default=0, help_text='Total quantity held')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total_value', 'user'], name='portfolio_total_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PortfolioCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_value', models.BigIntegerField(default=0)),
+                ('item_count', models.BigIntegerField(default=0)),
+                ('category', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='portfolios', to='values.category')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_categories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', '-total_value', 'user'], name='portfolio_category_total_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'category'), name='portfolio_category_unique')],
+            },
+        ),
+        migrations.RunPython(build_portfolios, migrations.RunPython.noop),
+    ]
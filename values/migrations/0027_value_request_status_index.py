@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 08:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('values', '0026_inventory_change'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='valuechangerequest',
+            index=models.Index(fields=['status', 'item'], name='value_request_status_item_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
-from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 import uuid
 
@@ -15,6 +16,7 @@ class Category(models.Model):
         default="#6366F1",
         help_text="Hex color used for category badges",
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["name"]
@@ -28,6 +30,14 @@ class Category(models.Model):
         return self.name
 
 
+class ItemQuerySet(models.QuerySet):
+    def search(self, query):
+        """Full-text search over name, obtained_from and notes, best match first."""
+        from .search import search_items
+
+        return search_items(self, query)
+
+
 class Item(models.Model):
     class ItemType(models.TextChoices):
         ITEM = "item", "Item"
@@ -42,15 +52,22 @@ class Item(models.Model):
         UNCOMMON = "uncommon", "Uncommon"
         COMMON = "common", "Common"
 
+    # Sort position of each rarity, rarest first (declaration order above)
+    RARITY_RANKS = {key: rank for rank, key in enumerate(Rarity.values)}
+
     class Trend(models.TextChoices):
         RISING = "rising", "Rising"
         STABLE = "stable", "Stable"
         FALLING = "falling", "Falling"
 
+    # Fields recorded in ItemValueSnapshot whenever one of them changes
+    HISTORY_FIELDS = ("value", "demand", "trend")
+
     name = models.CharField(max_length=150, unique=True)
     slug = models.SlugField(unique=True)
     category = models.ForeignKey(
-        Category, on_delete=models.PROTECT, related_name="items"
+        # Indexed by the composite category indexes below instead
+        Category, on_delete=models.PROTECT, related_name="items", db_index=False
     )
     item_type = models.CharField(
         max_length=20, choices=ItemType.choices, default=ItemType.ITEM
@@ -58,11 +75,21 @@ class Item(models.Model):
     rarity = models.CharField(
         max_length=20, choices=Rarity.choices, default=Rarity.COMMON
     )
+    rarity_rank = models.PositiveSmallIntegerField(
+        default=0, editable=False, help_text="Derived from rarity for database-side sorting"
+    )
     value = models.PositiveIntegerField(help_text="Trade value points")
     demand = models.PositiveSmallIntegerField(default=5, help_text="1-10 scale")
+    # Derived from the value history by ``manage.py compute_trends``
     trend = models.CharField(
         max_length=10, choices=Trend.choices, default=Trend.STABLE
     )
+    volatility = models.FloatField(
+        default=0, help_text="Relative standard deviation of the value over the trend window"
+    )
+    moving_average = models.PositiveIntegerField(
+        default=0, help_text="Time-weighted average value over the trend window"
+    )
     is_limited = models.BooleanField(default=False)
     featured = models.BooleanField(default=False)
     obtained_from = models.CharField(
@@ -73,12 +100,47 @@ class Item(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ItemQuerySet.as_manager()
+
     class Meta:
         ordering = ["-featured", "-value", "name"]
+        # Match ItemListView's filter/sort combinations; check coverage with
+        # `manage.py check_item_indexes` after changing the view or these.
+        indexes = [
+            models.Index(fields=["-featured", "-value", "name"], name="item_featured_value_idx"),
+            models.Index(fields=["value", "name"], name="item_value_name_idx"),
+            models.Index(fields=["rarity_rank", "name"], name="item_rarity_rank_name_idx"),
+            models.Index(
+                fields=["category", "-featured", "-value", "name"], name="item_cat_featured_value_idx"
+            ),
+            models.Index(fields=["category", "value", "name"], name="item_cat_value_name_idx"),
+            models.Index(fields=["category", "name"], name="item_cat_name_idx"),
+            models.Index(fields=["category", "rarity_rank", "name"], name="item_cat_rarity_name_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._history_state = instance.history_state()
+        instance._portfolio_state = instance.portfolio_state()
+        instance._image_url = instance.__dict__.get("image_url")
+        return instance
+
+    def history_state(self):
+        """The HISTORY_FIELDS values, None for any that weren't loaded."""
+        return tuple(self.__dict__.get(name) for name in self.HISTORY_FIELDS)
+
+    def portfolio_state(self):
+        """The (value, category_id) that inventory portfolios were computed from."""
+        return self.__dict__.get("value"), self.__dict__.get("category_id")
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        self.rarity_rank = self.RARITY_RANKS.get(self.rarity, len(self.RARITY_RANKS))
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "rarity" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "rarity_rank"}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -95,6 +157,116 @@ class Item(models.Model):
         return min(5, max(1, (self.demand + 1) // 2))
 
 
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Item)
+def invalidate_catalog(sender, **kwargs):
+    # Any catalog write makes every process rebuild its in-memory snapshot
+    from .catalog import catalog_changed
+
+    catalog_changed()
+
+
+@receiver(post_save, sender=Item)
+def index_item(sender, instance, **kwargs):
+    from .search import index_items
+
+    index_items([instance])
+
+
+@receiver(post_save, sender=Item)
+def build_item_images(sender, instance, raw=False, **kwargs):
+    # Derivatives and sprites are built in the background once the save
+    # commits, and only when the image changed
+    from .catalog_io import refresh_images_later
+
+    if raw or not instance.image_url or instance.image_url == getattr(instance, "_image_url", None):
+        return
+    instance._image_url = instance.image_url
+    refresh_images_later({instance.image_url})
+
+
+@receiver(post_save, sender=Item)
+def record_value_history(sender, instance, created, raw=False, **kwargs):
+    # Every path that saves an Item (approvals, the edit form, the admin)
+    # ends here, so this is the one place history is written
+    from .history import record_snapshots
+
+    if raw:
+        return
+    previous = getattr(instance, "_history_state", None)
+    current = instance.history_state()
+    if created or previous is None or any(
+        old is not None and old != new for old, new in zip(previous, current)
+    ):
+        record_snapshots([instance])
+    instance._history_state = current
+
+
+@receiver(post_save, sender=Item)
+def revalue_portfolios(sender, instance, created, raw=False, **kwargs):
+    from .portfolio import rebuild_portfolios, reprice_portfolios
+
+    previous = getattr(instance, "_portfolio_state", None)
+    current = instance.portfolio_state()
+    instance._portfolio_state = current
+    if raw or created or previous is None or previous == current:
+        return
+    (old_value, old_category), (value, category) = previous, current
+    if old_category is not None and old_category != category:
+        rebuild_portfolios(holders=[instance.pk])
+    elif old_value is not None and old_value != value:
+        reprice_portfolios({instance.pk: (category, value - old_value)})
+
+
+@receiver(pre_delete, sender=Item)
+def note_item_holders(sender, instance, **kwargs):
+    # The inventory entries are gone by post_delete
+    instance._holders = list(instance.inventory_entries.values_list("user_id", flat=True))
+
+
+@receiver(post_delete, sender=Item)
+def unindex_item(sender, instance, **kwargs):
+    from .search import unindex_items
+
+    unindex_items([instance.pk])
+
+
+@receiver(post_delete, sender=Item)
+def drop_from_portfolios(sender, instance, **kwargs):
+    from .matchmaking import note_inventory_changes
+    from .portfolio import rebuild_portfolios
+
+    if getattr(instance, "_holders", None):
+        rebuild_portfolios(user_ids=instance._holders)
+        note_inventory_changes(instance._holders)
+
+
+class ItemValueSnapshot(models.Model):
+    """An item's value, demand and trend from recorded_at until the next snapshot.
+
+    Append-only: one row per item per change, written by record_value_history
+    (or history.record_snapshots for bulk updates).
+    """
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="value_history", db_index=False)
+    recorded_at = models.DateTimeField()
+    value = models.PositiveIntegerField()
+    demand = models.PositiveSmallIntegerField()
+    trend = models.CharField(max_length=10, choices=Item.Trend.choices)
+
+    class Meta:
+        ordering = ["recorded_at"]
+        indexes = [
+            # Range scans per item; also serves as the item foreign key index
+            models.Index(fields=["item", "recorded_at"], name="item_snapshot_item_time_idx"),
+            # compute_trends reads the recent window across all items
+            models.Index(fields=["recorded_at"], name="item_snapshot_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} @ {self.recorded_at:%Y-%m-%d %H:%M}: {self.value}"
+
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     display_name = models.CharField(max_length=150, blank=True)
@@ -117,24 +289,167 @@ class InventoryItem(models.Model):
         unique_together = ("user", "item")
         ordering = ["-added_at"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._portfolio_state = instance.portfolio_state()
+        return instance
+
+    def portfolio_state(self):
+        """The (item_id, quantity) counted in the owner's portfolio."""
+        return self.__dict__.get("item_id"), self.__dict__.get("quantity")
+
     def __str__(self):
         return f"{self.user.username} - {self.item.name} x{self.quantity}"
 
 
+@receiver(post_save, sender=InventoryItem)
+def count_in_portfolio(sender, instance, created, raw=False, **kwargs):
+    # Keeps Portfolio and matchmaking in step with every inventory write
+    # (views, admin, shell)
+    from .matchmaking import note_inventory_changes
+    from .portfolio import adjust_entry, rebuild_portfolios
+
+    previous = None if created else getattr(instance, "_portfolio_state", None)
+    current = instance.portfolio_state()
+    instance._portfolio_state = current
+    if raw:
+        return
+    note_inventory_changes([instance.user_id])
+    if created:
+        adjust_entry(instance, instance.quantity)
+    elif previous is None or previous[0] != current[0] or None in previous:
+        # Saved without being loaded, or moved to another item
+        rebuild_portfolios(user_ids=[instance.user_id])
+    elif previous[1] != current[1]:
+        adjust_entry(instance, current[1] - previous[1])
+
+
+@receiver(post_delete, sender=InventoryItem)
+def uncount_in_portfolio(sender, instance, origin=None, **kwargs):
+    from .matchmaking import note_inventory_changes
+    from .portfolio import adjust_entry
+
+    origin_model = getattr(origin, "model", type(origin))
+    if origin is not None and origin_model is not InventoryItem:
+        # Cascaded from an Item (rebuilt by drop_from_portfolios) or a User
+        # (whose portfolio is deleted with it)
+        return
+    adjust_entry(instance, -instance.quantity)
+    note_inventory_changes([instance.user_id])
+
+
+class Portfolio(models.Model):
+    """What a user's inventory is worth: the sum of item value x quantity.
+
+    Denormalized from InventoryItem and Item.value and maintained by
+    values/portfolio.py, so profiles and the leaderboard never aggregate
+    inventories. A user with no inventory history has no row.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="portfolio")
+    total_value = models.BigIntegerField(default=0)
+    item_count = models.BigIntegerField(default=0, help_text="Total quantity held")
+
+    class Meta:
+        indexes = [
+            # The leaderboard, and ranking a user against it
+            models.Index(fields=["-total_value", "user"], name="portfolio_total_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.total_value}"
+
+
+class PortfolioCategory(models.Model):
+    """The part of a user's Portfolio held in one category."""
+
+    user = models.ForeignKey(
+        # Indexed by the unique constraint below
+        User, on_delete=models.CASCADE, related_name="portfolio_categories", db_index=False
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="portfolios", db_index=False
+    )
+    total_value = models.BigIntegerField(default=0)
+    item_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "category"], name="portfolio_category_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["category", "-total_value", "user"], name="portfolio_category_total_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} / {self.category.name}: {self.total_value}"
+
+
+class InventoryChange(models.Model):
+    """A user whose inventory changed, appended by every inventory write.
+
+    Each process's matchmaking holder index replays the rows it hasn't seen
+    to reload just those users' holdings (see values/matchmaking.py). Rows
+    are pruned after matchmaking.CHANGE_RETENTION, and outlive deleted users
+    so their holdings are dropped too.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name="+"
+    )
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["changed_at"], name="inventory_change_time_idx")]
+
+    def __str__(self):
+        return f"Inventory of user {self.user_id} changed at {self.changed_at:%Y-%m-%d %H:%M:%S}"
+
+
 class SavedTrade(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="saved_trades")
+    """A calculator trade saved for sharing.
+
+    Each side is stored as ``[[item_id, quantity], ...]`` sorted by item id
+    (see trades.normalize_trade), and share_code is a hash of that form, so
+    identical trades share one permalink and are saved once per user.
+    Anonymous shares have no user.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="saved_trades", null=True, blank=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
-    offer_items = models.JSONField()
-    request_items = models.JSONField()
-    offer_total = models.PositiveIntegerField(default=0)
-    request_total = models.PositiveIntegerField(default=0)
+    share_code = models.CharField(max_length=16, db_index=True)
+    offer_items = models.JSONField(default=list)
+    request_items = models.JSONField(default=list)
+    # Values when saved; the permalink shows them next to current values
+    offer_total = models.PositiveBigIntegerField(default=0)
+    request_total = models.PositiveBigIntegerField(default=0)
     note = models.CharField(max_length=255, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # The per-user listing pages through this newest first
+            models.Index(fields=["user", "-id"], name="values_savedtrade_user_id"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "share_code"], name="values_savedtrade_user_code"),
+            models.UniqueConstraint(
+                fields=["share_code"],
+                condition=models.Q(user__isnull=True),
+                name="values_savedtrade_anonymous_code",
+            ),
+        ]
 
     def __str__(self):
-        return f"Trade #{self.pk} by {self.user.username}"
+        return f"Trade {self.share_code} by {self.user.username if self.user_id else 'anonymous'}"
+
+    def get_absolute_url(self):
+        from django.urls import reverse
+
+        return reverse("values:trade_share", args=[self.share_code])
 
 
 class VerificationToken(models.Model):
@@ -159,6 +474,22 @@ def save_user_profile(sender, instance, **kwargs):
     Profile.objects.get_or_create(user=instance)
 
 
+@receiver(post_delete, sender=User)
+def drop_from_matchmaking(sender, instance, **kwargs):
+    # Replaying the change finds no inventory and forgets the user's holdings
+    from .matchmaking import note_inventory_changes
+
+    note_inventory_changes([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_reviewer_group(sender, **kwargs):
+    # The reviewer group may have been created, renamed or deleted
+    from .roles import clear_reviewer_group_id
+
+    clear_reviewer_group_id()
+
+
 class ValueChangeRequest(models.Model):
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
@@ -187,6 +518,10 @@ class ValueChangeRequest(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Value Change Request"
         verbose_name_plural = "Value Change Requests"
+        indexes = [
+            # The review queue groups the pending requests by item
+            models.Index(fields=["status", "item"], name="value_request_status_item_idx"),
+        ]
 
     def __str__(self):
         return f"{self.item.name}: {self.current_value} → {self.requested_value} ({self.get_status_display()})"
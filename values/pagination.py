@@ -0,0 +1,133 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched by filtering on the sort key of the row at the page boundary
+instead of using OFFSET, so a deep page costs the same as the first one and no
+COUNT(*) is needed to render the navigation. Cursors are opaque url-safe
+strings; the last field of the ordering must be unique (Item.name is) so every
+row has a distinct key.
+"""
+import base64
+import binascii
+import json
+from bisect import bisect_right
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, backwards=False):
+    raw = json.dumps([1 if backwards else 0, list(values)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (backwards, values) for a cursor made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if direction not in (0, 1) or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return bool(direction), values
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginate a queryset ordered by plain field or annotation names."""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.fields = []
+        for field in queryset.query.order_by:
+            if not isinstance(field, str) or "__" in field or field.startswith("?"):
+                raise ValueError(f"Cannot keyset-paginate on ordering {field!r}")
+            self.fields.append((field.lstrip("-"), field.startswith("-")))
+
+    def key(self, obj):
+        return [getattr(obj, name) for name, _ in self.fields]
+
+    def beyond(self, values, backwards=False):
+        """Q for rows strictly after ``values`` in the ordering (before, if backwards)."""
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        condition = None
+        for (name, descending), value in reversed(list(zip(self.fields, values))):
+            lookup = "lt" if descending != backwards else "gt"
+            past = Q(**{f"{name}__{lookup}": value})
+            condition = past if condition is None else past | (Q(**{name: value}) & condition)
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.queryset
+        backwards = False
+        if cursor:
+            backwards, values = decode_cursor(cursor)
+            queryset = queryset.filter(self.beyond(values, backwards))
+            if backwards:
+                queryset = queryset.reverse()
+
+        # One extra row tells us whether there is another page that way
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows)
+
+        has_next = has_more if not backwards else True
+        has_previous = bool(cursor) if not backwards else has_more
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(self.key(rows[-1])) if has_next else None,
+            previous_cursor=encode_cursor(self.key(rows[0]), backwards=True) if has_previous else None,
+        )
+
+
+def paginate_sequence(entries, key, per_page, cursor=None):
+    """Forward keyset pagination over a list already sorted by ``key``.
+
+    ``key`` must return a tuple of JSON-serializable values. Returns the page's
+    entries and the cursor for the next page (None on the last page).
+    """
+    start = 0
+    if cursor:
+        backwards, values = decode_cursor(cursor)
+        if backwards:
+            raise InvalidCursor(cursor)
+        try:
+            start = bisect_right(entries, tuple(values), key=key)
+        except TypeError as exc:
+            raise InvalidCursor(cursor) from exc
+    page = entries[start:start + per_page]
+    next_cursor = None
+    if page and start + per_page < len(entries):
+        next_cursor = encode_cursor(key(page[-1]))
+    return page, next_cursor
@@ -0,0 +1,197 @@
+"""
+Inventory portfolio valuation.
+
+Portfolio holds what each user's inventory is worth (the sum of item value x
+quantity) and PortfolioCategory the same per category, so profile pages and
+the leaderboard read one indexed row instead of aggregating inventories.
+
+The rows are maintained incrementally:
+
+- an inventory write adds quantity delta x value to the owner's two rows with
+  F() expressions (``adjust_portfolio``, from values/inventory.py and the
+  InventoryItem receivers in models.py);
+- a reprice adds (new - old value) x quantity to every holder's rows with one
+  set-based UPDATE ... FROM an aggregate of the repriced items' inventory
+  entries per table (``reprice_portfolios``), instead of a loop over users;
+- changes that move holdings between categories or remove items rebuild the
+  affected users' rows from their inventories (``rebuild_portfolios``).
+
+``manage.py rebuild_portfolios`` recomputes every row from scratch.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import BigIntegerField, F, Q, Sum
+
+from .bulk import BATCH_SIZE
+from .models import InventoryItem, Item, Portfolio, PortfolioCategory
+
+LEADERBOARD_SIZE = 100
+
+
+def _increment(model, lookup, total_value, item_count):
+    changed = model.objects.filter(**lookup).update(
+        total_value=F("total_value") + total_value, item_count=F("item_count") + item_count
+    )
+    if changed or item_count <= 0:
+        return changed
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, total_value=total_value, item_count=item_count)
+    except IntegrityError:
+        # Created by a concurrent request since the update
+        model.objects.filter(**lookup).update(
+            total_value=F("total_value") + total_value, item_count=F("item_count") + item_count
+        )
+    return 1
+
+
+def adjust_portfolio(user_id, item, quantity):
+    """Count ``quantity`` more (or, if negative, fewer) of an item in a user's portfolio.
+
+    ``item`` is an Item, or an item id to look its value up by.
+    """
+    if not quantity:
+        return
+    if isinstance(item, Item):
+        value, category_id = item.value, item.category_id
+    else:
+        found = Item.objects.filter(pk=item).values_list("value", "category_id").first()
+        if found is None:
+            return
+        value, category_id = found
+
+    amount = value * quantity
+    with transaction.atomic(savepoint=False):
+        counted = _increment(Portfolio, {"user_id": user_id}, amount, quantity)
+        counted &= _increment(PortfolioCategory, {"user_id": user_id, "category_id": category_id}, amount, quantity)
+    if not counted:
+        # Removing holdings that were never counted: the rows are out of step
+        rebuild_portfolios(user_ids=[user_id])
+
+
+def adjust_entry(entry, quantity):
+    """adjust_portfolio for an InventoryItem, using its item if already loaded."""
+    item = entry.item if InventoryItem.item.is_cached(entry) else entry.item_id
+    adjust_portfolio(entry.user_id, item, quantity)
+
+
+def reprice_portfolios(changes):
+    """Apply value changes to every holder's portfolio.
+
+    ``changes`` maps item id to (category_id, value delta). On PostgreSQL and
+    SQLite this is one UPDATE ... FROM per table per thousand items; other
+    backends rebuild the holders' rows.
+    """
+    changes = {pk: change for pk, change in changes.items() if change[1]}
+    if not changes:
+        return
+    if connection.vendor not in ("postgresql", "sqlite"):
+        rebuild_portfolios(holders=list(changes))
+        return
+
+    qn = connection.ops.quote_name
+    bigint = BigIntegerField().cast_db_type(connection)
+    inventory = qn(InventoryItem._meta.db_table)
+    # Per table, the aggregate's key columns; v.column2 is the item's category
+    tables = (
+        (qn(Portfolio._meta.db_table), {"user_id": "inv.user_id"}),
+        (qn(PortfolioCategory._meta.db_table), {"user_id": "inv.user_id", "category_id": "v.column2"}),
+    )
+    rows = list(changes.items())
+    with transaction.atomic(savepoint=False), connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            placeholder = f"(CAST(%s AS {bigint}), CAST(%s AS {bigint}), CAST(%s AS {bigint}))"
+            params = [param for pk, (category_id, delta) in batch for param in (pk, category_id, delta)]
+            for table, keys in tables:
+                cursor.execute(
+                    f"UPDATE {table} SET total_value = {table}.total_value + d.amount "
+                    f"FROM (SELECT {', '.join(f'{source} AS {key}' for key, source in keys.items())}, "
+                    f"SUM(inv.quantity * v.column3) AS amount "
+                    f"FROM {inventory} inv "
+                    f"JOIN (VALUES {', '.join([placeholder] * len(batch))}) AS v ON inv.item_id = v.column1 "
+                    f"GROUP BY {', '.join(keys.values())}) AS d "
+                    f"WHERE {' AND '.join(f'{table}.{key} = d.{key}' for key in keys)}",
+                    params,
+                )
+
+
+def rebuild_portfolios(user_ids=None, holders=None):
+    """Recompute portfolios from inventories.
+
+    For the given users, the users holding any of the ``holders`` item ids,
+    or (with neither) everyone.
+    """
+    inventory = InventoryItem.objects.all()
+    if holders is not None:
+        user_ids = set(InventoryItem.objects.filter(item_id__in=holders).values_list("user_id", flat=True))
+    if user_ids is not None:
+        if not user_ids:
+            return 0
+        inventory = inventory.filter(user_id__in=user_ids)
+
+    amount = Sum(F("quantity") * F("item__value"), output_field=BigIntegerField())
+    count = Sum("quantity", output_field=BigIntegerField())
+    per_category = list(
+        inventory.values_list("user_id", "item__category_id")
+        .annotate(total_value=amount, item_count=count)
+        .order_by()
+    )
+    totals = {}
+    for user_id, _, total_value, item_count in per_category:
+        user_value, user_count = totals.get(user_id, (0, 0))
+        totals[user_id] = (user_value + total_value, user_count + item_count)
+
+    with transaction.atomic(savepoint=False):
+        for model in (Portfolio, PortfolioCategory):
+            rows = model.objects.all()
+            if user_ids is not None:
+                rows = rows.filter(user_id__in=user_ids)
+            rows.delete()
+        Portfolio.objects.bulk_create(
+            (
+                Portfolio(user_id=user_id, total_value=total_value, item_count=item_count)
+                for user_id, (total_value, item_count) in totals.items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        PortfolioCategory.objects.bulk_create(
+            (
+                PortfolioCategory(
+                    user_id=user_id, category_id=category_id, total_value=total_value, item_count=item_count
+                )
+                for user_id, category_id, total_value, item_count in per_category
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    return len(totals)
+
+
+def leaderboard(category=None, limit=LEADERBOARD_SIZE):
+    """The most valuable portfolios, overall or in one Category, best first."""
+    if category is None:
+        rows = Portfolio.objects.all()
+    else:
+        rows = PortfolioCategory.objects.filter(category=category)
+    return rows.filter(total_value__gt=0).select_related("user", "user__profile").order_by(
+        "-total_value", "user_id"
+    )[:limit]
+
+
+def portfolio_rank(user, category=None):
+    """A user's 1-based leaderboard position, or None without holdings."""
+    rows = Portfolio.objects.all() if category is None else PortfolioCategory.objects.filter(category=category)
+    total_value = rows.filter(user=user).values_list("total_value", flat=True).first()
+    if not total_value:
+        return None
+    # Ties rank by user id, as leaderboard() orders them
+    ahead = Q(total_value__gt=total_value) | Q(total_value=total_value, user_id__lt=user.pk)
+    return rows.filter(ahead).count() + 1
+
+
+def category_breakdown(user):
+    """A user's PortfolioCategory rows with holdings, most valuable first."""
+    return list(
+        PortfolioCategory.objects.filter(user=user, item_count__gt=0)
+        .select_related("category")
+        .order_by("-total_value", "category__name")
+    )
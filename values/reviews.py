@@ -0,0 +1,102 @@
+"""
+Value change request review.
+
+``review_queue`` groups pending requests by item, oldest first, with the
+figures a reviewer decides on: how many requests there are, their median and
+range, and the median's change from the item's current value.
+
+``review_requests`` applies many decisions at once: in one transaction it
+marks the requests with one UPDATE per decision and writes every new item
+value through catalog_io.apply_diff, the set-based path catalog imports use
+(one UPDATE ... FROM VALUES, the history snapshots, the portfolio reprice and
+one catalog version bump), instead of saving each item.
+"""
+import statistics
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .catalog_io import CatalogDiff, apply_diff
+from .models import Item, ValueChangeRequest
+
+REVIEW_PAGE_SIZE = 25
+# Requests one bulk review may decide
+MAX_DECISIONS = 1000
+
+PENDING = ValueChangeRequest.Status.PENDING
+
+
+def review_queue():
+    """Items with pending requests, longest waiting first, for KeysetPaginator.
+
+    Ordered by their first pending request's id, which is unique per item.
+    """
+    return (
+        Item.objects.filter(value_change_requests__status=PENDING)
+        .annotate(pending=Count("value_change_requests"), first_request=Min("value_change_requests__id"))
+        .order_by("first_request")
+    )
+
+
+def attach_requests(items):
+    """Set ``requests`` and the summary figures on a page of review_queue() items."""
+    grouped = {}
+    for value_request in (
+        ValueChangeRequest.objects.filter(status=PENDING, item__in=items)
+        .select_related("requested_by")
+        .order_by("created_at", "pk")
+    ):
+        grouped.setdefault(value_request.item_id, []).append(value_request)
+    for item in items:
+        item.requests = grouped.get(item.pk, [])
+        values = [value_request.requested_value for value_request in item.requests]
+        if not values:
+            continue
+        item.median_value = round(statistics.median(values))
+        item.lowest_value, item.highest_value = min(values), max(values)
+        item.median_change = item.median_value - item.value
+        item.median_change_percent = round(100 * item.median_change / item.value, 1) if item.value else None
+    return items
+
+
+def review_requests(reviewer, approve=(), reject=(), notes="", now=None):
+    """Approve and reject pending requests by pk, in one transaction.
+
+    Requests that aren't pending (anymore) are skipped. When several approved
+    requests are for one item, the newest sets its value, as approving them
+    one at a time in order would. Returns the numbers approved and rejected.
+    """
+    now = now or timezone.now()
+    approve, reject = set(approve), set(reject) - set(approve)
+    with transaction.atomic(savepoint=False):
+        pending = list(
+            ValueChangeRequest.objects.select_for_update()
+            .filter(pk__in=approve | reject, status=PENDING)
+            .select_related("item")
+            .order_by("created_at", "pk")
+        )
+        approved = [value_request for value_request in pending if value_request.pk in approve]
+        rejected = [value_request.pk for value_request in pending if value_request.pk in reject]
+
+        values = {}
+        for value_request in approved:
+            values[value_request.item_id] = (value_request.item, value_request.requested_value)
+        diff = CatalogDiff()
+        for item, value in values.values():
+            if item.value != value:
+                diff.updated.append((item, {"value": (item.value, value)}))
+                item.value = value
+        if diff:
+            apply_diff(diff, now)
+
+        decided = {"reviewed_by": reviewer, "reviewed_at": now, "review_notes": notes}
+        if approved:
+            ValueChangeRequest.objects.filter(pk__in=[value_request.pk for value_request in approved]).update(
+                status=ValueChangeRequest.Status.APPROVED, **decided
+            )
+        if rejected:
+            ValueChangeRequest.objects.filter(pk__in=rejected).update(
+                status=ValueChangeRequest.Status.REJECTED, **decided
+            )
+    return len(approved), len(rejected)
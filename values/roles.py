@@ -0,0 +1,52 @@
+"""
+Role checks shared by views, access decorators and templates.
+
+A user's group ids are loaded with one query the first time a check needs them
+and kept on the user object, which Django builds fresh for every request, so a
+page that asks several times still costs a single query. The Value Reviewers
+group id is kept in the shared cache, so every process sees the Group signal
+handlers in models.py drop it whenever a group is saved or deleted. A missing
+group isn't cached: the group may be created at any time, e.g. by
+``manage.py setup_value_reviewers`` while the site is running.
+"""
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+VALUE_REVIEWERS = "Value Reviewers"
+
+REVIEWER_GROUP_KEY = "values:reviewer_group_id"
+# Bounds how long a change made outside the ORM (raw SQL) goes unnoticed
+REVIEWER_GROUP_TIMEOUT = 60 * 60
+
+
+def get_reviewer_group_id():
+    """Return the Value Reviewers group id, or None if the group doesn't exist."""
+    group_id = cache.get(REVIEWER_GROUP_KEY)
+    if group_id is None:
+        group_id = Group.objects.filter(name=VALUE_REVIEWERS).values_list("pk", flat=True).first()
+        if group_id is not None:
+            cache.set(REVIEWER_GROUP_KEY, group_id, REVIEWER_GROUP_TIMEOUT)
+    return group_id
+
+
+def clear_reviewer_group_id():
+    cache.delete(REVIEWER_GROUP_KEY)
+
+
+def get_group_ids(user):
+    """Return the ids of the user's groups, loaded at most once per user object."""
+    if not user.is_authenticated:
+        return frozenset()
+    try:
+        return user._values_group_ids
+    except AttributeError:
+        user._values_group_ids = frozenset(user.groups.values_list("pk", flat=True))
+        return user._values_group_ids
+
+
+def is_value_reviewer(user):
+    """Check if user is in the Value Reviewers group"""
+    if not user or not user.is_authenticated:
+        return False
+    group_id = get_reviewer_group_id()
+    return group_id is not None and group_id in get_group_ids(user)
@@ -0,0 +1,238 @@
+"""
+Full-text item search over name, obtained_from and notes.
+
+On PostgreSQL, migration 0018 adds a weighted ``search_vector`` tsvector column
+that the database generates from those fields, backed by a GIN index. On SQLite
+(dev and tests) it creates an FTS5 table instead, which the Item signal handlers
+in models.py keep in step. Anything that writes items without sending signals
+(bulk updates, data migrations) must call ``index_items`` or ``rebuild_index``.
+
+Views reach both through ``Item.objects.search(query)``, which returns the
+queryset filtered to matches, annotated with ``search_rank`` (higher is more
+relevant) and ordered by it. Ranks are integers (the backend's score times
+RANK_SCALE): keyset pagination compares them with the rank decoded from a
+JSON cursor, and a float doesn't always survive that round trip to compare
+equal with the one the database recomputes, which would skip or repeat rows
+that tie on rank.
+
+Typo-tolerant autocomplete on item names is handled by ``suggest_items``: a
+pg_trgm GiST index (migration 0019) on PostgreSQL, and an in-memory trigram and
+word-prefix index built from the catalog snapshot everywhere else.
+"""
+import heapq
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.db import connection, connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "values_item_fts"
+
+# Upper bound on ranked matches pulled from the FTS table per search
+MAX_RESULTS = 500
+
+TOKEN_RE = re.compile(r"\w+")
+
+# search_rank is the backend's relevance score in millionths
+RANK_SCALE = 1_000_000
+
+# Minimum trigram similarity (0-1) for a name to count as a suggestion
+SUGGEST_THRESHOLD = 0.3
+
+
+def search_items(queryset, query):
+    tokens = TOKEN_RE.findall(query)
+    vendor = connections[queryset.db].vendor
+    if not tokens:
+        # Nothing the indexes can match on (e.g. only punctuation)
+        return _search_icontains(queryset, query)
+    if vendor == "postgresql":
+        return _search_postgresql(queryset, tokens)
+    if vendor == "sqlite":
+        return _search_sqlite(queryset, tokens)
+    return _search_icontains(queryset, query)
+
+
+def _search_postgresql(queryset, tokens):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+
+    vector = RawSQL(
+        f'"{queryset.model._meta.db_table}"."search_vector"', [], output_field=SearchVectorField()
+    )
+    # Prefix-match every word so half-typed names still hit
+    search_query = SearchQuery(
+        " & ".join(f"{token}:*" for token in tokens), config="english", search_type="raw"
+    )
+    return (
+        queryset.annotate(
+            search_vector=vector,
+            search_rank=Cast(SearchRank(vector, search_query) * RANK_SCALE, IntegerField()),
+        )
+        .filter(search_vector=search_query)
+        .order_by("-search_rank", "name")
+    )
+
+
+def _search_sqlite(queryset, tokens):
+    match = " ".join(f'"{token}"*' for token in tokens)
+    with connections[queryset.db].cursor() as cursor:
+        # bm25 weights follow the column order: name, obtained_from, notes
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 2.0, 1.0) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY 2 LIMIT %s",
+            [match, MAX_RESULTS],
+        )
+        ranked = cursor.fetchall()
+    if not ranked:
+        return queryset.none()
+    # bm25 scores are negative, lower being better
+    rank = Case(
+        *[When(pk=pk, then=Value(round(-score * RANK_SCALE))) for pk, score in ranked],
+        output_field=IntegerField(),
+    )
+    return (
+        queryset.filter(pk__in=[pk for pk, _ in ranked])
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "name")
+    )
+
+
+def _search_icontains(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query)
+        | Q(notes__icontains=query)
+        | Q(obtained_from__icontains=query)
+    ).annotate(search_rank=Value(0, output_field=IntegerField()))
+
+
+def index_items(items):
+    """Refresh the FTS rows for the given items (no-op outside SQLite)."""
+    if connection.vendor != "sqlite":
+        return
+    rows = [(item.pk, item.name, item.obtained_from, item.notes) for item in items]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, obtained_from, notes) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def unindex_items(pks):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in pks])
+
+
+def rebuild_index():
+    """Repopulate the FTS table from values_item (no-op outside SQLite)."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, obtained_from, notes) "
+            "SELECT id, name, obtained_from, notes FROM values_item"
+        )
+
+
+def normalize_name(name):
+    return " ".join(TOKEN_RE.findall(name.casefold().replace("_", " ")))
+
+
+def trigrams(text):
+    """Trigrams of each word, padded the way pg_trgm pads them."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """In-memory trigram and word-prefix index over item names."""
+
+    def __init__(self, entries):
+        self.names = {}
+        self.trigrams = {}
+        self.postings = defaultdict(list)
+        self.prefixes = []
+        for pk, name in entries:
+            normalized = normalize_name(name)
+            self.names[pk] = normalized
+            self.trigrams[pk] = trigrams(normalized)
+            for gram in self.trigrams[pk]:
+                self.postings[gram].append(pk)
+            self.prefixes.extend((word, pk) for word in normalized.split())
+        self.prefixes.sort()
+
+    def suggest(self, query, limit, threshold=SUGGEST_THRESHOLD, prefixes=True):
+        """Return up to ``limit`` (pk, score) pairs, best match first.
+
+        ``prefixes=False`` scores whole names only, without the boost for
+        names with a word starting with the last (still being typed) word.
+        """
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        query_grams = trigrams(normalized)
+        shared = Counter()
+        for gram in query_grams:
+            for pk in self.postings.get(gram, ()):
+                shared[pk] += 1
+
+        scores = {}
+        for pk, count in shared.items():
+            # Mostly how much of the query the name covers, so a partial
+            # query isn't penalized for the rest of a long name
+            coverage = count / len(query_grams)
+            jaccard = count / (len(query_grams) + len(self.trigrams[pk]) - count)
+            score = 0.7 * coverage + 0.3 * jaccard
+            if score >= threshold:
+                scores[pk] = score
+
+        # Names with a word starting with the word being typed rank first,
+        # still ordered among themselves by similarity
+        if prefixes:
+            last_word = normalized.split()[-1]
+            prefixed = set()
+            i = bisect_left(self.prefixes, (last_word,))
+            while i < len(self.prefixes) and self.prefixes[i][0].startswith(last_word):
+                prefixed.add(self.prefixes[i][1])
+                i += 1
+            for pk in prefixed:
+                scores[pk] = 0.5 + 0.5 * scores.get(pk, 0.0)
+
+        best = heapq.nsmallest(limit, scores.items(), key=lambda pair: (-pair[1], self.names[pair[0]]))
+        return [(pk, round(score, 3)) for pk, score in best]
+
+
+def suggest_items(query, limit):
+    """Top fuzzy name matches for autocomplete as (CatalogItem, score) pairs."""
+    from .catalog import get_catalog
+
+    catalog = get_catalog()
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramWordDistance
+
+        from .models import Item
+
+        # Distance ordering with LIMIT is a nearest-neighbour scan of the GiST index
+        rows = (
+            Item.objects.annotate(distance=TrigramWordDistance(query, "name"))
+            .filter(distance__lte=1 - SUGGEST_THRESHOLD)
+            .order_by("distance", "name")
+            .values_list("pk", "distance")[:limit]
+        )
+        matches = [(pk, round(1 - distance, 3)) for pk, distance in rows]
+    else:
+        matches = catalog.name_index.suggest(query, limit)
+    return [(catalog.by_id[pk], score) for pk, score in matches if pk in catalog.by_id]
@@ -0,0 +1,55 @@
+"""
+Catalog-wide aggregates for the landing page.
+
+Item counts per category, rarity and trend come from one query grouped on all
+three, and together with the category list and featured items they are cached
+under the catalog version, so they are recomputed only after the next
+Item/Category change (see catalog.catalog_changed).
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .catalog import get_catalog_version
+
+FEATURED_ITEMS = 6
+
+
+class CatalogStats:
+    def __init__(self, categories, featured_items, by_category, by_rarity, by_trend):
+        self.categories = categories
+        self.featured_items = featured_items
+        self.by_category = by_category
+        self.by_rarity = by_rarity
+        self.by_trend = by_trend
+
+    @property
+    def total_items(self):
+        return sum(self.by_category.values())
+
+
+def build_stats():
+    from .models import Category, Item
+
+    by_category, by_rarity, by_trend = Counter(), Counter(), Counter()
+    rows = (
+        Item.objects.order_by()
+        .values_list("category_id", "rarity", "trend")
+        .annotate(count=Count("pk"))
+    )
+    for category_id, rarity, trend, count in rows:
+        by_category[category_id] += count
+        by_rarity[rarity] += count
+        by_trend[trend] += count
+
+    categories = list(Category.objects.all())
+    for category in categories:
+        category.item_count = by_category[category.pk]
+    featured_items = list(Item.objects.filter(featured=True)[:FEATURED_ITEMS])
+    return CatalogStats(categories, featured_items, dict(by_category), dict(by_rarity), dict(by_trend))
+
+
+def get_catalog_stats():
+    """Return the current CatalogStats, computing them once per catalog version."""
+    return cache.get_or_set(f"values:catalog_stats:{get_catalog_version()}", build_stats, 60 * 60 * 24)
@@ -0,0 +1,37 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from values.images import MIME_TYPES, get_manifest, get_srcsets
+from values.media import hashed_media_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image_url, alt, max_width, css_class=""):
+    """Render image_url as a <picture> offering its resized AVIF/WebP versions.
+
+    ``max_width`` is the widest the image is shown, in CSS pixels; browsers
+    pick the smallest derivative that covers it and fall back to the original.
+    """
+    entry = get_manifest().get(image_url)
+    sources = ""
+    if entry:
+        # Never advertise a slot wider than the source, which would upscale it
+        sizes = f"{min(int(max_width), entry['widths'][-1])}px"
+        sources = format_html_join(
+            "",
+            '<source type="{}" srcset="{}" sizes="{}">',
+            ((MIME_TYPES[fmt], srcset, sizes) for fmt, srcset in get_srcsets(image_url).items()),
+        )
+    if css_class:
+        img = format_html('<img src="{}" alt="{}" class="{}">', hashed_media_url(image_url), alt, css_class)
+    else:
+        img = format_html('<img src="{}" alt="{}">', hashed_media_url(image_url), alt)
+    return format_html("<picture>{}{}</picture>", sources, img)
+
+
+@register.filter
+def media_url(image_url):
+    """Fingerprinted, long-cacheable URL for a file under MEDIA_URL."""
+    return hashed_media_url(image_url)
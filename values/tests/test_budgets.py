@@ -0,0 +1,601 @@
+"""
+Query budgets for every view in values/urls.py and every admin changelist.
+
+The suite seeds a catalog about the size of production, then requests each page
+and fails if it runs more queries than its budget. A budget is an upper bound,
+so lower it when a change saves queries; raising one needs a reason in review.
+
+Wall-clock timings (median of TIMING_RUNS warm requests) are written to
+PERF_ARTIFACT, and the first run records them as the baseline. They're only
+reported by default, since they depend on the machine and its load; set
+VALUES_PERF_ASSERT=1 to also fail when a view gets more than TIMING_TOLERANCE
+times slower than its baseline. Delete the file, or set VALUES_PERF_RESET=1, to
+record a new baseline.
+"""
+import csv
+import json
+import math
+import os
+import statistics
+import time
+from datetime import timedelta
+from collections import Counter
+from io import StringIO
+from itertools import cycle
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..bulk import BATCH_SIZE as BULK_BATCH_SIZE
+from ..catalog_io import apply_diff, diff_catalog, export_lines
+from ..models import (
+    Category,
+    InventoryChange,
+    InventoryItem,
+    Item,
+    ItemValueSnapshot,
+    Portfolio,
+    PortfolioCategory,
+    Profile,
+    SavedTrade,
+    ValueChangeRequest,
+    VerificationToken,
+)
+from ..matchmaking import CHANGE_OVERLAP, CHANGE_RETENTION, PRUNE_INTERVAL, get_holder_index
+from ..portfolio import rebuild_portfolios
+from ..roles import VALUE_REVIEWERS, clear_reviewer_group_id
+from ..search import rebuild_index
+from ..trades import share_code
+from ..trends import recompute_trends
+
+PERF_ARTIFACT = os.environ.get(
+    "VALUES_PERF_ARTIFACT", os.path.join(settings.BASE_DIR, ".perf", "values_views.json")
+)
+TIMING_RUNS = 5
+PERF_ASSERT = bool(os.environ.get("VALUES_PERF_ASSERT"))
+# Allowed slowdown against the baseline, plus a floor so sub-millisecond
+# views don't fail on scheduler noise
+TIMING_TOLERANCE = 2.0
+TIMING_SLACK = 0.05
+
+CATEGORIES = 8
+ITEMS = 2000
+USERS = 300
+INVENTORY_PER_USER = 40
+VALUE_REQUESTS = 1000
+SAVED_TRADES = 60
+# Value changes per item over the last year, for the history API
+HISTORY_PER_ITEM = 50
+PASSWORD = "budget-pass-123"
+
+# Session, user, related list_filter choices, the two changelist counts,
+# the page and one prefetch, however many rows are listed
+ADMIN_BUDGET = 7
+
+_timings = {}
+
+
+def seed_catalog():
+    """Bulk-insert a production-sized catalog, users, inventories and requests."""
+    categories = Category.objects.bulk_create(
+        Category(name=f"Category {n}", slug=f"category-{n}") for n in range(CATEGORIES)
+    )
+    rarities = cycle(Item.Rarity.values)
+    types = cycle(Item.ItemType.values)
+    trends = cycle(Item.Trend.values)
+    items = []
+    for n in range(ITEMS):
+        rarity = next(rarities)
+        items.append(
+            Item(
+                name=f"Item {n:04d}",
+                slug=f"item-{n:04d}",
+                category=categories[n % CATEGORIES],
+                item_type=next(types),
+                rarity=rarity,
+                rarity_rank=Item.RARITY_RANKS[rarity],
+                value=(n * 37) % 5000 + 1,
+                demand=n % 10 + 1,
+                trend=next(trends),
+                featured=n % 50 == 0,
+                obtained_from=f"Raid {n % 12}",
+                notes=f"Seeded item number {n}",
+            )
+        )
+    items = Item.objects.bulk_create(items)
+    rebuild_index()
+    now = timezone.now()
+    ItemValueSnapshot.objects.bulk_create(
+        (
+            ItemValueSnapshot(
+                item=item,
+                recorded_at=now - timedelta(days=365 * (HISTORY_PER_ITEM - n) / HISTORY_PER_ITEM),
+                value=item.value + n * 10,
+                demand=item.demand,
+                trend=item.trend,
+            )
+            for item in items
+            for n in range(HISTORY_PER_ITEM)
+        ),
+        batch_size=5000,
+    )
+
+    password = make_password(PASSWORD)
+    users = User.objects.bulk_create(
+        User(username=f"user{n:03d}", email=f"user{n:03d}@example.com", password=password)
+        for n in range(USERS)
+    )
+    Profile.objects.bulk_create(Profile(user=user) for user in users)
+    InventoryItem.objects.bulk_create(
+        InventoryItem(user=user, item=items[(i * 7 + u) % ITEMS], quantity=i % 3 + 1)
+        for u, user in enumerate(users)
+        for i in range(INVENTORY_PER_USER)
+    )
+    rebuild_portfolios()
+    statuses = cycle(ValueChangeRequest.Status.values)
+    ValueChangeRequest.objects.bulk_create(
+        ValueChangeRequest(
+            item=items[n % ITEMS],
+            requested_by=users[n % 10],
+            current_value=items[n % ITEMS].value,
+            requested_value=items[n % ITEMS].value + 10,
+            reason="Seeded request",
+            status=next(statuses),
+        )
+        for n in range(VALUE_REQUESTS)
+    )
+    trades = []
+    for n in range(SAVED_TRADES):
+        offer = [[items[n].id, 1], [items[n + 1].id, 2]]
+        request = [[items[n + 100].id, 3]]
+        trades.append(
+            SavedTrade(
+                user=users[0],
+                share_code=share_code(offer, request),
+                offer_items=offer,
+                request_items=request,
+            )
+        )
+    SavedTrade.objects.bulk_create(trades)
+    return users
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = seed_catalog()
+        cls.user = users[0]
+        cls.reviewer = users[1]
+        reviewers = Group.objects.create(name=VALUE_REVIEWERS)
+        reviewers.user_set.add(cls.reviewer)
+        # Groups for the admin changelist's group column
+        Group.objects.bulk_create(Group(name=f"Group {n}") for n in range(5))
+        for user in users[:50]:
+            user.groups.add(reviewers)
+        cls.staff = User.objects.create_user("staff", password=PASSWORD, is_staff=True)
+        cls.superuser = User.objects.create_superuser("root", "root@example.com", PASSWORD)
+        cls.item = Item.objects.get(slug="item-0042")
+        cls.pending = ValueChangeRequest.objects.filter(status=ValueChangeRequest.Status.PENDING)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.baseline = load_baseline()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if _timings:
+            record_timings(cls.baseline, _timings)
+
+    def setUp(self):
+        cache.clear()
+        clear_reviewer_group_id()
+
+    def assertWithinBudget(
+        self, name, budget, url, user=None, method="get", data=None, status=200, timed=True, **extra
+    ):
+        """Request url cold and fail if it needs more than budget queries.
+
+        Timed requests are then repeated warm and checked against the baseline.
+        """
+        if user is not None:
+            self.client.force_login(user)
+        request = getattr(self.client, method)
+        with CaptureQueriesContext(connection) as queries:
+            response = request(url, data, **extra)
+        self.assertEqual(response.status_code, status, url)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            f"{name} ran {len(queries)} queries (budget {budget}):\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        if method != "get" or not timed:
+            return response
+
+        samples = []
+        for _ in range(TIMING_RUNS):
+            start = time.perf_counter()
+            request(url, data, **extra)
+            samples.append(time.perf_counter() - start)
+        self.assertTiming(name, statistics.median(samples))
+        return response
+
+    def assertTiming(self, name, seconds):
+        """Record a timing; with VALUES_PERF_ASSERT, fail if it's over the baseline's allowance."""
+        _timings[name] = seconds
+        if PERF_ASSERT and name in self.baseline:
+            limit = self.baseline[name] * TIMING_TOLERANCE + TIMING_SLACK
+            self.assertLessEqual(
+                seconds,
+                limit,
+                f"{name} took {seconds * 1000:.1f}ms "
+                f"(baseline {self.baseline[name] * 1000:.1f}ms, see {PERF_ARTIFACT})",
+            )
+
+    def test_public_pages(self):
+        self.assertWithinBudget("landing", 3, reverse("values:landing"))
+        self.assertWithinBudget("item_list", 3, reverse("values:item_list"))
+        self.assertWithinBudget(
+            "item_list_filtered",
+            3,
+            reverse("values:item_list"),
+            data={"category": "category-3", "rarity": "rare", "sort": "value_asc"},
+        )
+        self.assertWithinBudget(
+            "item_list_search", 4, reverse("values:item_list"), data={"q": "item 01"}
+        )
+        self.assertWithinBudget("item_detail", 2, self.item.get_absolute_url())
+        history_url = reverse("values:api_item_history", args=[self.item.slug])
+        self.assertWithinBudget("api_item_history", 3, history_url)
+        response = self.assertWithinBudget(
+            "api_item_history_downsampled", 2, history_url, data={"start": "2000-01-01", "points": 10}
+        )
+        self.assertLessEqual(len(response.json()["points"]), 10)
+        self.assertWithinBudget("trade_calculator", 1, reverse("values:trade_calculator"))
+        self.assertWithinBudget("leaderboard", 2, reverse("values:leaderboard"))
+        self.assertWithinBudget(
+            "leaderboard_category", 2, reverse("values:leaderboard"), data={"category": "category-3"}
+        )
+        self.assertWithinBudget("login", 1, reverse("values:login"))
+        self.assertWithinBudget("register", 0, reverse("values:register"))
+
+    def test_api(self):
+        self.assertWithinBudget("api_items_list", 1, reverse("values:api_items_list"))
+        self.assertWithinBudget(
+            "api_items_list_search", 2, reverse("values:api_items_list"), data={"q": "item"}
+        )
+        self.assertWithinBudget("api_items_catalog", 1, reverse("values:api_items_catalog"))
+        self.assertWithinBudget(
+            "api_items_catalog_changes",
+            1,
+            reverse("values:api_items_catalog_changes"),
+            data={"since": "0.unknown"},
+        )
+        trade = {"offer": [["item-0001", 2], [5, 1]], "request": [{"item": "item-0002", "quantity": 3}]}
+        self.assertWithinBudget(
+            "api_trade_evaluate_batch",
+            1,
+            reverse("values:api_trade_evaluate"),
+            method="post",
+            data={"trades": [trade] * 200},
+            content_type="application/json",
+        )
+        self.assertWithinBudget(
+            "api_trades_save",
+            4,
+            reverse("values:api_trades_save"),
+            method="post",
+            data=trade,
+            content_type="application/json",
+            status=201,
+        )
+        code = SavedTrade.objects.latest("pk").share_code
+        self.assertWithinBudget("api_trade_detail", 1, reverse("values:api_trade_detail", args=[code]))
+        self.assertWithinBudget("trade_share", 1, reverse("values:trade_share", args=[code]))
+        self.assertWithinBudget(
+            "trade_share_image", 0, reverse("values:trade_share_image", args=[code]), timed=False
+        )
+        self.assertWithinBudget(
+            "api_items_suggest", 1, reverse("values:api_items_suggest"), data={"q": "itme 12"}
+        )
+
+    def test_user_pages(self):
+        self.assertWithinBudget("profile", 7, reverse("values:profile"), user=self.user)
+        self.assertWithinBudget("leaderboard_user", 7, reverse("values:leaderboard"))
+        self.assertWithinBudget(
+            "inventory_add",
+            7,
+            reverse("values:inventory_add", args=[self.item.slug]),
+            method="post",
+            status=302,
+        )
+        entry = self.user.inventory_items.first()
+        self.assertWithinBudget(
+            "inventory_remove",
+            7,
+            reverse("values:inventory_remove", args=[entry.pk]),
+            method="post",
+            status=302,
+        )
+        # Importing a 300-item inventory in one request
+        operations = [{"op": "add", "item": f"item-{n:04d}", "quantity": 2} for n in range(1000, 1300)]
+        operations += [{"op": "set", "item": "item-1000", "quantity": 5}, {"op": "remove", "item": "item-1001"}]
+        response = self.assertWithinBudget(
+            "api_inventory",
+            16,
+            reverse("values:api_inventory"),
+            method="post",
+            data={"operations": operations},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["added"], 298)
+        # Pasting a 300-line list, with typos and unknown names, resolved in memory
+        text = "\n".join(f"Item {n:04d} x3" for n in range(1300, 1596))
+        text += "\nItme 1596\n2x Item 1597\nNothing Here\nItem 1598 x0"
+        response = self.assertWithinBudget(
+            "inventory_import",
+            13,
+            reverse("values:inventory_import"),
+            method="post",
+            data={"text": text, "mode": "set"},
+        )
+        self.assertEqual(len(response.context["matched"]), 298)
+        self.assertEqual(len(response.context["unmatched"]), 2)
+        self.assertEqual(len(response.context["fuzzy"]), 1)
+        self.assertEqual(response.context["counts"]["set"], 298)
+        self.assertWithinBudget("saved_trades", 5, reverse("values:saved_trades"))
+        trade = self.user.saved_trades.first()
+        self.assertWithinBudget(
+            "saved_trade_delete",
+            5,
+            reverse("values:saved_trade_delete", args=[trade.pk]),
+            method="post",
+            status=302,
+        )
+        self.assertWithinBudget("logout", 4, reverse("values:logout"), status=302, timed=False)
+
+    def test_verify_account(self):
+        inactive = User.objects.create_user("inactive", password=PASSWORD, is_active=False)
+        token = VerificationToken.objects.create(user=inactive)
+        self.assertWithinBudget(
+            "verify", 6, reverse("values:verify", args=[token.token]), timed=False
+        )
+
+    def test_reviewer_pages(self):
+        self.assertWithinBudget("item_detail_reviewer", 6, self.item.get_absolute_url(), user=self.reviewer)
+        self.assertWithinBudget(
+            "request_value_change",
+            5,
+            reverse("values:request_value_change", args=[self.item.slug]),
+        )
+        self.assertWithinBudget("value_requests", 4, reverse("values:value_requests"))
+
+    def test_staff_pages(self):
+        self.assertWithinBudget("item_list_staff", 7, reverse("values:item_list"), user=self.staff)
+        self.assertWithinBudget("item_create", 4, reverse("values:item_create"))
+        self.assertWithinBudget("item_edit", 5, reverse("values:item_edit", args=[self.item.slug]))
+        self.assertWithinBudget("cache_stats", 2, reverse("values:cache_stats"))
+        doomed = Item.objects.get(slug="item-1999")
+        self.assertWithinBudget(
+            "item_delete",
+            9,
+            reverse("values:item_delete", args=[doomed.slug]),
+            method="post",
+            status=302,
+        )
+
+    def test_superuser_pages(self):
+        self.assertWithinBudget(
+            "admin_value_requests",
+            3,
+            reverse("values:admin_value_requests"),
+            user=self.superuser,
+            data={"status": "all"},
+        )
+        self.assertWithinBudget(
+            "approve_value_request",
+            8,
+            reverse("values:approve_value_request", args=[self.pending[0].pk]),
+            method="post",
+            status=302,
+        )
+        self.assertWithinBudget(
+            "reject_value_request",
+            4,
+            reverse("values:reject_value_request", args=[self.pending[1].pk]),
+            method="post",
+            status=302,
+        )
+        self.assertWithinBudget("review_queue", 4, reverse("values:admin_value_requests"))
+
+    def test_bulk_review(self):
+        pending = list(self.pending.order_by("pk").values_list("pk", "item_id", "requested_value"))
+        approve, reject = pending[:200], pending[200:]
+        self.assertTrue(reject)
+        self.client.force_login(self.superuser)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("values:review_value_requests"),
+                {"action": "approve", "requests": [pk for pk, _, _ in approve], "review_notes": "Patch 1.2"},
+            )
+        self.assertEqual(response.status_code, 302)
+        # One set-based UPDATE for the item values, one per portfolio table and
+        # one for the requests, however many are approved
+        statements = Counter(query["sql"].split(None, 1)[0] for query in queries.captured_queries)
+        self.assertEqual(statements["UPDATE"], 4)
+
+        # Several approvals for one item leave it at the newest one's value
+        values = {item_id: value for _, item_id, value in approve}
+        self.assertEqual(dict(Item.objects.filter(pk__in=values).values_list("pk", "value")), values)
+        self.assertEqual(
+            ValueChangeRequest.objects.filter(status=ValueChangeRequest.Status.APPROVED, review_notes="Patch 1.2").count(),
+            len(approve),
+        )
+        self.assertWithinBudget(
+            "review_value_requests",
+            4,
+            reverse("values:review_value_requests"),
+            method="post",
+            data={"action": "reject", "requests": [pk for pk, _, _ in reject]},
+            status=302,
+        )
+        self.assertFalse(self.pending.exists())
+
+    def test_compute_trends(self):
+        total = Item.objects.count()
+        now = timezone.now()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            examined, updated = recompute_trends(now=now)
+            seconds = time.perf_counter() - start
+        self.assertTiming("compute_trends", seconds)
+        self.assertEqual(examined, total)
+        self.assertGreaterEqual(updated, ITEMS)
+        # Two reads for the whole catalog and one UPDATE per batch; the
+        # snapshot INSERTs are batched by the backend's parameter limit
+        statements = Counter(query["sql"].split(None, 1)[0] for query in queries.captured_queries)
+        self.assertEqual(statements["SELECT"], 2)
+        self.assertEqual(statements["UPDATE"], math.ceil(updated / BULK_BATCH_SIZE))
+        # Nothing moved, so nothing is written
+        self.assertEqual(recompute_trends(now=now), (total, 0))
+
+    def test_catalog_import(self):
+        # A full re-price: export the catalog, raise every value and import it
+        rows = list(csv.DictReader(StringIO("".join(export_lines("csv")))))
+        self.assertEqual(len(rows), Item.objects.count())
+        for row in rows:
+            row["value"] = str(int(row["value"]) + 1)
+        snapshots = ItemValueSnapshot.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            diff = diff_catalog(enumerate(rows, start=2))
+            apply_diff(diff)
+            seconds = time.perf_counter() - start
+        self.assertTiming("catalog_import", seconds)
+        self.assertEqual((len(diff.created), len(diff.updated)), (0, len(rows)))
+        # Two reads for the diff, and one UPDATE per batch for the items and
+        # for each of the two portfolio tables
+        statements = Counter(query["sql"].split(None, 1)[0] for query in queries.captured_queries)
+        self.assertEqual(statements["SELECT"], 2)
+        self.assertEqual(statements["UPDATE"], 3 * math.ceil(len(rows) / BULK_BATCH_SIZE))
+        self.assertEqual(ItemValueSnapshot.objects.count(), snapshots + len(rows))
+        # The catalog now matches the file
+        self.assertFalse(diff_catalog(enumerate(rows, start=2)))
+
+    def test_portfolios(self):
+        holders = InventoryItem.objects.filter(item=self.item).count()
+        self.assertGreater(holders, 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.item.value += 250
+            self.item.save()
+        # One set-based UPDATE per portfolio table, however many users hold it
+        statements = Counter(query["sql"].split(None, 1)[0] for query in queries.captured_queries)
+        self.assertEqual(statements["UPDATE"], 3)
+
+        self.client.force_login(self.user)
+        self.client.post(reverse("values:inventory_add", args=["item-0999"]), {"quantity": 4})
+        self.client.post(
+            reverse("values:inventory_remove", args=[self.user.inventory_items.order_by("pk").first().pk])
+        )
+        self.client.post(
+            reverse("values:api_inventory"),
+            {"operations": [{"item": "item-0998", "quantity": 3}, {"op": "set", "item": "item-0999", "quantity": 1}]},
+            content_type="application/json",
+        )
+        Item.objects.get(slug="item-0100").delete()
+
+        # The maintained rows match a rebuild from the inventories
+        maintained = (
+            sorted(Portfolio.objects.values_list("user_id", "total_value", "item_count")),
+            sorted(PortfolioCategory.objects.values_list("user_id", "category_id", "total_value", "item_count")),
+        )
+        rebuild_portfolios()
+        self.assertEqual(maintained[0], sorted(Portfolio.objects.values_list("user_id", "total_value", "item_count")))
+        self.assertEqual(
+            [row for row in maintained[1] if row[3]],
+            sorted(PortfolioCategory.objects.values_list("user_id", "category_id", "total_value", "item_count")),
+        )
+
+    def test_matchmaking(self):
+        url = reverse("values:api_trade_matches")
+        own = dict(self.user.inventory_items.values_list("item__slug", "quantity"))
+        want = [["item-0100", 1], ["item-0101", 2], ["item-0102", 1]]
+        # Cold, so including the catalog snapshot and the holder index builds
+        response = self.assertWithinBudget(
+            "api_trade_matches", 7, url, user=self.user, method="post", data={"want": want}, content_type="application/json"
+        )
+        matches = response.json()["matches"]
+        self.assertTrue(matches)
+        for match in matches:
+            self.assertLessEqual(abs(match["difference"]), match["request"]["total"] * 0.1)
+            holder = User.objects.get(username=match["user"]["username"])
+            held = dict(holder.inventory_items.values_list("item__slug", "quantity"))
+            for entry in match["request"]["items"]:
+                self.assertLessEqual(entry["quantity"], held[entry["slug"]])
+            for entry in match["offer"]["items"]:
+                self.assertLessEqual(entry["quantity"], own[entry["slug"]])
+
+        # The holder index picks up inventory writes from other requests
+        trader = User.objects.get(username="user150")
+        want = {"want": [["item-1999", 1]]}
+        self.assertEqual(self.client.post(url, want, content_type="application/json").json()["matches"], [])
+        self.client.force_login(trader)
+        self.client.post(reverse("values:inventory_add", args=["item-1999"]))
+        self.client.force_login(self.user)
+        matches = self.client.post(url, want, content_type="application/json").json()["matches"]
+        self.assertEqual([match["user"]["username"] for match in matches], ["user150"])
+        trader.inventory_items.filter(item__slug="item-1999").delete()
+        self.assertEqual(self.client.post(url, want, content_type="application/json").json()["matches"], [])
+
+        # Lookups keep pruning expired changes while inventory writes add them
+        now = timezone.now()
+        expired = InventoryChange.objects.bulk_create(
+            InventoryChange(user=trader, changed_at=now - CHANGE_RETENTION - timedelta(minutes=n)) for n in range(1, 4)
+        )
+        get_holder_index().pruned_at -= PRUNE_INTERVAL
+        self.client.post(url, want, content_type="application/json")
+        self.assertFalse(InventoryChange.objects.filter(pk__in=[change.pk for change in expired]).exists())
+        self.assertTrue(InventoryChange.objects.filter(changed_at__gte=now - CHANGE_OVERLAP).exists())
+
+        InventoryChange.objects.create(user=trader, changed_at=now - CHANGE_RETENTION - timedelta(minutes=1))
+        out = StringIO()
+        call_command("prune_inventory_changes", stdout=out)
+        self.assertIn("Deleted 1 inventory changes", out.getvalue())
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.superuser)
+        for model in admin.site._registry:
+            opts = model._meta
+            if opts.app_label not in ("auth", "values"):
+                continue
+            url = reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist")
+            self.assertWithinBudget(f"admin_{opts.app_label}_{opts.model_name}", ADMIN_BUDGET, url)
+
+
+def load_baseline():
+    if os.environ.get("VALUES_PERF_RESET"):
+        return {}
+    try:
+        with open(PERF_ARTIFACT) as fh:
+            return json.load(fh).get("baseline", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def record_timings(baseline, timings):
+    """Write this run's timings, adopting them as the baseline for new views."""
+    baseline = {**timings, **baseline}
+    os.makedirs(os.path.dirname(PERF_ARTIFACT), exist_ok=True)
+    with open(PERF_ARTIFACT, "w") as fh:
+        json.dump({"baseline": baseline, "last_run": timings}, fh, indent=2, sort_keys=True)
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..catalog import get_catalog
+from ..models import Category, Item
+
+
+class CatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Test Weapons", slug="test-weapons")
+        cls.blade = Item.objects.create(name="Test Blade", slug="test-blade", category=cls.category, value=900)
+        cls.chain = Item.objects.create(name="Test Chain", slug="test-chain", category=cls.category, value=400)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_snapshot_rebuilt_after_save(self):
+        snapshot = get_catalog()
+        self.assertIs(get_catalog(), snapshot)
+        self.blade.value = 1200
+        self.blade.save()
+        rebuilt = get_catalog()
+        self.assertIsNot(rebuilt, snapshot)
+        self.assertEqual(rebuilt.by_id[self.blade.pk].value, 1200)
+
+    def test_catalog_not_modified(self):
+        url = reverse("values:api_items_catalog")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        # A changed catalog gets a new ETag
+        self.chain.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_changes_since(self):
+        url = reverse("values:api_items_catalog_changes")
+        stamp = self.client.get(url).json()["stamp"]
+        self.assertEqual(self.client.get(url, {"since": stamp}).json()["items"], [])
+
+        self.blade.value = 950
+        self.blade.save()
+        self.chain.delete()
+        data = self.client.get(url, {"since": stamp}).json()
+        self.assertFalse(data["full"])
+        self.assertIn(self.blade.pk, [item["id"] for item in data["items"]])
+        # Deletions show as ids missing from the full id list
+        self.assertIn(self.blade.pk, data["ids"])
+        self.assertNotIn(self.chain.pk, data["ids"])
+        # An unknown stamp asks the client to refetch everything
+        self.assertTrue(self.client.get(url, {"since": "0.unknown"}).json()["full"])
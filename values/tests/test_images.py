@@ -0,0 +1,69 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .. import catalog_io
+from ..catalog_io import refresh_images_later
+from ..images import build_lock, derived_root
+from ..models import Category, Item
+
+
+class ItemImageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Test Pictured", slug="test-pictured")
+        cls.item = Item.objects.create(
+            name="Pictured Lantern", slug="pictured-lantern", category=cls.category, value=10, image_url="/media/a.png"
+        )
+
+    @mock.patch("values.catalog_io.refresh_images_later")
+    def test_built_only_when_the_image_changes(self, later):
+        item = Item.objects.get(pk=self.item.pk)
+        item.value = 20
+        item.save()
+        later.assert_not_called()
+
+        item.image_url = "/media/b.png"
+        item.save()
+        later.assert_called_once_with({"/media/b.png"})
+        # Saving the same instance again doesn't rebuild
+        item.save()
+        later.assert_called_once()
+
+        Item.objects.create(
+            name="New Lantern", slug="new-lantern", category=self.category, value=1, image_url="/media/c.png"
+        )
+        later.assert_called_with({"/media/c.png"})
+
+    @mock.patch("values.catalog_io.refresh_images")
+    @mock.patch("values.catalog_io.threading.Thread")
+    @mock.patch("values.catalog_io._worker", None)
+    @mock.patch("values.catalog_io._pending", set())
+    def test_built_after_commit_by_one_thread(self, thread, refresh):
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_images_later(["/media/a.png"])
+            thread.assert_not_called()
+        thread.assert_called_once_with(target=catalog_io._refresh_pending, daemon=True)
+        thread.return_value.start.assert_called_once_with()
+
+        # URLs saved while the thread runs join its queue
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_images_later(["/media/b.png"])
+        thread.assert_called_once()
+        with mock.patch("values.catalog_io.connection") as connection:
+            catalog_io._refresh_pending()
+        connection.close.assert_called_once_with()
+        refresh.assert_called_once_with({"/media/a.png", "/media/b.png"})
+        self.assertIsNone(catalog_io._worker)
+
+
+class BuildLockTests(SimpleTestCase):
+    def test_lock_creates_the_derived_directory(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with build_lock():
+                self.assertTrue(os.path.isdir(derived_root()))
+            # Released: taking it again doesn't block
+            with build_lock():
+                pass
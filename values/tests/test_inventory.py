@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..inventory import _increment_fallback, add_item, apply_operations
+from ..models import Category, InventoryItem, Item, Portfolio
+from ..trades import MAX_QUANTITY
+
+
+class QuantityLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Test Held", slug="test-held")
+        cls.item = Item.objects.create(name="Held Lantern", slug="held-lantern", category=category, value=3)
+        cls.user = User.objects.create_user("holder")
+
+    def setUp(self):
+        cache.clear()
+
+    def quantity(self):
+        return InventoryItem.objects.get(user=self.user, item=self.item).quantity
+
+    def test_add_stops_at_the_limit(self):
+        add_item(self.user, self.item, MAX_QUANTITY - 1)
+        add_item(self.user, self.item, 5)
+        self.assertEqual(self.quantity(), MAX_QUANTITY)
+        # The portfolio follows the stored quantity, not the requested one
+        self.assertEqual(Portfolio.objects.get(user=self.user).total_value, MAX_QUANTITY * self.item.value)
+
+    def test_batched_adds_stop_at_the_limit(self):
+        apply_operations(self.user, [("add", self.item.pk, MAX_QUANTITY), ("add", self.item.pk, MAX_QUANTITY)])
+        self.assertEqual(self.quantity(), MAX_QUANTITY)
+        apply_operations(self.user, [("add", self.item.pk, 10)])
+        self.assertEqual(self.quantity(), MAX_QUANTITY)
+
+    def test_fallback_stops_at_the_limit(self):
+        _increment_fallback(self.user.pk, self.item.pk, MAX_QUANTITY - 1, self.item.created_at)
+        _increment_fallback(self.user.pk, self.item.pk, 5, self.item.created_at)
+        self.assertEqual(self.quantity(), MAX_QUANTITY)
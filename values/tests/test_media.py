@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from django.http import HttpResponseNotFound
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..media import MediaMiddleware, hashed_media_url
+
+
+class MediaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        os.makedirs(os.path.join(media_root.name, "Weapons"))
+        with open(os.path.join(media_root.name, "Weapons", "Blade.png"), "wb") as fh:
+            fh.write(b"\x89PNG not really an image")
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.middleware = MediaMiddleware(lambda request: HttpResponseNotFound())
+
+    def get(self, url):
+        return self.middleware(RequestFactory().get(url))
+
+    def test_hashed_url_is_immutable(self):
+        url = hashed_media_url("/media/Weapons/Blade.png")
+        self.assertRegex(url, r"^/media/Weapons/Blade\.[0-9a-f]{12}\.png$")
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_plain_and_stale_urls_are_revalidated(self):
+        for url in ("/media/Weapons/Blade.png", "/media/Weapons/Blade.000000000000.png"):
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("immutable", response.get("Cache-Control", ""))
+
+    def test_missing_file_falls_through(self):
+        self.assertEqual(self.get("/media/Weapons/Missing.png").status_code, 404)
+        self.assertEqual(self.get("/media/../settings.py").status_code, 404)
@@ -0,0 +1,78 @@
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..models import Category, Item
+from ..pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor, paginate_sequence
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor([5, "Name"])), (False, [5, "Name"]))
+        self.assertEqual(decode_cursor(encode_cursor([5, "Name"], backwards=True)), (True, [5, "Name"]))
+
+    def test_invalid(self):
+        for cursor in ("not-a-cursor", encode_cursor([1])[:-2], "WzIsW11d"):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+    def test_paginate_sequence(self):
+        entries = [(n,) for n in range(7)]
+        page, cursor = paginate_sequence(entries, lambda entry: entry, 3)
+        pages = [page]
+        while cursor:
+            page, cursor = paginate_sequence(entries, lambda entry: entry, 3, cursor)
+            pages.append(page)
+        self.assertEqual(pages, [entries[:3], entries[3:6], entries[6:]])
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Test Paging", slug="test-paging")
+        # Repeated values, so pages split between equal keys on the name
+        Item.objects.bulk_create(
+            Item(name=f"Paged {n}", slug=f"paged-{n}", category=category, value=n // 3) for n in range(10)
+        )
+        cls.queryset = Item.objects.filter(category=category).order_by("-value", "name")
+
+    def test_next_and_previous(self):
+        paginator = KeysetPaginator(self.queryset, 4)
+        expected = list(self.queryset)
+        pages = [paginator.page()]
+        self.assertFalse(pages[0].has_previous())
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([list(page) for page in pages], [expected[:4], expected[4:8], expected[8:]])
+
+        # Walking back from the last page gives the same pages
+        page = pages[-1]
+        for previous in reversed(pages[:-1]):
+            page = paginator.page(page.previous_cursor)
+            self.assertEqual(list(page), list(previous))
+        self.assertFalse(page.has_previous())
+
+    def test_tied_search_ranks(self):
+        # Same-shaped names score the same, so every page boundary is a tie
+        category = Category.objects.get(slug="test-paging")
+        for n in range(7):
+            Item.objects.create(name=f"Tiedrelic {chr(65 + n)}", slug=f"tiedrelic-{n}", category=category, value=1)
+        results = Item.objects.search("tiedrelic")
+        ranks = {item.search_rank for item in results}
+        self.assertEqual(len(ranks), 1)
+        self.assertIsInstance(ranks.pop(), int)
+
+        paginator = KeysetPaginator(results, 3)
+        page = paginator.page()
+        seen = list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen.extend(page)
+        self.assertEqual([item.name for item in seen], [f"Tiedrelic {chr(65 + n)}" for n in range(7)])
+
+    def test_rejects_unsupported_ordering(self):
+        with self.assertRaises(ValueError):
+            KeysetPaginator(self.queryset.order_by("category__name"), 4)
+
+    def test_item_list_invalid_cursor(self):
+        response = self.client.get(reverse("values:item_list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
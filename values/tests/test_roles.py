@@ -0,0 +1,27 @@
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..roles import REVIEWER_GROUP_KEY, VALUE_REVIEWERS, get_reviewer_group_id, is_value_reviewer
+
+
+class ReviewerGroupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Group.objects.filter(name=VALUE_REVIEWERS).delete()
+
+    def test_missing_group_is_not_cached(self):
+        self.assertIsNone(get_reviewer_group_id())
+        # bulk_create sends no signals, so only a fresh lookup can find it
+        (group,) = Group.objects.bulk_create([Group(name=VALUE_REVIEWERS)])
+        self.assertEqual(get_reviewer_group_id(), group.pk)
+        self.assertEqual(cache.get(REVIEWER_GROUP_KEY), group.pk)
+
+    def test_group_changes_clear_the_cached_id(self):
+        user = User.objects.create_user("reviewer")
+        group = Group.objects.create(name=VALUE_REVIEWERS)
+        group.user_set.add(user)
+        self.assertTrue(is_value_reviewer(user))
+        group.delete()
+        self.assertIsNone(cache.get(REVIEWER_GROUP_KEY))
+        self.assertFalse(is_value_reviewer(User.objects.get(pk=user.pk)))
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Category, Item
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Test Relics", slug="test-relics")
+        cls.named = Item.objects.create(
+            name="Zephyrine Lantern", slug="zephyrine-lantern", category=category, value=100
+        )
+        cls.noted = Item.objects.create(
+            name="Plain Lamp", slug="plain-lamp", category=category, value=200, notes="Looks like a zephyrine relic"
+        )
+        cls.other = Item.objects.create(name="Quiet Bell", slug="quiet-bell", category=category, value=300)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_name_matches_rank_first(self):
+        results = list(Item.objects.search("zephyrine"))
+        self.assertEqual(results, [self.named, self.noted])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+        # Half-typed words still match
+        self.assertEqual(list(Item.objects.search("zephyr lant")), [self.named])
+
+    def test_index_follows_saves(self):
+        self.other.name = "Zephyrine Bell"
+        self.other.save()
+        self.assertIn(self.other, Item.objects.search("zephyrine"))
+        self.other.delete()
+        self.assertEqual(list(Item.objects.search("zephyrine bell")), [])
+
+    def test_suggest_tolerates_typos(self):
+        url = reverse("values:api_items_suggest")
+        names = [item["name"] for item in self.client.get(url, {"q": "zephirine lantren"}).json()["items"]]
+        self.assertEqual(names[0], "Zephyrine Lantern")
+        self.assertEqual(self.client.get(url, {"q": ""}).json()["items"], [])
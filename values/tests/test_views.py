@@ -0,0 +1,98 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Category, Item, SavedTrade
+
+
+class ItemListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Test Listed", slug="test-listed")
+        cls.item = Item.objects.create(name="Listed Lantern", slug="listed-lantern", category=cls.category, value=100)
+        # Enough for a second page
+        Item.objects.bulk_create(
+            Item(name=f"Listed {n:02d}", slug=f"listed-{n:02d}", category=cls.category, value=1) for n in range(24)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fragment_purged_on_save(self):
+        url = reverse("values:item_list")
+        filters = {"category": "test-listed"}
+        self.assertContains(self.client.get(url, filters), "Listed Lantern")
+        self.assertEqual(cache.get("values:cache_stats:item_list_misses"), 1)
+        self.assertContains(self.client.get(url, filters), "Listed Lantern")
+        self.assertEqual(cache.get("values:cache_stats:item_list_hits"), 1)
+
+        self.item.name = "Renamed Lantern"
+        self.item.save()
+        response = self.client.get(url, filters)
+        self.assertContains(response, "Renamed Lantern")
+        self.assertNotContains(response, "Listed Lantern")
+        self.assertEqual(cache.get("values:cache_stats:item_list_misses"), 2)
+
+    def test_pager_links_depend_only_on_the_filters(self):
+        url = reverse("values:item_list")
+        # Filled by a request with extra params and untrimmed values...
+        first = self.client.get(url, {"category": " test-listed ", "utm_source": "feed"})
+        self.assertContains(first, "Listed Lantern")
+        # ...and served to one without them
+        response = self.client.get(url, {"category": "test-listed"})
+        self.assertEqual(cache.get("values:cache_stats:item_list_hits"), 1)
+        content = response.content.decode()
+        self.assertNotIn("utm_source", content)
+        self.assertNotIn("+test-listed", content)
+        self.assertIn("?category=test-listed&amp;cursor=", content)
+
+        cursor = content.split("?category=test-listed&amp;cursor=", 1)[1].split('"', 1)[0]
+        second = self.client.get(url, {"category": "test-listed", "cursor": cursor, "utm_source": "feed"})
+        self.assertContains(second, "Listed 23")
+        self.assertNotContains(second, "utm_source")
+
+
+class SavedTradeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Test Traded", slug="test-traded")
+        cls.items = Item.objects.bulk_create(
+            Item(name=f"Traded {n}", slug=f"traded-{n}", category=category, value=100 * (n + 1)) for n in range(3)
+        )
+        cls.user = User.objects.create_user("trader", password="trade-pass-123")
+
+    def save_trade(self, trade):
+        return self.client.post(reverse("values:api_trades_save"), json.dumps(trade), content_type="application/json")
+
+    def test_saving_twice_reuses_the_row(self):
+        self.client.force_login(self.user)
+        trade = {"offer": [["traded-0", 2], ["traded-1", 1]], "request": [["traded-2", 1]]}
+        first = self.save_trade(trade)
+        self.assertEqual(first.status_code, 201)
+        self.assertTrue(first.json()["created"])
+        # The same trade listed in another order is the same trade
+        second = self.save_trade({"offer": [["traded-1", 1], ["traded-0", 2]], "request": [["traded-2", 1]]})
+        self.assertEqual(second.status_code, 200)
+        self.assertFalse(second.json()["created"])
+        self.assertEqual(second.json()["code"], first.json()["code"])
+        self.assertEqual(SavedTrade.objects.filter(share_code=first.json()["code"]).count(), 1)
+
+    def test_concurrent_save_reuses_the_row(self):
+        trade = {"offer": [["traded-0", 1]], "request": [["traded-1", 1]]}
+        code = self.save_trade(trade).json()["code"]
+        # Another request saved it between this one's lookup and insert
+        with mock.patch.object(QuerySet, "first", return_value=None):
+            response = self.save_trade(trade)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["code"], code)
+        self.assertFalse(response.json()["created"])
+        self.assertEqual(SavedTrade.objects.filter(share_code=code, user=None).count(), 1)
+
+    def test_invalid_trade(self):
+        self.assertEqual(self.save_trade({"offer": [], "request": []}).status_code, 400)
+        self.assertEqual(self.save_trade({"offer": [["no-such-item", 1]]}).status_code, 400)
@@ -0,0 +1,217 @@
+"""
+Server-side trade evaluation against the catalog snapshot.
+
+A trade is two sides, ``offer`` (what the caller gives) and ``request`` (what
+they get), each a list of ``[item, quantity]`` pairs or
+``{"item": ..., "quantity": ...}`` objects, where the item is an id or a slug.
+Every item is resolved from the in-memory catalog, so evaluating a batch of
+trades costs no queries. The verdict matches the calculator: from the offering
+side's point of view, getting more value than given is a "win".
+
+Saved trades are stored normalized: each side becomes ``[[item_id, quantity],
+...]`` sorted by id with repeats merged, and the share code is a hash of that
+form, so the same trade always gets the same permalink.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from .catalog import get_catalog
+
+MAX_TRADES = 500
+MAX_ENTRIES_PER_SIDE = 100
+MAX_QUANTITY = 1_000_000
+
+# Item.demand is 1-10 with 5 as the default, so 5 weighs a value at 1x
+NEUTRAL_DEMAND = 5
+
+SIDES = ("offer", "request")
+
+# Characters of base32 sha256 in a share code: 50 bits
+SHARE_CODE_LENGTH = 10
+
+
+class TradeError(ValueError):
+    pass
+
+
+def parse_entry(entry):
+    """Return (item reference, quantity) for one side entry."""
+    if isinstance(entry, dict):
+        ref = entry.get("item", entry.get("id", entry.get("slug")))
+        quantity = entry.get("quantity", 1)
+    elif isinstance(entry, (list, tuple)) and len(entry) == 2:
+        ref, quantity = entry
+    else:
+        raise TradeError(f"Invalid entry {entry!r}: expected [item, quantity]")
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or not 1 <= quantity <= MAX_QUANTITY:
+        raise TradeError(f"Invalid quantity for {ref!r}: expected 1-{MAX_QUANTITY}")
+    if isinstance(ref, bool) or not isinstance(ref, (int, str)) or ref == "":
+        raise TradeError(f"Invalid item reference {ref!r}: expected an id or slug")
+    return ref, quantity
+
+
+def resolve(catalog, ref):
+    if isinstance(ref, int):
+        return catalog.by_id.get(ref)
+    if ref.isdigit():
+        return catalog.by_id.get(int(ref)) or catalog.by_slug.get(ref)
+    return catalog.by_slug.get(ref)
+
+
+def evaluate_side(catalog, entries, errors):
+    if not isinstance(entries, list):
+        raise TradeError("Each side must be a list of [item, quantity] entries")
+    if len(entries) > MAX_ENTRIES_PER_SIDE:
+        raise TradeError(f"At most {MAX_ENTRIES_PER_SIDE} entries per side")
+
+    items = []
+    total = weighted = 0
+    for entry in entries:
+        ref, quantity = parse_entry(entry)
+        item = resolve(catalog, ref)
+        if item is None:
+            errors.append(f"Unknown item {ref!r}")
+            continue
+        subtotal = item.value * quantity
+        total += subtotal
+        weighted += subtotal * item.demand
+        items.append(
+            {
+                "id": item.id,
+                "slug": item.slug,
+                "name": item.name,
+                "value": item.value,
+                "demand": item.demand,
+                "quantity": quantity,
+                "subtotal": subtotal,
+            }
+        )
+    return {
+        "items": items,
+        "total": total,
+        "demand_weighted_total": round(weighted / NEUTRAL_DEMAND, 2),
+    }
+
+
+def evaluate_trade(catalog, trade):
+    """Evaluate one trade; unknown items are reported in ``errors``, not raised."""
+    if not isinstance(trade, dict):
+        raise TradeError("A trade must be an object with offer and request lists")
+    errors = []
+    result = {side: evaluate_side(catalog, trade.get(side, []), errors) for side in SIDES}
+    difference = result["request"]["total"] - result["offer"]["total"]
+    result["difference"] = difference
+    result["demand_weighted_difference"] = round(
+        result["request"]["demand_weighted_total"] - result["offer"]["demand_weighted_total"], 2
+    )
+    if errors:
+        result["verdict"] = None
+    elif difference > 0:
+        result["verdict"] = "win"
+    elif difference < 0:
+        result["verdict"] = "loss"
+    else:
+        result["verdict"] = "fair"
+    result["errors"] = errors
+    return result
+
+
+def evaluate_trades(trades):
+    """Evaluate a batch of trades against one consistent catalog snapshot."""
+    if not isinstance(trades, list) or not trades:
+        raise TradeError("trades must be a non-empty list")
+    if len(trades) > MAX_TRADES:
+        raise TradeError(f"At most {MAX_TRADES} trades per request")
+    catalog = get_catalog()
+    results = []
+    for index, trade in enumerate(trades):
+        try:
+            results.append(evaluate_trade(catalog, trade))
+        except TradeError as exc:
+            raise TradeError(f"trades[{index}]: {exc}") from exc
+    return catalog, results
+
+
+def normalize_side(catalog, entries):
+    """Return entries as sorted ``[[item_id, quantity], ...]``, merging repeats.
+
+    Unlike evaluation, an unknown item is an error: a saved trade must only
+    reference items that exist.
+    """
+    if not isinstance(entries, list):
+        raise TradeError("Each side must be a list of [item, quantity] entries")
+    if len(entries) > MAX_ENTRIES_PER_SIDE:
+        raise TradeError(f"At most {MAX_ENTRIES_PER_SIDE} entries per side")
+    quantities = {}
+    for entry in entries:
+        ref, quantity = parse_entry(entry)
+        item = resolve(catalog, ref)
+        if item is None:
+            raise TradeError(f"Unknown item {ref!r}")
+        quantities[item.id] = min(MAX_QUANTITY, quantities.get(item.id, 0) + quantity)
+    return [[item_id, quantities[item_id]] for item_id in sorted(quantities)]
+
+
+def normalize_trade(catalog, trade):
+    """Return (offer, request) in stored form; a trade needs at least one item."""
+    if not isinstance(trade, dict):
+        raise TradeError("A trade must be an object with offer and request lists")
+    offer, request = (normalize_side(catalog, trade.get(side, [])) for side in SIDES)
+    if not offer and not request:
+        raise TradeError("A trade needs at least one item")
+    return offer, request
+
+
+def share_code(offer, request):
+    """Content hash of a normalized trade, used as its permalink code."""
+    canonical = json.dumps([offer, request], separators=(",", ":"))
+    digest = hashlib.sha256(canonical.encode()).digest()
+    return base64.b32encode(digest).decode()[:SHARE_CODE_LENGTH].lower()
+
+
+def side_total(catalog, pairs):
+    """Current value of a stored side; items deleted since count as 0."""
+    total = 0
+    for item_id, quantity in pairs:
+        item = catalog.by_id.get(item_id)
+        if item is not None:
+            total += item.value * quantity
+    return total
+
+
+def expand_side(catalog, pairs):
+    """Stored pairs as (CatalogItem or None, quantity) for display."""
+    return [(catalog.by_id.get(item_id), quantity) for item_id, quantity in pairs]
+
+
+def shared_trade_key(code):
+    return f"values:shared_trade:{code}"
+
+
+def get_shared_trade(code):
+    """The trade behind a share code as a dict, or None if there is none.
+
+    Codes are content hashes, so the stored sides never change and the entry is
+    cached without expiry; only deleting the last copy clears it.
+    """
+    key = shared_trade_key(code)
+    shared = cache.get(key)
+    if shared is None:
+        from .models import SavedTrade
+
+        trade = SavedTrade.objects.filter(share_code=code).order_by("pk").first()
+        if trade is None:
+            return None
+        shared = {
+            "code": code,
+            "offer": trade.offer_items,
+            "request": trade.request_items,
+            "offer_total": trade.offer_total,
+            "request_total": trade.request_total,
+            "created_at": trade.created_at,
+        }
+        cache.set(key, shared, None)
+    return shared
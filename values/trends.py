@@ -0,0 +1,124 @@
+"""
+Derived item trends.
+
+``recompute_trends`` derives every item's trend, volatility and moving average
+from its value history (ItemValueSnapshot, which also records approved value
+change requests) over a trailing window:
+
+- moving_average: the time-weighted mean of the value over the window, where
+  each snapshot's value counts for as long as it was in force;
+- volatility: the time-weighted standard deviation over that mean;
+- trend: rising or falling when the current value is more than ``threshold``
+  above or below the moving average, stable otherwise.
+
+History is a step series, so these are computed exactly from the change
+points rather than by resampling. The whole catalog takes two queries (the
+value in force at the window start, via a correlated subquery on the
+(item, recorded_at) index, and every change inside the window, via the
+recorded_at index) and one pass over the rows. Changed items are written back
+in one set-based UPDATE ... FROM (VALUES ...) per thousand rows.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .bulk import update_from_values
+from .catalog import catalog_changed
+from .history import record_snapshots
+from .models import Item, ItemValueSnapshot
+
+DEFAULT_WINDOW = timedelta(days=30)
+# Relative distance from the moving average that counts as a trend
+DEFAULT_THRESHOLD = 0.05
+UPDATE_FIELDS = ("trend", "volatility", "moving_average")
+
+
+def window_stats(start, end, start_value, changes, current):
+    """Time-weighted (mean, relative standard deviation) of a step series.
+
+    start_value is the value in force at start (None if the item has no
+    earlier history) and changes the (recorded_at, value) pairs in the window,
+    oldest first. An item without any history held ``current`` throughout.
+    """
+    if start_value is None:
+        if not changes:
+            return float(current), 0.0
+        # History begins inside the window
+        start, start_value = changes[0]
+
+    weight = weighted = weighted_squares = 0.0
+    moment, value = start, start_value
+    for changed_at, new_value in (*changes, (end, None)):
+        seconds = (changed_at - moment).total_seconds()
+        if seconds > 0:
+            weight += seconds
+            weighted += value * seconds
+            weighted_squares += value * value * seconds
+        if new_value is not None:
+            moment, value = max(moment, changed_at), new_value
+
+    if weight == 0:
+        return float(value), 0.0
+    mean = weighted / weight
+    variance = max(0.0, weighted_squares / weight - mean * mean)
+    return mean, (math.sqrt(variance) / mean if mean else 0.0)
+
+
+def classify(current, mean, threshold):
+    if mean and current > mean * (1 + threshold):
+        return Item.Trend.RISING
+    if mean and current < mean * (1 - threshold):
+        return Item.Trend.FALLING
+    return Item.Trend.STABLE
+
+
+def recompute_trends(window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD, now=None):
+    """Recompute trend, volatility and moving_average for every item.
+
+    Returns (items examined, items updated). Items whose trend changes get a
+    history snapshot, as a save through the ORM would.
+    """
+    now = now or timezone.now()
+    start = now - window
+
+    in_force = (
+        ItemValueSnapshot.objects.filter(item=OuterRef("pk"), recorded_at__lt=start)
+        .order_by("-recorded_at")
+        .values("value")[:1]
+    )
+    items = list(
+        Item.objects.only("id", "value", "demand", *UPDATE_FIELDS).annotate(start_value=Subquery(in_force))
+    )
+    changes = defaultdict(list)
+    for item_id, recorded_at, value in (
+        ItemValueSnapshot.objects.filter(recorded_at__gte=start, recorded_at__lte=now)
+        .order_by("recorded_at")
+        .values_list("item_id", "recorded_at", "value")
+        .iterator(chunk_size=10000)
+    ):
+        changes[item_id].append((recorded_at, value))
+
+    updated, retrended = [], []
+    for item in items:
+        mean, volatility = window_stats(start, now, item.start_value, changes.get(item.pk, ()), item.value)
+        trend = classify(item.value, mean, threshold)
+        result = (trend, round(volatility, 4), round(mean))
+        if result == (item.trend, item.volatility, item.moving_average):
+            continue
+        if trend != item.trend:
+            retrended.append(item)
+        item.trend, item.volatility, item.moving_average = result
+        updated.append(item)
+
+    if updated:
+        with transaction.atomic():
+            rows = [(item.pk, item.trend, item.volatility, item.moving_average) for item in updated]
+            update_from_values(Item, UPDATE_FIELDS, rows)
+            # No post_save fires, so record the trend changes here
+            record_snapshots(retrended, recorded_at=now)
+            catalog_changed()
+    return len(items), len(updated)
@@ -10,17 +10,34 @@ from .views import (
     CustomLoginView,
     RegistrationView,
     profile_view,
+    leaderboard_view,
     api_items_list,
+    api_items_catalog,
+    api_items_catalog_changes,
+    api_items_suggest,
+    api_item_history,
+    api_trade_evaluate,
+    api_trade_matches,
+    api_inventory,
+    api_trades_save,
+    api_trade_detail,
+    trade_share,
+    trade_share_image,
+    saved_trades,
+    saved_trade_delete,
     logout_view,
     verify_account,
     add_to_inventory,
     remove_inventory_item,
+    inventory_import,
     request_value_change,
     value_requests_list,
     admin_value_requests,
+    review_value_requests,
     approve_value_request,
     reject_value_request,
     item_delete,
+    cache_stats,
 )
 
 app_name = "values"
@@ -30,21 +47,38 @@ urlpatterns = [
     path("items/", ItemListView.as_view(), name="item_list"),
     path("calculator/", TradeCalculatorView.as_view(), name="trade_calculator"),
     path("api/items/", api_items_list, name="api_items_list"),
+    path("api/items/catalog/", api_items_catalog, name="api_items_catalog"),
+    path("api/items/catalog/changes/", api_items_catalog_changes, name="api_items_catalog_changes"),
+    path("api/items/suggest/", api_items_suggest, name="api_items_suggest"),
+    path("api/items/<slug:slug>/history/", api_item_history, name="api_item_history"),
+    path("api/trade/evaluate/", api_trade_evaluate, name="api_trade_evaluate"),
+    path("api/trade/matches/", api_trade_matches, name="api_trade_matches"),
+    path("api/inventory/", api_inventory, name="api_inventory"),
+    path("api/trades/", api_trades_save, name="api_trades_save"),
+    path("api/trades/<slug:code>/", api_trade_detail, name="api_trade_detail"),
+    path("t/<slug:code>/", trade_share, name="trade_share"),
+    path("t/<slug:code>/card.png", trade_share_image, name="trade_share_image"),
     path("login/", CustomLoginView.as_view(), name="login"),
     path("logout/", logout_view, name="logout"),
     path("register/", RegistrationView.as_view(), name="register"),
     path("verify/<str:token>/", verify_account, name="verify"),
     path("profile/", profile_view, name="profile"),
+    path("leaderboard/", leaderboard_view, name="leaderboard"),
     path("profile/inventory/add/<slug:slug>/", add_to_inventory, name="inventory_add"),
     path("profile/inventory/remove/<int:pk>/", remove_inventory_item, name="inventory_remove"),
+    path("profile/inventory/import/", inventory_import, name="inventory_import"),
+    path("profile/trades/", saved_trades, name="saved_trades"),
+    path("profile/trades/<int:pk>/delete/", saved_trade_delete, name="saved_trade_delete"),
     path("items/create/", ItemCreateView.as_view(), name="item_create"),
     path("items/<slug:slug>/edit/", ItemUpdateView.as_view(), name="item_edit"),
     path("items/<slug:slug>/delete/", item_delete, name="item_delete"),
     path("items/<slug:slug>/request-value-change/", request_value_change, name="request_value_change"),
     path("value-requests/", value_requests_list, name="value_requests"),
     path("manage/value-requests/", admin_value_requests, name="admin_value_requests"),
+    path("manage/value-requests/review/", review_value_requests, name="review_value_requests"),
     path("manage/value-requests/<int:pk>/approve/", approve_value_request, name="approve_value_request"),
     path("manage/value-requests/<int:pk>/reject/", reject_value_request, name="reject_value_request"),
+    path("manage/cache-stats/", cache_stats, name="cache_stats"),
     path("<slug:slug>/", ItemDetailView.as_view(), name="item_detail"),
 ]
 
@@ -1,11 +1,17 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.models import User
 from django.contrib.auth import login, logout
 from django.contrib.auth.views import LoginView
-from django.db.models import Q
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, urlencode
+from django.utils.safestring import mark_safe
 from django.views.generic import (
     DetailView,
     ListView,
@@ -14,50 +20,139 @@ from django.views.generic import (
     UpdateView,
     FormView,
 )
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
+import hashlib
 import json
-
-from .forms import ItemForm, UserRegistrationForm, ValueChangeRequestForm
-from .models import Category, Item, InventoryItem, SavedTrade, VerificationToken, Profile, ValueChangeRequest
-from django.contrib.auth.models import Group
+import re
+
+from . import history
+from .catalog import SORT_KEYS, get_catalog, get_catalog_version
+from .forms import InventoryImportForm, ItemForm, UserRegistrationForm, ValueChangeRequestForm
+from .models import (
+    Category,
+    Item,
+    InventoryItem,
+    Portfolio,
+    SavedTrade,
+    VerificationToken,
+    Profile,
+    ValueChangeRequest,
+)
+from .matchmaking import (
+    DEFAULT_TOLERANCE,
+    MATCH_LIMIT,
+    MAX_MATCH_LIMIT,
+    MAX_TOLERANCE,
+    MAX_WANTED,
+    MIN_TOLERANCE,
+    find_matches,
+)
+from .pagination import InvalidCursor, KeysetPaginator, paginate_sequence
+from .portfolio import category_breakdown, leaderboard, portfolio_rank
+from .reviews import MAX_DECISIONS, REVIEW_PAGE_SIZE, attach_requests, review_queue, review_requests
+from .roles import is_value_reviewer
+from .search import suggest_items
+from .images import render_trade_card
+from .inventory import (
+    InventoryError,
+    add_item,
+    apply_operations,
+    import_operations,
+    parse_operations,
+    read_import,
+    remove_entry,
+)
+from .trades import (
+    MAX_QUANTITY,
+    SIDES,
+    TradeError,
+    evaluate_trade,
+    evaluate_trades,
+    expand_side,
+    get_shared_trade,
+    normalize_side,
+    normalize_trade,
+    share_code,
+    shared_trade_key,
+    side_total,
+)
+from .stats import get_catalog_stats
 from django.utils import timezone
 
+re_accepts_gzip = re.compile(r"\bgzip\b")
+
 
 def is_admin(user):
     return user.is_authenticated and user.is_staff
 
 
-def is_value_reviewer(user):
-    """Check if user is in the Value Reviewers group"""
-    if not user.is_authenticated:
-        return False
-    try:
-        reviewers_group = Group.objects.get(name="Value Reviewers")
-        return reviewers_group in user.groups.all()
-    except Group.DoesNotExist:
-        return False
-
 
 class LandingPageView(TemplateView):
     template_name = "values/landing.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        stats = get_catalog_stats()
         context.update(
             {
-                "categories": Category.objects.all(),
-                "featured_items": Item.objects.filter(featured=True)[:6],
-                "total_items": Item.objects.count(),
+                "categories": stats.categories,
+                "featured_items": stats.featured_items,
+                "total_items": stats.total_items,
             }
         )
         return context
 
 
+ITEM_LIST_CACHE_TIMEOUT = 60 * 60
+
+
+def count_cache_event(name):
+    key = f"values:cache_stats:{name}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); losing one count is fine
+        pass
+
+
 class ItemListView(ListView):
     model = Item
     template_name = "values/item_list.html"
+    content_template_name = "values/item_list_content.html"
     context_object_name = "items"
     paginate_by = 20
+    # GET parameters that change what the page shows
+    filter_params = ("q", "category", "rarity", "item_type", "trend", "min_value", "max_value", "sort", "cursor")
+
+    def get(self, request, *args, **kwargs):
+        # Everything below the navbar depends only on the filters and whether
+        # edit links are shown, so render it once per catalog version
+        key = self.get_cache_key()
+        content = cache.get(key)
+        if content is None:
+            count_cache_event("item_list_misses")
+            self.object_list = self.get_queryset()
+            content = render_to_string(self.content_template_name, self.get_context_data(), request)
+            cache.set(key, content, ITEM_LIST_CACHE_TIMEOUT)
+        else:
+            count_cache_event("item_list_hits")
+        return render(request, self.template_name, {"content": mark_safe(content)})
+
+    def get_filter_params(self, exclude=()):
+        params = []
+        for name in self.filter_params:
+            value = self.request.GET.get(name, "").strip()
+            if value and name not in exclude:
+                params.append((name, value))
+        return params
+
+    def get_cache_key(self):
+        variant = "staff" if is_admin(self.request.user) else "public"
+        digest = hashlib.md5(f"{get_catalog_version()}:{self.get_filter_params()}".encode()).hexdigest()
+        return f"values:item_list:{variant}:{digest}"
 
     def get_queryset(self):
         qs = (
@@ -65,20 +160,19 @@ class ItemListView(ListView):
             .all()
             .order_by("-featured", "-value", "name")
         )
-        query = self.request.GET.get("q", "").strip()
-        category = self.request.GET.get("category")
-        rarity = self.request.GET.get("rarity")
-        item_type = self.request.GET.get("item_type")
-        trend = self.request.GET.get("trend")
-        min_value = self.request.GET.get("min_value")
-        max_value = self.request.GET.get("max_value")
+        # Only what get_cache_key() hashes may change the page
+        filters = dict(self.get_filter_params())
+        query = filters.get("q", "")
+        category = filters.get("category")
+        rarity = filters.get("rarity")
+        item_type = filters.get("item_type")
+        trend = filters.get("trend")
+        min_value = filters.get("min_value")
+        max_value = filters.get("max_value")
 
         if query:
-            qs = qs.filter(
-                Q(name__icontains=query)
-                | Q(notes__icontains=query)
-                | Q(obtained_from__icontains=query)
-            )
+            # Best match first unless an explicit sort is picked below
+            qs = qs.search(query)
         if category:
             qs = qs.filter(category__slug=category)
         if rarity:
@@ -92,23 +186,51 @@ class ItemListView(ListView):
         if max_value and max_value.isdigit():
             qs = qs.filter(value__lte=int(max_value))
 
-        sort = self.request.GET.get("sort")
+        sort = filters.get("sort")
         if sort == "value_asc":
             qs = qs.order_by("value", "name")
         elif sort == "name":
             qs = qs.order_by("name")
+        elif sort == "rarity":
+            qs = qs.order_by("rarity_rank", "name")
 
         return qs
 
+    def paginate_queryset(self, queryset, page_size):
+        # Keyset pagination on the active sort: deep pages cost the same as
+        # the first, and the navigation needs no COUNT(*)
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(dict(self.get_filter_params()).get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_result_count(self):
+        """Total matches for the current filters, cached until the catalog changes"""
+        params = self.get_filter_params(exclude=("cursor", "sort"))
+        digest = hashlib.md5(f"{get_catalog_version()}:{params}".encode()).hexdigest()
+        return cache.get_or_set(f"values:item_list_count:{digest}", self.object_list.count, 3600)
+
+    def get_page_url(self, cursor):
+        """Link to another page of these filters, built from the same params as the cache key."""
+        if cursor is None:
+            return None
+        return "?" + urlencode([*self.get_filter_params(exclude=("cursor",)), ("cursor", cursor)])
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        page = context["page_obj"]
         context.update(
             {
+                "result_count": self.get_result_count(),
                 "categories": Category.objects.all(),
                 "rarity_choices": Item.Rarity.choices,
                 "type_choices": Item.ItemType.choices,
                 "trend_choices": Item.Trend.choices,
-                "active_filters": self.request.GET,
+                "active_filters": dict(self.get_filter_params()),
+                "previous_page_url": self.get_page_url(page.previous_cursor),
+                "next_page_url": self.get_page_url(page.next_cursor),
                 "is_admin": self.request.user.is_authenticated and self.request.user.is_staff,
             }
         )
@@ -128,6 +250,7 @@ class ItemDetailView(DetailView):
         return context
 
 
+@method_decorator(ensure_csrf_cookie, name="dispatch")
 class TradeCalculatorView(TemplateView):
     template_name = "values/trade_calculator.html"
 
@@ -148,52 +271,173 @@ def api_items_list(request):
     query = request.GET.get("q", "").strip()
     category = request.GET.get("category")
     rarity = request.GET.get("rarity")
-    sort = request.GET.get("sort", "name")
+    sort = request.GET.get("sort", "relevance" if query else "name")
+    if sort not in SORT_KEYS and not (query and sort == "relevance"):
+        sort = "name"
+    try:
+        limit = min(200, max(1, int(request.GET.get("limit", "200"))))  # At most 200 items per page
+    except ValueError:
+        limit = 200
 
-    qs = Item.objects.select_related("category").all()
+    # Served from the in-memory catalog snapshot; a search only asks the
+    # full-text index for the ranked ids
+    catalog = get_catalog()
+    if query:
+        ranks = dict(Item.objects.search(query).values_list("pk", "search_rank"))
+        items = catalog.filter(category=category, rarity=rarity, sort=sort, ids=ranks)
+    else:
+        items = catalog.filter(category=category, rarity=rarity, sort=sort)
 
+    if sort == "relevance":
+        def key(item):
+            return (-ranks[item.id], item.name)
+
+        items.sort(key=key)
+    else:
+        key = SORT_KEYS[sort]
+
+    try:
+        page, next_cursor = paginate_sequence(items, key, limit, request.GET.get("cursor"))
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    return JsonResponse(
+        {"items": [item.as_dict() for item in page], "next_cursor": next_cursor}
+    )
+
+
+@require_http_methods(["GET"])
+def api_items_suggest(request):
+    """Typo-tolerant autocomplete on item names"""
+    query = request.GET.get("q", "").strip()
+    try:
+        limit = min(25, max(1, int(request.GET.get("limit", "8"))))
+    except ValueError:
+        limit = 8
+
+    suggestions = []
     if query:
-        qs = qs.filter(Q(name__icontains=query) | Q(notes__icontains=query))
-    if category:
-        qs = qs.filter(category__slug=category)
-    if rarity:
-        qs = qs.filter(rarity=rarity)
-
-    if sort == "value_desc":
-        qs = qs.order_by("-value", "name")
-    elif sort == "value_asc":
-        qs = qs.order_by("value", "name")
-    elif sort == "rarity":
-        rarity_order = {
-            "exotic": 0,
-            "limited": 1,
-            "mythic": 2,
-            "legendary": 3,
-            "rare": 4,
-            "uncommon": 5,
-            "common": 6,
-        }
-        qs = sorted(qs, key=lambda x: rarity_order.get(x.rarity, 7))
+        for item, score in suggest_items(query, limit):
+            data = item.as_catalog_dict()
+            data["score"] = score
+            suggestions.append(data)
+
+    return JsonResponse({"items": suggestions})
+
+
+@require_http_methods(["GET", "HEAD"])
+def api_items_catalog(request):
+    """Entire catalog as one pre-serialized JSON document for client-side filtering"""
+    catalog = get_catalog()
+    use_gzip = bool(re_accepts_gzip.search(request.headers.get("Accept-Encoding", "")))
+    # Each encoding is a different representation, so each gets its own strong ETag
+    etag = f'"{catalog.etag}-gzip"' if use_gzip else f'"{catalog.etag}"'
+
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
     else:
-        qs = qs.order_by("name")
+        body = catalog.payload_gzip if use_gzip else catalog.payload
+        response = HttpResponse(body, content_type="application/json")
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
 
-    items_data = []
-    for item in qs[:200]:  # Limit to 200 items for performance
-        items_data.append(
-            {
-                "id": item.id,
-                "name": item.name,
-                "slug": item.slug,
-                "value": item.value,
-                "image_url": item.image_url or "",
-                "category": item.category.name,
-                "category_color": item.category.color,
-                "rarity": item.get_rarity_display(),
-                "rarity_key": item.rarity,
-            }
-        )
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+@require_http_methods(["GET"])
+def api_items_catalog_changes(request):
+    """Catalog entries changed since the client's stamp, for offline copies"""
+    catalog = get_catalog()
+    since = request.GET.get("since", "")
+    if since == catalog.stamp:
+        data = {"stamp": catalog.stamp, "full": False, "items": [], "ids": None}
+    else:
+        changed = catalog.changes_since(since)
+        data = {
+            "stamp": catalog.stamp,
+            "full": changed is None,
+            "items": [item.as_catalog_dict() for item in (catalog.orders["name"] if changed is None else changed)],
+            # Anything the client holds that isn't listed has been deleted
+            "ids": None if changed is None else [item.id for item in catalog.items],
+        }
+    response = JsonResponse(data)
+    patch_cache_control(response, no_cache=True)
+    return response
 
-    return JsonResponse({"items": items_data})
+
+@require_http_methods(["GET"])
+def api_item_history(request, slug):
+    """Downsampled value history of one item over ?start=&end= (default: last 90 days)"""
+    item = get_catalog().by_slug.get(slug)
+    if item is None:
+        raise Http404("No item with that slug")
+    try:
+        end = history.parse_bound(request.GET.get("end"), end=True) or timezone.now()
+        start = history.parse_bound(request.GET.get("start")) or end - history.DEFAULT_RANGE
+        points = min(history.MAX_POINTS, max(2, int(request.GET.get("points", history.DEFAULT_POINTS))))
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    if start >= end:
+        return HttpResponseBadRequest("start must be before end")
+
+    response = JsonResponse(
+        {
+            "item": item.slug,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "points": history.get_series(item.id, start, end, points),
+        }
+    )
+    patch_cache_control(response, public=True, max_age=300)
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_trade_evaluate(request):
+    """Value one trade, or a batch under "trades", at current catalog values"""
+    # No session or user state is read, so CSRF protection buys nothing here
+    # and would lock out bots
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Request body must be JSON")
+    if not isinstance(body, dict):
+        return HttpResponseBadRequest("Request body must be a JSON object")
+
+    try:
+        if "trades" in body:
+            catalog, results = evaluate_trades(body["trades"])
+            data = {"results": results}
+        else:
+            catalog = get_catalog()
+            data = evaluate_trade(catalog, body)
+    except TradeError as exc:
+        return HttpResponseBadRequest(str(exc))
+    data["stamp"] = catalog.stamp
+    return JsonResponse(data)
+
+
+@login_required
+@user_passes_test(is_admin)
+@require_http_methods(["GET"])
+def cache_stats(request):
+    """Hit/miss counters for the item list page cache (staff only)"""
+    hits = cache.get("values:cache_stats:item_list_hits", 0)
+    misses = cache.get("values:cache_stats:item_list_misses", 0)
+    total = hits + misses
+    return JsonResponse(
+        {
+            "item_list": {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / total, 3) if total else None,
+            }
+        }
+    )
 
 
 class CustomLoginView(LoginView):
@@ -250,39 +494,349 @@ def profile_view(request):
         .select_related("item", "item__category")
         .order_by("-added_at")
     )
+    # The category rows add up to the Portfolio row, so one query serves both
+    portfolio_categories = category_breakdown(request.user)
     return render(
         request,
         "values/profile.html",
-        {"profile": profile, "inventory_items": inventory},
+        {
+            "profile": profile,
+            "inventory_items": inventory,
+            "portfolio_value": sum(row.total_value for row in portfolio_categories),
+            "portfolio_categories": portfolio_categories,
+        },
+    )
+
+
+def leaderboard_view(request):
+    categories = list(Category.objects.order_by("name"))
+    slug = request.GET.get("category")
+    category = None
+    if slug:
+        category = next((c for c in categories if c.slug == slug), None)
+        if category is None:
+            raise Http404("Unknown category")
+    user_rank = None
+    if request.user.is_authenticated:
+        user_rank = portfolio_rank(request.user, category)
+    return render(
+        request,
+        "values/leaderboard.html",
+        {
+            "categories": categories,
+            "category": category,
+            "entries": leaderboard(category),
+            "user_rank": user_rank,
+        },
     )
 
 
 @login_required
 @require_http_methods(["POST"])
 def add_to_inventory(request, slug):
-    item = get_object_or_404(Item, slug=slug)
+    item = get_object_or_404(Item.objects.only("id", "slug", "value", "category_id"), slug=slug)
     qty = 1
     try:
         if "quantity" in request.POST:
-            qty = max(1, int(request.POST.get("quantity", "1")))
+            qty = max(1, min(MAX_QUANTITY, int(request.POST.get("quantity", "1"))))
     except ValueError:
         qty = 1
 
-    inv, created = InventoryItem.objects.get_or_create(user=request.user, item=item)
-    inv.quantity += qty if not created else max(qty, 1)
-    inv.save()
+    add_item(request.user, item, qty)
     return redirect(item.get_absolute_url())
 
 
 @login_required
 @require_http_methods(["POST"])
 def remove_inventory_item(request, pk):
-    inv = get_object_or_404(InventoryItem, pk=pk, user=request.user)
-    inv.delete()
+    if not remove_entry(request.user, pk):
+        raise Http404("No such inventory entry")
     return redirect("values:profile")
 
 
- # Saved trade calculator feature removed per request.
+@login_required
+def inventory_import(request):
+    form = InventoryImportForm(request.POST or None, request.FILES or None)
+    lines = counts = None
+    if request.method == "POST" and form.is_valid():
+        catalog = get_catalog()
+        try:
+            lines = read_import(catalog, form.cleaned_data["text"])
+        except InventoryError as exc:
+            form.add_error(None, str(exc))
+        else:
+            operations = import_operations(lines, form.cleaned_data["mode"])
+            if operations and "preview" not in request.POST:
+                counts = apply_operations(request.user, operations)
+    return render(
+        request,
+        "values/inventory_import.html",
+        {
+            "form": form,
+            "lines": lines,
+            "matched": [line for line in lines or [] if line.item],
+            "unmatched": [line for line in lines or [] if not line.item],
+            "fuzzy": [line for line in lines or [] if line.match == "fuzzy"],
+            "counts": counts,
+        },
+    )
+
+
+@require_http_methods(["POST"])
+def api_inventory(request):
+    """Apply a batch of add/set/remove operations to the caller's inventory"""
+    if not request.user.is_authenticated:
+        return HttpResponse("Login required", status=401)
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Request body must be JSON")
+    if not isinstance(body, dict):
+        return HttpResponseBadRequest("Request body must be a JSON object")
+
+    try:
+        operations = parse_operations(get_catalog(), body.get("operations"))
+    except InventoryError as exc:
+        return HttpResponseBadRequest(str(exc))
+    counts = apply_operations(request.user, operations)
+    portfolio = Portfolio.objects.filter(user=request.user).values("total_value", "item_count").first()
+    return JsonResponse({**counts, "portfolio": portfolio or {"total_value": 0, "item_count": 0}})
+
+
+@require_http_methods(["POST"])
+def api_trade_matches(request):
+    """Find users holding items the caller wants, each with a balanced offer"""
+    if not request.user.is_authenticated:
+        return HttpResponse("Login required", status=401)
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Request body must be JSON")
+    if not isinstance(body, dict):
+        return HttpResponseBadRequest("Request body must be a JSON object")
+
+    tolerance = body.get("tolerance", DEFAULT_TOLERANCE)
+    if isinstance(tolerance, bool) or not isinstance(tolerance, (int, float)) or not (
+        MIN_TOLERANCE <= tolerance <= MAX_TOLERANCE
+    ):
+        return HttpResponseBadRequest(f"tolerance must be a number from {MIN_TOLERANCE} to {MAX_TOLERANCE}")
+    limit = body.get("limit", MATCH_LIMIT)
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_MATCH_LIMIT:
+        return HttpResponseBadRequest(f"limit must be 1-{MAX_MATCH_LIMIT}")
+    catalog = get_catalog()
+    try:
+        wanted = normalize_side(catalog, body.get("want", []))
+    except TradeError as exc:
+        return HttpResponseBadRequest(str(exc))
+    if not 1 <= len(wanted) <= MAX_WANTED:
+        return HttpResponseBadRequest(f"want must list 1-{MAX_WANTED} items")
+
+    matches = find_matches(request.user, wanted, tolerance, limit)
+    users = User.objects.select_related("profile").in_bulk([match.user_id for match in matches])
+    results = []
+    for match in matches:
+        holder = users.get(match.user_id)
+        if holder is None:
+            # Deleted since the holder index last refreshed
+            continue
+        trade = evaluate_trade(catalog, {"offer": match.offer, "request": match.request})
+        trade["user"] = {"username": holder.username, "display_name": holder.profile.display_name}
+        results.append(trade)
+    return JsonResponse({"matches": results})
+
+
+SHARED_TRADE_CACHE_TIMEOUT = 60 * 60
+SAVED_TRADES_PER_PAGE = 20
+
+
+def trade_rows(catalog, pairs):
+    return [
+        {"item": item, "quantity": quantity, "subtotal": item.value * quantity if item else 0}
+        for item, quantity in expand_side(catalog, pairs)
+    ]
+
+
+def shared_trade_context(catalog, shared):
+    """Expand a shared trade's stored sides against the current catalog."""
+    totals = {side: side_total(catalog, shared[side]) for side in SIDES}
+    return {
+        "code": shared["code"],
+        "created_at": shared["created_at"],
+        "offer": trade_rows(catalog, shared["offer"]),
+        "request": trade_rows(catalog, shared["request"]),
+        "offer_total": totals["offer"],
+        "request_total": totals["request"],
+        "difference": totals["request"] - totals["offer"],
+        "saved_offer_total": shared["offer_total"],
+        "saved_request_total": shared["request_total"],
+        "values_changed": (shared["offer_total"], shared["request_total"]) != (totals["offer"], totals["request"]),
+    }
+
+
+@require_http_methods(["POST"])
+def api_trades_save(request):
+    """Save the calculator's trade and return its permalink"""
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Request body must be JSON")
+    if not isinstance(body, dict):
+        return HttpResponseBadRequest("Request body must be a JSON object")
+    note = body.get("note", "")
+    if not isinstance(note, str):
+        return HttpResponseBadRequest("note must be a string")
+
+    catalog = get_catalog()
+    try:
+        offer, request_items = normalize_trade(catalog, body)
+    except TradeError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    code = share_code(offer, request_items)
+    owner = request.user if request.user.is_authenticated else None
+    # Saving a trade twice, or one someone else already shared, reuses the row
+    trade = SavedTrade.objects.filter(user=owner, share_code=code).first()
+    created = trade is None
+    if created:
+        try:
+            with transaction.atomic():
+                trade = SavedTrade.objects.create(
+                    user=owner,
+                    share_code=code,
+                    offer_items=offer,
+                    request_items=request_items,
+                    offer_total=side_total(catalog, offer),
+                    request_total=side_total(catalog, request_items),
+                    note=note.strip()[:255],
+                )
+        except IntegrityError:
+            # Saved by a concurrent request since the lookup
+            trade = SavedTrade.objects.get(user=owner, share_code=code)
+            created = False
+    return JsonResponse(
+        {
+            "code": code,
+            "url": request.build_absolute_uri(trade.get_absolute_url()),
+            "image_url": request.build_absolute_uri(reverse("values:trade_share_image", args=[code])),
+            "created": created,
+        },
+        status=201 if created else 200,
+    )
+
+
+@require_http_methods(["GET"])
+def api_trade_detail(request, code):
+    """A shared trade's items at current values, for loading it into the calculator"""
+    shared = get_shared_trade(code)
+    if shared is None:
+        raise Http404("No trade with that code")
+    catalog = get_catalog()
+    data = {"code": code, "stamp": catalog.stamp}
+    for side in SIDES:
+        data[side] = [
+            {**item.as_dict(), "quantity": quantity}
+            for item, quantity in expand_side(catalog, shared[side])
+            if item is not None
+        ]
+    return JsonResponse(data)
+
+
+@require_http_methods(["GET"])
+def trade_share(request, code):
+    """Permalink page for a shared trade"""
+    # The trade never changes and only its values can, so the content is
+    # rendered once per code and catalog version
+    catalog = get_catalog()
+    key = f"values:trade_share:{code}:{catalog.version}"
+    page = cache.get(key)
+    if page is None:
+        shared = get_shared_trade(code)
+        if shared is None:
+            raise Http404("No trade with that code")
+        context = shared_trade_context(catalog, shared)
+        page = {
+            "content": render_to_string("values/trade_share_content.html", context, request),
+            "description": (
+                f"Offer {context['offer_total']:,} for {context['request_total']:,} "
+                f"across {len(context['offer']) + len(context['request'])} items"
+            ),
+        }
+        cache.set(key, page, SHARED_TRADE_CACHE_TIMEOUT)
+    return render(
+        request,
+        "values/trade_share.html",
+        {
+            "content": mark_safe(page["content"]),
+            "description": page["description"],
+            "share_url": request.build_absolute_uri(),
+            "image_url": request.build_absolute_uri(reverse("values:trade_share_image", args=[code])),
+        },
+    )
+
+
+@require_http_methods(["GET", "HEAD"])
+def trade_share_image(request, code):
+    """Open Graph preview card for a shared trade"""
+    catalog = get_catalog()
+    etag = f'"{code}-{catalog.stamp}"'
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        key = f"values:trade_share_image:{code}:{catalog.version}"
+        image = cache.get(key)
+        if image is None:
+            shared = get_shared_trade(code)
+            if shared is None:
+                raise Http404("No trade with that code")
+            context = shared_trade_context(catalog, shared)
+            image = render_trade_card(
+                {side: [(row["item"], row["quantity"]) for row in context[side]] for side in SIDES},
+                {side: context[f"{side}_total"] for side in SIDES},
+            )
+            if image is None:
+                raise Http404("Preview images are unavailable")
+            cache.set(key, image, SHARED_TRADE_CACHE_TIMEOUT)
+        response = HttpResponse(image, content_type="image/png")
+    response["ETag"] = etag
+    # Link unfurlers fetch this once per share; values move slowly enough
+    # that an hour-old card is fine
+    patch_cache_control(response, public=True, max_age=SHARED_TRADE_CACHE_TIMEOUT)
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+def saved_trades(request):
+    catalog = get_catalog()
+    trades = SavedTrade.objects.filter(user=request.user).order_by("-id")
+    paginator = KeysetPaginator(trades, SAVED_TRADES_PER_PAGE)
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+    for trade in page:
+        trade.offer = trade_rows(catalog, trade.offer_items)
+        trade.request = trade_rows(catalog, trade.request_items)
+        trade.current_offer_total = side_total(catalog, trade.offer_items)
+        trade.current_request_total = side_total(catalog, trade.request_items)
+    return render(request, "values/saved_trades.html", {"page": page, "trades": page.object_list})
+
+
+@login_required
+@require_http_methods(["POST"])
+def saved_trade_delete(request, pk):
+    trade = get_object_or_404(SavedTrade, pk=pk, user=request.user)
+    trade.delete()
+    if not SavedTrade.objects.filter(share_code=trade.share_code).exists():
+        # Nobody else shares this trade, so its permalink goes away too
+        cache.delete_many(
+            [
+                shared_trade_key(trade.share_code),
+                f"values:trade_share:{trade.share_code}:{get_catalog_version()}",
+                f"values:trade_share_image:{trade.share_code}:{get_catalog_version()}",
+            ]
+        )
+    return redirect("values:saved_trades")
 
 
 class AdminRequiredMixin(UserPassesTestMixin):
@@ -380,40 +934,72 @@ def value_requests_list(request):
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def admin_value_requests(request):
-    """Superuser view to manage all value change requests"""
+    """Superuser review queue: pending requests grouped by item, or a list by status"""
     status_filter = request.GET.get('status', 'pending')
-    requests = ValueChangeRequest.objects.select_related(
-        'item', 'requested_by', 'reviewed_by'
-    ).order_by('-created_at')
-    
-    if status_filter != 'all':
-        requests = requests.filter(status=status_filter)
-    
+    if status_filter == 'pending':
+        paginator = KeysetPaginator(review_queue(), REVIEW_PAGE_SIZE)
+    else:
+        requests = ValueChangeRequest.objects.select_related(
+            'item', 'requested_by', 'reviewed_by'
+        ).order_by('-id')
+        if status_filter != 'all':
+            requests = requests.filter(status=status_filter)
+        paginator = KeysetPaginator(requests, REVIEW_PAGE_SIZE)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404("Invalid page cursor")
+    if status_filter == 'pending':
+        attach_requests(page.object_list)
+
     return render(request, 'values/admin_value_requests.html', {
-        'requests': requests,
+        'page': page,
+        'groups': page.object_list if status_filter == 'pending' else None,
+        'requests': page.object_list if status_filter != 'pending' else None,
         'status_filter': status_filter,
         'status_choices': ValueChangeRequest.Status.choices,
+        'reviewed': request.GET.get('reviewed'),
     })
 
 
+def review_redirect(request, reviewed):
+    # Back to the list the reviewer was on, saying how many were decided
+    query = urlencode({'status': request.POST.get('status', 'pending'), 'reviewed': reviewed})
+    return redirect(f"{reverse('values:admin_value_requests')}?{query}")
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+@require_http_methods(["POST"])
+def review_value_requests(request):
+    """Superuser approves or rejects the selected value change requests at once"""
+    action = request.POST.get('action')
+    if action not in ('approve', 'reject'):
+        return HttpResponseBadRequest("action must be approve or reject")
+    selected = request.POST.getlist('requests')
+    if not all(pk.isdigit() for pk in selected):
+        return HttpResponseBadRequest("Invalid request id")
+    if len(selected) > MAX_DECISIONS:
+        return HttpResponseBadRequest(f"At most {MAX_DECISIONS} requests at once")
+
+    selected = [int(pk) for pk in selected]
+    notes = request.POST.get('review_notes', '')
+    if action == 'approve':
+        approved, rejected = review_requests(request.user, approve=selected, notes=notes)
+    else:
+        approved, rejected = review_requests(request.user, reject=selected, notes=notes)
+    return review_redirect(request, approved + rejected)
+
+
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 @require_http_methods(["POST"])
 def approve_value_request(request, pk):
     """Superuser approves a value change request"""
-    value_request = get_object_or_404(ValueChangeRequest, pk=pk, status=ValueChangeRequest.Status.PENDING)
-    
-    value_request.status = ValueChangeRequest.Status.APPROVED
-    value_request.reviewed_by = request.user
-    value_request.reviewed_at = timezone.now()
-    value_request.review_notes = request.POST.get('review_notes', '')
-    value_request.save()
-    
-    # Update the item value
-    value_request.item.value = value_request.requested_value
-    value_request.item.save()
-    
-    return redirect('values:admin_value_requests')
+    approved, _ = review_requests(request.user, approve=[pk], notes=request.POST.get('review_notes', ''))
+    if not approved:
+        raise Http404("No pending value change request with that id")
+    return review_redirect(request, approved)
 
 
 @login_required
@@ -421,14 +1007,9 @@ def approve_value_request(request, pk):
 @require_http_methods(["POST"])
 def reject_value_request(request, pk):
     """Superuser rejects a value change request"""
-    value_request = get_object_or_404(ValueChangeRequest, pk=pk, status=ValueChangeRequest.Status.PENDING)
-    
-    value_request.status = ValueChangeRequest.Status.REJECTED
-    value_request.reviewed_by = request.user
-    value_request.reviewed_at = timezone.now()
-    value_request.review_notes = request.POST.get('review_notes', '')
-    value_request.save()
-    
-    return redirect('values:admin_value_requests')
+    _, rejected = review_requests(request.user, reject=[pk], notes=request.POST.get('review_notes', ''))
+    if not rejected:
+        raise Http404("No pending value change request with that id")
+    return review_redirect(request, rejected)
 
 # Create your views here.